@@ -1,66 +1,37 @@
 ######################
 # Import libraries
 ######################
-import numpy as np
-import pandas as pd
 import streamlit as st
 import pickle
 from PIL import Image
-from rdkit import Chem
-from rdkit.Chem import Descriptors
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import metrics, model_tasks, offload
+from common.caching import resource_cache
+
+# Files are read next to this script: the apps also run from the repository
+# root, as pages of the multipage host (multipage/Home.py)
+APP_DIR = os.path.dirname(os.path.realpath(__file__))
+
+metrics.rerun_started('solubility') # Timing of the hot paths (see common/metrics.py)
 
 ######################
 # Custom function
 ######################
 ## Calculate molecular descriptors
-def AromaticProportion(m):
-  aromatic_atoms = [m.GetAtomWithIdx(i).GetIsAromatic() for i in range(m.GetNumAtoms())]
-  aa_count = []
-  for i in aromatic_atoms:
-    if i==True:
-      aa_count.append(1)
-  AromaticAtom = sum(aa_count)
-  HeavyAtom = Descriptors.HeavyAtomCount(m)
-  AR = AromaticAtom/HeavyAtom
-  return AR
-
+# RDKit runs in the shared process pool, so the other sessions don't wait
+# for it; the call is cancelled if this session reruns (see common/offload.py)
+@metrics.timed('generate')
 def generate(smiles, verbose=False):
-
-    moldata= []
-    for elem in smiles:
-        mol=Chem.MolFromSmiles(elem)
-        moldata.append(mol)
-
-    baseData= np.arange(1,1)
-    i=0
-    for mol in moldata:
-
-        desc_MolLogP = Descriptors.MolLogP(mol)
-        desc_MolWt = Descriptors.MolWt(mol)
-        desc_NumRotatableBonds = Descriptors.NumRotatableBonds(mol)
-        desc_AromaticProportion = AromaticProportion(mol)
-
-        row = np.array([desc_MolLogP,
-                        desc_MolWt,
-                        desc_NumRotatableBonds,
-                        desc_AromaticProportion])
-
-        if(i==0):
-            baseData=row
-        else:
-            baseData=np.vstack([baseData, row])
-        i=i+1
-
-    columnNames=["MolLogP","MolWt","NumRotatableBonds","AromaticProportion"]
-    descriptors = pd.DataFrame(data=baseData,columns=columnNames)
-
-    return descriptors
+    return offload.run(model_tasks.molecular_descriptors, smiles, timeout=60)
 
 ######################
 # Page Title
 ######################
 
-image = Image.open('solubility-logo.jpg')
+image = Image.open(os.path.join(APP_DIR, 'solubility-logo.jpg'))
 
 st.image(image, use_column_width=True)
 
@@ -99,12 +70,20 @@ X[1:] # Skips the dummy first item
 # Pre-built model
 ######################
 
-# Reads in saved model
-load_model = pickle.load(open('solubility_model.pkl', 'rb'))
+# Reads in saved model, once per process (shared by all sessions)
+@resource_cache()
+def load_saved_model():
+    with open(os.path.join(APP_DIR, 'solubility_model.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+load_model = load_saved_model()
 
 # Apply model to make predictions
-prediction = load_model.predict(X)
+with metrics.section('predict'):
+    prediction = load_model.predict(X)
 #prediction_proba = load_model.predict_proba(X)
 
 st.header('Predicted LogS values')
 prediction[1:] # Skips the dummy first item
+
+metrics.rerun_finished()
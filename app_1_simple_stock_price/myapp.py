@@ -1,5 +1,15 @@
-import yfinance as yf
 import streamlit as st
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import metrics
+from common.caching import resource_cache
+from common.downsample import downsample
+from common.history_cache import HistoryCache
+from common.prices import YahooProvider
+
+metrics.rerun_started('stock') # Timing of the hot paths (see common/metrics.py)
 
 st.write("""
 # Simple Stock Price App
@@ -8,14 +18,26 @@ Shown are the stock closing price and volume of Google!
 
 """)
 
+# The date range is closed (historical), so each history is fetched once
+# and then read from disk: data/history/<ticker>_<start>_<end>_<interval>.npz
+@resource_cache()
+def load_history_cache():
+    folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'history')
+    return HistoryCache(folder, YahooProvider())
+
 # https://towardsdatascience.com/how-to-get-stock-data-using-python-c0de1df17e75
 #define the ticker symbol
 tickerSymbol = 'GOOGL' # 'AAPL'
-#get data on this ticker
-tickerData = yf.Ticker(tickerSymbol)
 #get the historical prices for this ticker
-tickerDf = tickerData.history(period='1d', start='2010-5-31', end='2020-5-31')
-# Open	High	Low	Close	Volume	Dividends	Stock Splits
+with metrics.section('load_history'):
+    tickerDf = load_history_cache().history(tickerSymbol, start='2010-5-31', end='2020-5-31')
+# Open	High	Low	Close	Volume
+
+# Long series (e.g., intraday) are downsampled before charting,
+# keeping the visual peaks (Largest-Triangle-Three-Buckets)
+MAX_POINTS = 1000
+
+st.line_chart(downsample(tickerDf.Close, MAX_POINTS))
+st.line_chart(downsample(tickerDf.Volume, MAX_POINTS))
 
-st.line_chart(tickerDf.Close)
-st.line_chart(tickerDf.Volume)
+metrics.rerun_finished()
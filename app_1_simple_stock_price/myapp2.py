@@ -1,27 +1,50 @@
-import yfinance as yf
+import pandas as pd
 import streamlit as st
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import metrics
+from common.caching import resource_cache
+from common.downsample import downsample_frame
+from common.history_cache import HistoryCache
+from common.prices import YahooProvider
+
+metrics.rerun_started('stock-multi') # Timing of the hot paths (see common/metrics.py)
 
 st.write("""
 # Simple Stock Price App
 
-Shown are the stock **closing price** and ***volume*** of Google!
+Shown are the stock **closing price** and ***volume*** of the selected companies (Google by default)!
 
 """)
 
+# The date range is closed (historical), so each history is fetched once
+# and then read from disk: data/history/<ticker>_<start>_<end>_<interval>.npz
+@resource_cache()
+def load_history_cache():
+    folder = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'history')
+    return HistoryCache(folder, YahooProvider())
+
 # https://towardsdatascience.com/how-to-get-stock-data-using-python-c0de1df17e75
-#define the ticker symbol
-tickerSymbol = 'GOOGL'
-#get data on this ticker
-tickerData = yf.Ticker(tickerSymbol)
-#get the historical prices for this ticker
-tickerDf = tickerData.history(period='1d', start='2010-5-31', end='2020-5-31')
-# Open	High	Low	Close	Volume	Dividends	Stock Splits
+#define the ticker symbols
+tickerSymbols = st.sidebar.multiselect('Tickers', ['GOOGL', 'AAPL', 'MSFT', 'AMZN', 'META'], ['GOOGL'])
+#get the historical prices for these tickers; they are fetched concurrently
+tickerDfs = load_history_cache().histories(tickerSymbols, start='2010-5-31', end='2020-5-31')
+# Open	High	Low	Close	Volume
 
-st.write("""
-## Closing Price
-""")
-st.line_chart(tickerDf.Close)
-st.write("""
-## Volume Price
-""")
-st.line_chart(tickerDf.Volume)
+# Long series (e.g., intraday) are downsampled before charting,
+# keeping the visual peaks (Largest-Triangle-Three-Buckets)
+MAX_POINTS = 1000
+
+if tickerDfs:
+    st.write("""
+    ## Closing Price
+    """)
+    st.line_chart(downsample_frame(pd.DataFrame({t: df.Close for t, df in tickerDfs.items()}), MAX_POINTS))
+    st.write("""
+    ## Volume Price
+    """)
+    st.line_chart(downsample_frame(pd.DataFrame({t: df.Volume for t, df in tickerDfs.items()}), MAX_POINTS))
+
+metrics.rerun_finished()
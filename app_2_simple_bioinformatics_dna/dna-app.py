@@ -4,16 +4,27 @@
 
 import pandas as pd
 import streamlit as st
-import altair as alt
 from PIL import Image
-import matplotlib.pyplot as plt
-import seaborn as sns
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.lazy import lazy_import
+
+# Heavy libraries are imported at the point of use (see common/lazy.py)
+alt = lazy_import('altair')
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+
+# Files are read next to this script: the apps also run from the repository
+# root, as pages of the multipage host (multipage/Home.py)
+APP_DIR = os.path.dirname(os.path.realpath(__file__))
 
 ######################
 # Page Title
 ######################
 
-image = Image.open('dna-logo.jpg')
+image = Image.open(os.path.join(APP_DIR, 'dna-logo.jpg'))
 
 st.image(image, use_column_width=True)
 
@@ -1,15 +1,29 @@
 import streamlit as st
 import pandas as pd
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+import io
+import time
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import memory, metrics
+from common.caching import data_cache, resource_cache
+from common.download import download_buttons
+from common import career, fetch, seasons
+from common.lazy import lazy_import
+
+# Only needed for the heatmap: imported when it is drawn (see common/lazy.py)
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+
+metrics.rerun_started('basketball') # Timing of the hot paths (see common/metrics.py)
 
 st.title('NBA Player Stats Explorer')
 
 st.markdown("""
 This app performs simple webscraping of NBA player stats data!
-* **Python libraries:** base64, pandas, streamlit
+* **Python libraries:** pandas, streamlit
 * **Data source:** [Basketball-reference.com](https://www.basketball-reference.com/).
 """)
 
@@ -18,10 +32,14 @@ selected_year = st.sidebar.selectbox('Year', list(reversed(range(1950,2020))))
 
 # Web scraping of NBA player stats
 # Fetch data frm HTML/web conditional on variable and refresh!
-@st.cache # Re-load every time we change the year!
+# Cached per year for a day, also on disk (data/cache), so restarts don't scrape again
+DATA_CACHE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cache')
+@metrics.timed('load_data')
+@data_cache(ttl=24 * 3600, max_entries=100, persist=DATA_CACHE) # Re-load every time we change the year!
 def load_data(year):
     url = "https://www.basketball-reference.com/leagues/NBA_" + str(year) + "_per_game.html"
-    html = pd.read_html(url, header = 0)
+    # Pooled connections; a conditional request when the page was downloaded before (see common/fetch.py)
+    html = pd.read_html(io.StringIO(fetch.text(url)), header = 0)
     df = html[0]
     raw = df.drop(df[df.Age == 'Age'].index) # Deletes repeating headers in content
     raw = raw.fillna(0)
@@ -38,23 +56,58 @@ unique_pos = ['C','PF','SF','PG','SG']
 selected_pos = st.sidebar.multiselect('Position', unique_pos, unique_pos)
 
 # Filtering data
-df_selected_team = playerstats[(playerstats.Tm.isin(selected_team)) & (playerstats.Pos.isin(selected_pos))]
+# The positions of the selected rows in the cached (shared) frame, not a copy of them;
+# frames are only built to be displayed or downloaded (see common/memory.py)
+df_selected_team = memory.RowSelection(playerstats, (playerstats.Tm.isin(selected_team)) & (playerstats.Pos.isin(selected_pos)))
+memory.track('df_selected_team', df_selected_team)
 
 st.header('Display Player Stats of Selected Team(s)')
 st.write('Data Dimension: ' + str(df_selected_team.shape[0]) + ' rows and ' + str(df_selected_team.shape[1]) + ' columns.')
-st.dataframe(df_selected_team)
+st.dataframe(df_selected_team.frame())
 
 # Download NBA player stats data
 # https://discuss.streamlit.io/t/how-to-download-file-in-streamlit/1806
-# We can modify the name of the downloaded file changing "playerstats.csv"
-# Download functionality is shown as a Markdown link
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="playerstats.csv">Download CSV File</a>'
-    return href
+# We can modify the name of the downloaded file changing 'playerstats'
+# The file is only generated when the user clicks on 'Prepare download'
+download_buttons(df_selected_team, 'playerstats')
+
+# Player search across all seasons
+# Seasons are ingested beforehand into a local store + search index, e.g.:
+#   python -m common.seasons nba --start 1950 --end 2019
+@resource_cache()
+def load_player_search():
+    return seasons.load_player_search('nba')
+players_all, player_index = load_player_search()
 
-st.markdown(filedownload(df_selected_team), unsafe_allow_html=True)
+# Career totals, averages and team splits
+# Materialized when seasons are ingested (see common/career.py)
+@resource_cache()
+def load_career():
+    return career.load('nba')
+career_stats, career_teams = load_career()
+
+if career_stats is not None:
+    st.header('Career Stats (All Seasons)')
+    st.dataframe(career_stats.sort_values('PTS', ascending=False))
+
+st.header('Player Search (All Seasons)')
+if player_index is None:
+    st.write('No seasons ingested yet; run `python -m common.seasons nba --start 1950 --end 2019` from the repository root.')
+else:
+    query = st.text_input('Player name (prefix or approximate)')
+    if query:
+        start = time.perf_counter()
+        matches = player_index.search(query)
+        st.caption(str(len(matches)) + ' players found in ' + format((time.perf_counter() - start) * 1000, '.2f') + ' ms')
+        if matches:
+            name_id = st.selectbox('Player', [m[0] for m in matches], format_func=dict(matches).get)
+            st.dataframe(players_all.iloc[player_index.rows(name_id)])
+            name = dict(matches)[name_id]
+            if career_stats is not None and name in career_stats.index:
+                st.subheader('Career of ' + name)
+                st.dataframe(career_stats.loc[[name]])
+                st.subheader('Team splits')
+                st.dataframe(career_teams.loc[name])
 
 # Heatmap
 # Button to display heatmap
@@ -62,8 +115,8 @@ if st.button('Intercorrelation Heatmap'):
     st.header('Intercorrelation Matrix Heatmap')
     # It might not work if we don't save & load the df
     # Maybe it's because of some type issues?
-    df_selected_team.to_csv('output.csv',index=False)
-    df = pd.read_csv('output.csv')
+    # (in memory: a shared output.csv would be overwritten by other sessions)
+    df = pd.read_csv(io.StringIO(df_selected_team.frame().to_csv(index=False)))
     corr = df.corr()
     mask = np.zeros_like(corr)
     mask[np.triu_indices_from(mask)] = True
@@ -71,3 +124,5 @@ if st.button('Intercorrelation Heatmap'):
         fig, ax = plt.subplots(figsize=(7, 5))
         ax = sns.heatmap(corr, mask=mask, vmax=1, square=True)
     st.pyplot(fig)
+
+metrics.rerun_finished()
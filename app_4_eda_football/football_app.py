@@ -1,15 +1,29 @@
 import streamlit as st
 import pandas as pd
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+import io
+import time
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import memory, metrics
+from common.caching import data_cache, resource_cache
+from common.download import download_buttons
+from common import career, fetch, seasons
+from common.lazy import lazy_import
+
+# Only needed for the heatmap: imported when it is drawn (see common/lazy.py)
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+
+metrics.rerun_started('football') # Timing of the hot paths (see common/metrics.py)
 
 st.title('NFL Football Stats (Rushing) Explorer')
 
 st.markdown("""
 This app performs simple webscraping of NFL Football player stats data (focusing on Rushing)!
-* **Python libraries:** base64, pandas, streamlit, numpy, matplotlib, seaborn
+* **Python libraries:** pandas, streamlit, numpy, matplotlib, seaborn
 * **Data source:** [pro-football-reference.com](https://www.pro-football-reference.com/).
 """)
 
@@ -18,10 +32,14 @@ selected_year = st.sidebar.selectbox('Year', list(reversed(range(1990,2020))))
 
 # Web scraping of NFL player stats
 # https://www.pro-football-reference.com/years/2019/rushing.htm
-@st.cache
+# Cached per year for a day, also on disk (data/cache), so restarts don't scrape again
+DATA_CACHE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cache')
+@metrics.timed('load_data')
+@data_cache(ttl=24 * 3600, max_entries=100, persist=DATA_CACHE)
 def load_data(year):
     url = "https://www.pro-football-reference.com/years/" + str(year) + "/rushing.htm"
-    html = pd.read_html(url, header = 1)
+    # Pooled connections; a conditional request when the page was downloaded before (see common/fetch.py)
+    html = pd.read_html(io.StringIO(fetch.text(url)), header = 1)
     df = html[0]
     raw = df.drop(df[df.Age == 'Age'].index) # Deletes repeating headers in content
     raw = raw.fillna(0)
@@ -38,27 +56,62 @@ unique_pos = ['RB','QB','WR','FB','TE']
 selected_pos = st.sidebar.multiselect('Position', unique_pos, unique_pos)
 
 # Filtering data
-df_selected_team = playerstats[(playerstats.Tm.isin(selected_team)) & (playerstats.Pos.isin(selected_pos))]
+# The positions of the selected rows in the cached (shared) frame, not a copy of them;
+# frames are only built to be displayed or downloaded (see common/memory.py)
+df_selected_team = memory.RowSelection(playerstats, (playerstats.Tm.isin(selected_team)) & (playerstats.Pos.isin(selected_pos)))
+memory.track('df_selected_team', df_selected_team)
 
 st.header('Display Player Stats of Selected Team(s)')
 st.write('Data Dimension: ' + str(df_selected_team.shape[0]) + ' rows and ' + str(df_selected_team.shape[1]) + ' columns.')
-st.dataframe(df_selected_team)
+st.dataframe(df_selected_team.frame())
 
 # Download NBA player stats data
 # https://discuss.streamlit.io/t/how-to-download-file-in-streamlit/1806
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="playerstats.csv">Download CSV File</a>'
-    return href
+download_buttons(df_selected_team, 'playerstats')
+
+# Player search across all seasons
+# Seasons are ingested beforehand into a local store + search index, e.g.:
+#   python -m common.seasons nfl --start 1990 --end 2019
+@resource_cache()
+def load_player_search():
+    return seasons.load_player_search('nfl')
+players_all, player_index = load_player_search()
 
-st.markdown(filedownload(df_selected_team), unsafe_allow_html=True)
+# Career totals, averages and team splits
+# Materialized when seasons are ingested (see common/career.py)
+@resource_cache()
+def load_career():
+    return career.load('nfl')
+career_stats, career_teams = load_career()
+
+if career_stats is not None:
+    st.header('Career Stats (All Seasons)')
+    st.dataframe(career_stats.sort_values('Yds', ascending=False))
+
+st.header('Player Search (All Seasons)')
+if player_index is None:
+    st.write('No seasons ingested yet; run `python -m common.seasons nfl --start 1990 --end 2019` from the repository root.')
+else:
+    query = st.text_input('Player name (prefix or approximate)')
+    if query:
+        start = time.perf_counter()
+        matches = player_index.search(query)
+        st.caption(str(len(matches)) + ' players found in ' + format((time.perf_counter() - start) * 1000, '.2f') + ' ms')
+        if matches:
+            name_id = st.selectbox('Player', [m[0] for m in matches], format_func=dict(matches).get)
+            st.dataframe(players_all.iloc[player_index.rows(name_id)])
+            name = dict(matches)[name_id]
+            if career_stats is not None and name in career_stats.index:
+                st.subheader('Career of ' + name)
+                st.dataframe(career_stats.loc[[name]])
+                st.subheader('Team splits')
+                st.dataframe(career_teams.loc[name])
 
 # Heatmap
 if st.button('Intercorrelation Heatmap'):
     st.header('Intercorrelation Matrix Heatmap')
-    df_selected_team.to_csv('output.csv',index=False)
-    df = pd.read_csv('output.csv')
+    # Save & load the df (in memory: a shared output.csv would be overwritten by other sessions)
+    df = pd.read_csv(io.StringIO(df_selected_team.frame().to_csv(index=False)))
 
     corr = df.corr()
     mask = np.zeros_like(corr)
@@ -66,4 +119,6 @@ if st.button('Intercorrelation Heatmap'):
     with sns.axes_style("white"):
         fig, ax = plt.subplots(figsize=(7, 5))
         ax = sns.heatmap(corr, mask=mask, vmax=1, square=True)
-    st.pyplot(fig)
\ No newline at end of file
+    st.pyplot(fig)
+
+metrics.rerun_finished()
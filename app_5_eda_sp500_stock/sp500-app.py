@@ -1,70 +1,132 @@
 import streamlit as st
 import pandas as pd
-import base64
-import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
-import yfinance as yf
+import io
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import fetch, memory, metrics, offload
+from common.caching import data_cache, resource_cache
+from common.download import download_buttons
+from common.plotting import render_png, render_pngs, small_multiples
+from common.prices import FixtureProvider, PriceCache, YahooProvider, year_start
+from common.sectors import sector_performance
+from common.tsstore import PriceStore
+from common.lazy import lazy_import
+
+# Only needed for the heatmap and the plots: imported when they are drawn (see common/lazy.py)
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+
+metrics.rerun_started('sp500') # Timing of the hot paths (see common/metrics.py)
 
 st.title('S&P 500 App')
 
 st.markdown("""
 This app retrieves the list of the **S&P 500** (from Wikipedia) and its corresponding **stock closing price** (year-to-date)!
-* **Python libraries:** base64, pandas, streamlit, numpy, matplotlib, seaborn
+* **Python libraries:** pandas, streamlit, numpy, matplotlib, seaborn
 * **Data source:** [Wikipedia](https://en.wikipedia.org/wiki/List_of_S%26P_500_companies).
 """)
 
 st.sidebar.header('User Input Features')
 
 # Web scraping of S&P 500 data
-#
-@st.cache
+# Cached for a day, also on disk (data/cache), so restarts don't scrape again
+DATA_CACHE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'cache')
+@metrics.timed('load_data')
+@data_cache(ttl=24 * 3600, persist=DATA_CACHE)
 def load_data():
     url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-    html = pd.read_html(url, header = 0)
+    # Pooled connections; a conditional request when the page was downloaded before (see common/fetch.py)
+    html = pd.read_html(io.StringIO(fetch.text(url)), header = 0)
     df = html[0]
     return df
 
 df = load_data()
-sector = df.groupby('GICS Sector')
+sector_of = dict(zip(df.Symbol, df['GICS Sector'])) # Symbol -> sector
 
 # Sidebar - Sector selection
 sorted_sector_unique = sorted( df['GICS Sector'].unique() )
 selected_sector = st.sidebar.multiselect('Sector', sorted_sector_unique, sorted_sector_unique)
 
 # Filtering data
-df_selected_sector = df[ (df['GICS Sector'].isin(selected_sector)) ]
+# The positions of the selected rows in the cached (shared) frame, not a copy of them (see common/memory.py)
+df_selected_sector = memory.RowSelection(df, df['GICS Sector'].isin(selected_sector))
+memory.track('df_selected_sector', df_selected_sector)
 
 st.header('Display Companies in Selected Sector')
 st.write('Data Dimension: ' + str(df_selected_sector.shape[0]) + ' rows and ' + str(df_selected_sector.shape[1]) + ' columns.')
-st.dataframe(df_selected_sector)
+st.dataframe(df_selected_sector.frame())
 
 # Download S&P500 data
 # https://discuss.streamlit.io/t/how-to-download-file-in-streamlit/1806
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="SP500.csv">Download CSV File</a>'
-    return href
-
-st.markdown(filedownload(df_selected_sector), unsafe_allow_html=True)
+download_buttons(df_selected_sector, 'SP500')
 
 # https://pypi.org/project/yfinance/
+# Prices are fetched lazily (only when plots are shown), cached per ticker
+# and refreshed incrementally after the TTL; the cache is shared by all sessions.
+# Set PRICE_FIXTURES=<folder with SYMBOL.csv files> to run offline.
+@resource_cache()
+def load_price_cache():
+    if os.environ.get('PRICE_FIXTURES'):
+        provider = FixtureProvider(folder=os.environ['PRICE_FIXTURES'])
+    else:
+        provider = YahooProvider()
+    return PriceCache(provider, ttl=3600)
+
+price_cache = load_price_cache()
+
+# Local memory-mapped store with the history of all constituents (see common/tsstore.py):
+#   python -m common.tsstore app_5_eda_sp500_stock/data/prices yahoo --start 2014-01-01
+# If present, plots (and analytics) read from it instead of fetching.
+PRICE_STORE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'data', 'prices')
+
+# One store object per version of its files: reopened after an ingest (see common/tsstore.py)
+@resource_cache(max_entries=1)
+def load_price_store(version):
+    return PriceStore(PRICE_STORE)
 
-data = yf.download(
-        tickers = list(df_selected_sector[:10].Symbol),
-        period = "ytd",
-        interval = "1d",
-        group_by = 'ticker',
-        auto_adjust = True,
-        prepost = True,
-        threads = True,
-        proxy = None
-    )
+price_store = load_price_store(PriceStore.read_version(PRICE_STORE)) if PriceStore.exists(PRICE_STORE) else None
+
+def load_history(symbol, start):
+    if price_store is not None and symbol in price_store:
+        return price_store.frame(symbol, start)
+    return price_cache.history(symbol, start)
+
+# Sector performance of all constituents: returns, volatility, correlation
+# Computed with matrix operations over the (dates x tickers) close prices
+# and cached per date range (the store is hashed by folder and version, which every write increments)
+@metrics.timed('sector_performance')
+@data_cache(max_entries=16, hash_funcs={PriceStore: lambda store: (store.folder, store.version)})
+def load_sector_performance(store, labels, start, end):
+    lo, hi = store.window(start, end)
+    return sector_performance(store.matrix('Close', start, end), labels, store.dates[lo:hi])
+
+if price_store is not None and len(price_store):
+    last_date = pd.Timestamp(price_store.dates[-1])
+    start_date = st.sidebar.date_input('Sector performance from', (last_date - pd.DateOffset(years=1)).date())
+    end_date = st.sidebar.date_input('Sector performance to', last_date.date())
+    labels = tuple(sector_of.get(symbol, 'Other') for symbol in price_store.symbols)
+    performance = load_sector_performance(price_store, labels, str(start_date), str(end_date))
+    shown = [s for s in performance['summary'].index if s in selected_sector]
+
+    st.header('Sector Performance')
+    st.write('Equal-weighted returns and annualized volatility from ' + str(start_date) + ' to ' + str(end_date) + '.')
+    st.dataframe(performance['summary'].loc[shown])
+    st.line_chart(performance['cumulative'][shown])
+    if st.button('Sector Correlation Heatmap'):
+        corr = performance['correlation'].loc[shown, shown]
+        with sns.axes_style("white"):
+            fig, ax = plt.subplots(figsize=(7, 5))
+            ax = sns.heatmap(corr, vmin=-1, vmax=1, square=True, annot=True, fmt='.2f')
+        st.pyplot(fig)
+        plt.close(fig)
 
 # Plot Closing Price of Query Symbol
+@metrics.timed('price_plot')
 def price_plot(symbol):
-  df = pd.DataFrame(data[symbol].Close)
+  df = pd.DataFrame(load_history(symbol, year_start()).Close)
   df['Date'] = df.index
   fig = plt.figure()
   plt.fill_between(df.Date, df.Close, color='skyblue', alpha=0.3)
@@ -73,11 +135,38 @@ def price_plot(symbol):
   plt.title(symbol, fontweight='bold')
   plt.xlabel('Date', fontweight='bold')
   plt.ylabel('Closing Price', fontweight='bold')
-  return st.pyplot(fig)
+  st.pyplot(fig)
+  plt.close(fig) # pyplot keeps every figure alive until closed
+
+# Closing prices as NumPy arrays, e.g., to send them to worker processes
+def price_series(symbol):
+  df = load_history(symbol, year_start())
+  return df.index.values, df.Close.values
 
-num_company = st.sidebar.slider('Number of Companies', 1, 5)
+# With the local store, charting many companies is cheap
+max_company = 50 if price_store is not None else 5
+num_company = st.sidebar.slider('Number of Companies', 1, max_company)
+plot_layout = st.sidebar.selectbox('Plot layout', ['One chart per company', 'Small multiples grid', 'Parallel PNGs'])
 
 if st.button('Show Plots'):
     st.header('Stock Closing Price')
-    for i in list(df_selected_sector.Symbol)[:num_company]:
-        price_plot(i)
+    symbols = list(df_selected_sector.column('Symbol')[:num_company])
+    if plot_layout == 'One chart per company':
+        for i in symbols:
+            price_plot(i)
+    elif plot_layout == 'Small multiples grid':
+        # A single figure for all companies
+        with metrics.section('small_multiples'):
+            st.pyplot(small_multiples({i: price_series(i) for i in symbols}))
+    else:
+        # One PNG per company, rendered in the process pool shared by all sessions (see common/offload.py);
+        # with OFFLOAD_WORKERS=0, in the script thread
+        series = {i: price_series(i) for i in symbols}
+        with metrics.section('render_pngs'):
+            if offload.WORKERS > 0:
+                pngs = render_pngs(series, offload.pool())
+            else:
+                pngs = {i: render_png(i, *series[i]) for i in series}
+        st.image(list(pngs.values()), width=320)
+
+metrics.rerun_finished()
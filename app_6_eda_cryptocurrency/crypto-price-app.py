@@ -2,12 +2,24 @@
 import streamlit as st
 from PIL import Image
 import pandas as pd
-import base64
-import matplotlib.pyplot as plt
-from bs4 import BeautifulSoup
 import requests
-import json
 import time
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import memory, metrics
+from common.caching import resource_cache
+from common.changes import MAX_BARS, ChangeCharts
+from common.cmc import CMC_URL, PAGE_SIZE, Poller, SnapshotCache, in_currency
+from common.download import download_buttons
+from common.offload import yield_to_session
+
+# Files are read next to this script: the apps also run from the repository
+# root, as pages of the multipage host (multipage/Home.py)
+APP_DIR = os.path.dirname(os.path.realpath(__file__))
+
+metrics.rerun_started('crypto') # Timing of the hot paths (see common/metrics.py)
 #---------------------------------#
 # New feature (make sure to upgrade your streamlit library)
 # pip install --upgrade streamlit
@@ -19,7 +31,7 @@ st.set_page_config(layout="wide")
 #---------------------------------#
 # Title
 
-image = Image.open('logo.jpg')
+image = Image.open(os.path.join(APP_DIR, 'logo.jpg'))
 
 st.image(image, width = 500)
 
@@ -33,7 +45,7 @@ This app retrieves cryptocurrency prices for the top 100 cryptocurrency from the
 #expander_bar = st.beta_expander("About")
 expander_bar = st.expander("About")
 expander_bar.markdown("""
-* **Python libraries:** base64, pandas, streamlit, numpy, matplotlib, seaborn, BeautifulSoup, requests, json, time
+* **Python libraries:** pandas, streamlit, numpy, matplotlib, seaborn, requests, time
 * **Data source:** [CoinMarketCap](http://coinmarketcap.com).
 * **Credit:** Web scraper adapted from the Medium article *[Web Scraping Crypto Prices With Python](https://towardsdatascience.com/web-scraping-crypto-prices-with-python-41072ea5b5bf)* written by [Bryan Feng](https://medium.com/@bryanf).
 """)
@@ -53,79 +65,64 @@ col1.header('Input Options')
 ## Sidebar - Currency price unit
 currency_price_unit = col1.selectbox('Select currency for price', ('USD', 'BTC', 'ETH'))
 
+## Sidebar - Number of coins to load
+# The front page lists 100 coins; more coins are loaded from the next
+# pages (?page=2, ...), fetched concurrently with retries.
+num_load = col1.selectbox('Coins to load', [100, 500, 1000, 2000, 5000])
+pages = num_load // PAGE_SIZE
+
 # Web scraping of CoinMarketCap data
-@st.cache
-def load_data():
-    cmc = requests.get('https://coinmarketcap.com')
-    soup = BeautifulSoup(cmc.content, 'html.parser')
-
-    data = soup.find('script', id='__NEXT_DATA__', type='application/json')
-    coins = {}
-    coin_data = json.loads(data.contents[0])
-    # I had to modify this code because Coinmarketcap
-    # changed the format
-    #listings = coin_data['props']['initialState']['cryptocurrency']['listingLatest']['data']
-    coin_data_ = json.loads(coin_data['props']['initialState'])
-    listings = coin_data_['cryptocurrency']['listingLatest']['data']
-    # Now, listings has the key in the first element
-    # Values in the next elements
-    keys = listings[0]['keysArr']
-    key2idx = {keys[i]: i for i in range(len(keys))}
-    for i in listings[1:]:
-      coins[str(i[key2idx['id']])] = i[key2idx['slug']]
-
-    coin_name = []
-    coin_symbol = []
-    market_cap = []
-    percent_change_1h = []
-    percent_change_24h = []
-    percent_change_7d = []
-    price = []
-    volume_24h = []
-
-    key_base = 'quote.'+currency_price_unit
-    for i in listings[1:]:
-      #coin_name.append(i['slug'])
-      #coin_symbol.append(i['symbol'])
-      #price.append(i['quote'][currency_price_unit]['price'])
-      #percent_change_1h.append(i['quote'][currency_price_unit]['percent_change_1h'])
-      #percent_change_24h.append(i['quote'][currency_price_unit]['percent_change_24h'])
-      #percent_change_7d.append(i['quote'][currency_price_unit]['percent_change_7d'])
-      #market_cap.append(i['quote'][currency_price_unit]['market_cap'])
-      #volume_24h.append(i['quote'][currency_price_unit]['volume_24h'])
-      #
-      # New format
-      coin_name.append(i[key2idx['slug']])
-      coin_symbol.append(i[key2idx['symbol']])
-      price.append(i[key2idx[key_base+'.price']])
-      percent_change_1h.append(i[key2idx[key_base+'.percentChange1h']])
-      percent_change_24h.append(i[key2idx[key_base+'.percentChange24h']])
-      percent_change_7d.append(i[key2idx[key_base+'.percentChange7d']])
-      market_cap.append(i[key2idx[key_base+'.marketCap']])
-      volume_24h.append(i[key2idx[key_base+'.volume24h']])
-
-    df = pd.DataFrame(columns=['coin_name', 'coin_symbol', 'market_cap', 'percent_change_1h', 'percent_change_24h', 'percent_change_7d', 'price', 'volume_24h'])
-    df['coin_name'] = coin_name
-    df['coin_symbol'] = coin_symbol
-    df['price'] = price
-    df['percent_change_1h'] = percent_change_1h
-    df['percent_change_24h'] = percent_change_24h
-    df['percent_change_7d'] = percent_change_7d
-    df['market_cap'] = market_cap
-    df['volume_24h'] = volume_24h
-    return df
-
-df = load_data()
+# The listing is extracted from the __NEXT_DATA__ script of the page
+# without parsing the HTML (see common/cmc.py).
+# One snapshot holds the USD, BTC and ETH quotes; it is shared by all sessions
+# and refetched after the TTL, so switching the currency is a column switch.
+# Set CMC_URL=http://127.0.0.1:8765 to use a local stand-in server:
+#   python -m common.cmc serve --port 8765
+@resource_cache()
+def load_snapshot_cache(pages):
+    return SnapshotCache(os.environ.get('CMC_URL', CMC_URL), ttl=300, pages=pages, max_workers=8)
+
+@metrics.timed('load_data')
+def load_data(currency_price_unit, pages):
+    snapshot_id, snapshot = load_snapshot_cache(pages).current()
+    return snapshot_id, in_currency(snapshot, currency_price_unit)
+
+## Sidebar - Live mode
+# A single poller (shared by all sessions) refreshes the snapshot every
+# CMC_POLL_INTERVAL seconds and keeps the last prices in ring buffers
+# (see common/ringbuffer.py); sessions only read them.
+POLL_INTERVAL = float(os.environ.get('CMC_POLL_INTERVAL', 60))
+live = col1.checkbox('Live mode (refresh every %g s)' % POLL_INTERVAL)
+
+@resource_cache()
+def load_poller(pages):
+    return Poller(load_snapshot_cache(pages), interval=POLL_INTERVAL, capacity=720)
+
+if live:
+    # The first session starting the poller makes the first poll, so that
+    # this run already shows fresh data (see Poller.start())
+    poller = load_poller(pages).start()
+
+snapshot_id, df = load_data(currency_price_unit, pages)
 
 ## Sidebar - Cryptocurrency selections
+# With thousands of coins, selecting all of them by default would make the
+# widget huge; then an empty selection means all coins.
 sorted_coin = sorted( df['coin_symbol'] )
-selected_coin = col1.multiselect('Cryptocurrency', sorted_coin, sorted_coin)
+if len(sorted_coin) <= PAGE_SIZE:
+    selected_coin = col1.multiselect('Cryptocurrency', sorted_coin, sorted_coin)
+else:
+    selected_coin = col1.multiselect('Cryptocurrency (empty: all)', sorted_coin) or sorted_coin
 
-df_selected_coin = df[ (df['coin_symbol'].isin(selected_coin)) ] # Filtering data
+# Filtering data: the positions of the selected coins in the cached (shared) frame,
+# not a copy of them; frames are only built for display (see common/memory.py)
+df_selected_coin = memory.RowSelection(df, df['coin_symbol'].isin(selected_coin))
 
 ## Sidebar - Number of coins to display
-num_coin = col1.slider('Display Top N Coins', 1, 100, 100)
-df_coins = df_selected_coin[:num_coin]
+num_coin = col1.slider('Display Top N Coins', 1, len(df), min(len(df), 100))
+df_coins = df_selected_coin.head(num_coin)
+memory.track('df_selected_coin', df_selected_coin)
+memory.track('df_coins', df_coins)
 
 ## Sidebar - Percent change timeframe
 percent_timeframe = col1.selectbox('Percent change time frame',
@@ -139,55 +136,67 @@ sort_values = col1.selectbox('Sort values?', ['Yes', 'No'])
 col2.subheader('Price Data of Selected Cryptocurrency')
 col2.write('Data Dimension: ' + str(df_selected_coin.shape[0]) + ' rows and ' + str(df_selected_coin.shape[1]) + ' columns.')
 
-col2.dataframe(df_coins)
+col2.dataframe(df_coins.frame())
+
+if live:
+    col2.subheader('Live Prices')
+    buffer = poller.buffers[currency_price_unit]
+    live_coins = list(df_coins.column('coin_symbol')[:10])
+    times, prices = buffer.window(live_coins)
+    col2.write('%d snapshots (last %d kept), top %d coins' % (len(times), buffer.capacity, len(live_coins)))
+    if len(times) > 1:
+        # % change since the first snapshot, so that all coins fit in one chart
+        sparklines = pd.DataFrame(prices / prices[0] * 100 - 100, columns=live_coins,
+                                  index=pd.to_datetime(times, unit='s'))
+        col2.line_chart(sparklines)
+    live_window = col2.selectbox('Rolling change window', ['5 min', '1 h', 'All snapshots'])
+    seconds = {'5 min': 300, '1 h': 3600, 'All snapshots': float('inf')}[live_window]
+    col2.dataframe(pd.DataFrame({'percent_change': buffer.change(live_coins, seconds)}, index=live_coins))
 
 # Download CSV data
 # https://discuss.streamlit.io/t/how-to-download-file-in-streamlit/1806
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="crypto.csv">Download CSV File</a>'
-    return href
-
-col2.markdown(filedownload(df_selected_coin), unsafe_allow_html=True)
+download_buttons(df_selected_coin, 'crypto', container=col2)
 
 #---------------------------------#
 # Preparing data for Bar plot of % Price change
 col2.subheader('Table of % Price Change')
-df_change = pd.concat([df_coins.coin_symbol, df_coins.percent_change_1h, df_coins.percent_change_24h, df_coins.percent_change_7d], axis=1)
+# Only the 4 columns are gathered, once (instead of a concat of copies)
+df_change = df_coins.frame(['coin_symbol', 'percent_change_1h', 'percent_change_24h', 'percent_change_7d'])
 df_change = df_change.set_index('coin_symbol')
 df_change['positive_percent_change_1h'] = df_change['percent_change_1h'] > 0
 df_change['positive_percent_change_24h'] = df_change['percent_change_24h'] > 0
 df_change['positive_percent_change_7d'] = df_change['percent_change_7d'] > 0
+memory.track('df_change', df_change)
 col2.dataframe(df_change)
 
-# Conditional creation of Bar plot (time frame)
-col3.subheader('Bar plot of % Price Change')
+# Bar plot of the selected time frame
+# Sort orders and signs are computed once per snapshot and the rendered
+# charts are memoized on (snapshot, currency, time frame, sort, selection),
+# in a memo shared by all sessions (see common/changes.py).
+# At most MAX_BARS bars are drawn (the largest gains and losses),
+# and the figure height follows the number of bars.
+@resource_cache()
+def load_change_charts():
+    return ChangeCharts()
 
-if percent_timeframe == '7d':
-    if sort_values == 'Yes':
-        df_change = df_change.sort_values(by=['percent_change_7d'])
-    col3.write('*7 days period*')
-    fig = plt.figure(figsize=(5,25))
-    plt.subplots_adjust(top = 1, bottom = 0)
-    df_change['percent_change_7d'].plot(kind='barh', color=df_change.positive_percent_change_7d.map({True: 'g', False: 'r'}))
-    #col3.pyplot(plt)
-    col3.pyplot(fig)
-elif percent_timeframe == '24h':
-    if sort_values == 'Yes':
-        df_change = df_change.sort_values(by=['percent_change_24h'])
-    col3.write('*24 hour period*')
-    fig = plt.figure(figsize=(5,25))
-    plt.subplots_adjust(top = 1, bottom = 0)
-    df_change['percent_change_24h'].plot(kind='barh', color=df_change.positive_percent_change_24h.map({True: 'g', False: 'r'}))
-    #col3.pyplot(plt)
-    col3.pyplot(fig)
-else:
-    if sort_values == 'Yes':
-        df_change = df_change.sort_values(by=['percent_change_1h'])
-    col3.write('*1 hour period*')
-    fig = plt.figure(figsize=(5,25))
-    plt.subplots_adjust(top = 1, bottom = 0)
-    df_change['percent_change_1h'].plot(kind='barh', color=df_change.positive_percent_change_1h.map({True: 'g', False: 'r'}))
-    #col3.pyplot(plt)
-    col3.pyplot(fig)
+col3.subheader('Bar plot of % Price Change')
+if len(df_coins) > MAX_BARS:
+    col3.write('Largest %d gains and losses of %d coins' % (MAX_BARS // 2, len(df_coins)))
+col3.write({'7d': '*7 days period*', '24h': '*24 hour period*', '1h': '*1 hour period*'}[percent_timeframe])
+with metrics.section('bar_chart'):
+    png = load_change_charts().chart((pages, snapshot_id), currency_price_unit, df, df_coins.positions,
+                                     percent_timeframe, sort_values == 'Yes')
+col3.image(png)
+
+metrics.rerun_finished()
+
+# Live mode: rerun after the next poll (at most POLL_INTERVAL s, even if it fails)
+# Wait in short steps: a widget change reruns the script right away
+if live:
+    seen = poller.cache.fetch_count
+    deadline = time.time() + POLL_INTERVAL
+    while poller.cache.fetch_count == seen and time.time() < deadline:
+        time.sleep(0.5)
+        yield_to_session()
+    # st.experimental_rerun() before Streamlit 1.27
+    (st.rerun if hasattr(st, 'rerun') else st.experimental_rerun)()
@@ -1,7 +1,18 @@
 import streamlit as st
 import pandas as pd
-from sklearn import datasets
-from sklearn.ensemble import RandomForestClassifier
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import metrics, model_tasks, offload
+from common.caching import resource_cache
+from common.lazy import lazy_import
+
+# scikit-learn is imported at the point of use, after the inputs are shown (see common/lazy.py)
+datasets = lazy_import('sklearn.datasets')
+ensemble = lazy_import('sklearn.ensemble')
+
+metrics.rerun_started('iris') # Timing of the hot paths (see common/metrics.py)
 
 st.write("""
 # Simple Iris Flower Prediction App
@@ -29,20 +40,27 @@ df = user_input_features()
 st.subheader('User Input parameters')
 st.write(df)
 
-iris = datasets.load_iris()
-X = iris.data
-Y = iris.target
-
 # This is not the best way:
 # We should not train when the app is opened,
 # instead we should load the trained model pipeline,
 # e.g., from a pickle.
-clf = RandomForestClassifier()
-clf.fit(X, Y)
+# At least, the model is trained once per process and shared by all sessions,
+# in the shared process pool, so the other sessions don't wait for the fit (see common/offload.py)
+@resource_cache()
+def load_model():
+    iris = datasets.load_iris()
+    X = iris.data
+    Y = iris.target
+    with metrics.section('fit'):
+        clf = offload.run(model_tasks.fit, ensemble.RandomForestClassifier(), X, Y, timeout=60)
+    return iris, clf
+
+iris, clf = load_model()
 
 # Perform prediction and display
-prediction = clf.predict(df)
-prediction_proba = clf.predict_proba(df)
+with metrics.section('predict'):
+    prediction = clf.predict(df)
+    prediction_proba = clf.predict_proba(df)
 
 st.subheader('Class labels and their corresponding index number')
 st.write(iris.target_names)
@@ -53,3 +71,5 @@ st.write(iris.target_names[prediction])
 
 st.subheader('Prediction Probability')
 st.write(prediction_proba)
+
+metrics.rerun_finished()
@@ -2,7 +2,18 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.ensemble import RandomForestClassifier
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import metrics
+from common.caching import data_cache, resource_cache
+
+# Files are read next to this script: the apps also run from the repository
+# root, as pages of the multipage host (multipage/Home.py)
+APP_DIR = os.path.dirname(os.path.realpath(__file__))
+
+metrics.rerun_started('penguins') # Timing of the hot paths (see common/metrics.py)
 
 st.write("""
 # Penguin Prediction App
@@ -42,7 +53,11 @@ else:
 
 # Combines user input features with entire penguins dataset
 # This will be useful for the encoding phase
-penguins_raw = pd.read_csv('penguins_cleaned.csv')
+@data_cache()
+def load_penguins():
+    return pd.read_csv(os.path.join(APP_DIR, 'penguins_cleaned.csv'))
+
+penguins_raw = load_penguins()
 penguins = penguins_raw.drop(columns=['species'])
 df = pd.concat([input_df,penguins],axis=0)
 
@@ -66,12 +81,19 @@ else:
     st.write('Awaiting CSV file to be uploaded. Currently using example input parameters (shown below).')
     st.write(df)
 
-# Reads in saved classification model
-load_clf = pickle.load(open('penguins_clf.pkl', 'rb'))
+# Reads in saved classification model, once per process (shared by all sessions)
+# (scikit-learn is imported here, by pickle)
+@resource_cache()
+def load_saved_model():
+    with open(os.path.join(APP_DIR, 'penguins_clf.pkl'), 'rb') as f:
+        return pickle.load(f)
+
+load_clf = load_saved_model()
 
 # Apply model to make predictions
-prediction = load_clf.predict(df)
-prediction_proba = load_clf.predict_proba(df)
+with metrics.section('predict'):
+    prediction = load_clf.predict(df)
+    prediction_proba = load_clf.predict_proba(df)
 
 
 st.subheader('Prediction')
@@ -80,3 +102,5 @@ st.write(penguins_species[prediction])
 
 st.subheader('Prediction Probability')
 st.write(prediction_proba)
+
+metrics.rerun_finished()
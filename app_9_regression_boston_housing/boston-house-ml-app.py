@@ -1,10 +1,23 @@
 import streamlit as st
 import pandas as pd
-import shap
-import matplotlib.pyplot as plt
-from sklearn import datasets
-from sklearn.ensemble import RandomForestRegressor
 import numpy as np
+import io
+import os
+import sys
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import fetch, metrics, model_tasks, offload
+from common.caching import data_cache, resource_cache
+from common.lazy import lazy_import
+
+# Heavy libraries are imported at the point of use, so the inputs and the
+# prediction are shown before SHAP is loaded (see common/lazy.py)
+shap = lazy_import('shap')
+plt = lazy_import('matplotlib.pyplot')
+datasets = lazy_import('sklearn.datasets')
+ensemble = lazy_import('sklearn.ensemble')
+
+metrics.rerun_started('boston') # Timing of the hot paths (see common/metrics.py)
 
 st.write("""
 # Boston House Price Prediction App
@@ -37,13 +50,21 @@ feature_dict = {
 }
 feature_names = ['CRIM', 'ZN', 'INDUS', 'CHAS', 'NOX', 'RM', 'AGE', 'DIS', 'RAD', 'TAX', 'PTRATIO', 'B', 'LSTAT']
 data_url = "http://lib.stat.cmu.edu/datasets/boston"
-raw_df = pd.read_csv(data_url, sep="\s+", skiprows=22, header=None)
-data = np.hstack([raw_df.values[::2, :], raw_df.values[1::2, :2]])
-target = raw_df.values[1::2, 2]
-X = pd.DataFrame(data, columns=feature_names)
-Y = pd.DataFrame(target, columns=["MEDV"])
-X = X.astype('float64')
-Y = Y.astype('float64')
+# Downloaded once per process (see common/caching.py)
+@metrics.timed('load_data')
+@data_cache()
+def load_data():
+    # The file doesn't change: downloaded once, then served from the disk cache of common/fetch.py
+    raw_df = pd.read_csv(io.BytesIO(fetch.content(data_url, ttl=None)), sep="\s+", skiprows=22, header=None)
+    data = np.hstack([raw_df.values[::2, :], raw_df.values[1::2, :2]])
+    target = raw_df.values[1::2, 2]
+    X = pd.DataFrame(data, columns=feature_names)
+    Y = pd.DataFrame(target, columns=["MEDV"])
+    X = X.astype('float64')
+    Y = Y.astype('float64')
+    return X, Y
+
+X, Y = load_data()
 
 # Sidebar
 # Header of Specify Input Parameters
@@ -89,10 +110,18 @@ st.write(df)
 st.write('---')
 
 # Build Regression Model
-model = RandomForestRegressor()
-model.fit(X, Y)
+# Trained once per process and shared by all sessions (the data doesn't change),
+# in the shared process pool, so the other sessions don't wait for the fit (see common/offload.py)
+@resource_cache()
+def load_model():
+    X, Y = load_data()
+    with metrics.section('fit'):
+        return offload.run(model_tasks.fit, ensemble.RandomForestRegressor(), X, Y, timeout=60)
+
+model = load_model()
 # Apply Model to Make Prediction
-prediction = model.predict(df)
+with metrics.section('predict'):
+    prediction = model.predict(df)
 
 st.header('Prediction of MEDV')
 st.write(prediction)
@@ -100,17 +129,26 @@ st.write('---')
 
 # Explaining the model's predictions using SHAP values
 # https://github.com/slundberg/shap
-explainer = shap.TreeExplainer(model)
-shap_values = explainer.shap_values(X)
+# The SHAP values of the training data depend only on the model: computed once too
+@resource_cache()
+def load_shap_values():
+    with metrics.section('shap_values'):
+        return offload.run(model_tasks.shap_values, load_model(), load_data()[0], timeout=120)
+
+shap_values = load_shap_values()
 
 st.header('Feature Importance')
-fig1 = plt.figure()
-plt.title('Feature importance based on SHAP values')
-shap.summary_plot(shap_values, X)
+with metrics.section('shap_plots'):
+    fig1 = plt.figure()
+    plt.title('Feature importance based on SHAP values')
+    shap.summary_plot(shap_values, X)
 st.pyplot(fig1, bbox_inches='tight')
 st.write('---')
 
-fig2 = plt.figure()
-plt.title('Feature importance based on SHAP values (Bar)')
-shap.summary_plot(shap_values, X, plot_type="bar")
+with metrics.section('shap_plots'):
+    fig2 = plt.figure()
+    plt.title('Feature importance based on SHAP values (Bar)')
+    shap.summary_plot(shap_values, X, plot_type="bar")
 st.pyplot(fig2, bbox_inches='tight')
+
+metrics.rerun_finished()
@@ -0,0 +1,177 @@
+"""Local stand-ins for the network sources of the apps, for benchmarks.
+
+install() patches, in the current process:
+
+- the session of common/fetch.py: requests to basketball-reference
+  (app 3), pro-football-reference (app 4), the Wikipedia list of S&P 500
+  companies (app 5) and the Boston housing dataset (app 9) are answered by
+  FixtureAdapter with generated pages with the same columns (including
+  the repeated header rows), with an ETag, so that conditional requests
+  get a 304 as from the real servers
+- pandas.read_html: the generated pages are recognized by a marker and
+  returned as tables without parsing the HTML (as the real pages would be)
+- common.prices.YahooProvider.fetch: synthetic price histories (apps 1 and 5)
+- CMC_URL: a local common.cmc.fixture_server (app 6)
+
+Everything else (local files, models) is used as it is.
+"""
+import html
+import io
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+import requests
+
+from common import cmc, fetch, prices
+
+TEAMS = ['ATL', 'BOS', 'BRK', 'CHI', 'CHO', 'CLE', 'DAL', 'DEN', 'DET', 'GSW', 'HOU', 'IND', 'LAC', 'LAL', 'MEM',
+         'MIA', 'MIL', 'MIN', 'NOP', 'NYK', 'OKC', 'ORL', 'PHI', 'PHO', 'POR', 'SAC', 'SAS', 'TOR', 'UTA', 'WAS']
+NBA_STATS = ['G', 'GS', 'MP', 'FG', 'FGA', 'FG%', '3P', '3PA', '3P%', '2P', '2PA', '2P%', 'eFG%', 'FT', 'FTA',
+             'FT%', 'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS']
+NFL_STATS = ['G', 'GS', 'Att', 'Yds', 'TD', '1D', 'Lng', 'Y/A', 'Y/G', 'Fmb']
+SECTORS = ['Communication Services', 'Consumer Discretionary', 'Consumer Staples', 'Energy', 'Financials',
+           'Health Care', 'Industrials', 'Information Technology', 'Materials', 'Real Estate', 'Utilities']
+BOSTON_COLUMNS = 14
+MARKER = '<!-- fixture: '
+
+
+def _seed(text):
+    return zlib.crc32(str(text).encode())
+
+
+def player_table(year, positions, stats, n_players, seed):
+    """Season table as read_html returns it: all columns as strings,
+    with a repeated header row every 20 rows."""
+    rng = np.random.default_rng(seed)
+    columns = ['Rk', 'Player', 'Pos', 'Age', 'Tm'] + stats
+    rows = []
+    for i in range(n_players):
+        if i and i % 20 == 0:
+            rows.append(columns)
+        values = ['%.3f' % v if '%' in stat or '/' in stat else '%.1f' % v
+                  for stat, v in zip(stats, rng.gamma(2.0, 5.0, len(stats)))]
+        rows.append([str(i + 1), 'Player %d %d' % (year, i), rng.choice(positions), str(rng.integers(20, 38)),
+                     rng.choice(TEAMS)] + values)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def nba_per_game(year):
+    return player_table(year, ['C', 'PF', 'SF', 'PG', 'SG'], NBA_STATS, 500, _seed(('nba', year)))
+
+
+def nfl_rushing(year):
+    return player_table(year, ['RB', 'QB', 'WR', 'FB', 'TE'], NFL_STATS, 300, _seed(('nfl', year)))
+
+
+def sp500_table(n=503):
+    rng = np.random.default_rng(0)
+    symbols = ['S%03d' % i for i in range(n)]
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Security': ['Company %d' % i for i in range(n)],
+        'GICS Sector': rng.choice(SECTORS, n),
+        'GICS Sub-Industry': 'Sub-Industry',
+        'Headquarters Location': 'City, State',
+        'Date added': '2000-01-01',
+        'CIK': np.arange(n),
+        'Founded': '1900',
+    })
+
+
+def boston_text(n=506):
+    """The layout of http://lib.stat.cmu.edu/datasets/boston:
+    22 lines of description, then each record over 2 lines (11 + 3 values)."""
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 5.0, (n, BOSTON_COLUMNS))
+    values[:, 3] = rng.integers(0, 2, n)  # CHAS
+    lines = ['description'] * 22
+    for record in values:
+        lines.append(' '.join('%.4f' % v for v in record[:11]))
+        lines.append(' '.join('%.4f' % v for v in record[11:]))
+    return '\n'.join(lines) + '\n'
+
+
+def html_page(source, table, over_header=False):
+    """A page with the table; over_header adds a first header row (as in pro-football-reference)."""
+    columns = ''.join(f'<th>{html.escape(str(c))}</th>' for c in table.columns)
+    over = f'<tr><th colspan="{len(table.columns)}"></th></tr>' if over_header else ''
+    rows = ''.join('<tr>' + ''.join(f'<td>{html.escape(str(v))}</td>' for v in row) + '</tr>'
+                   for row in table.itertuples(index=False))
+    return (f'{MARKER}{source} -->\n<html><body><table><thead>{over}<tr>{columns}</tr></thead>'
+            f'<tbody>{rows}</tbody></table></body></html>').encode()
+
+
+def fixture_body(url):
+    """(body, content type) of a fixture source, or None."""
+    if 'basketball-reference.com' in url:
+        return html_page(url, nba_per_game(int(url.split('NBA_')[1][:4]))), 'text/html; charset=utf-8'
+    if 'pro-football-reference.com' in url:
+        return html_page(url, nfl_rushing(int(url.split('/years/')[1][:4])), True), 'text/html; charset=utf-8'
+    if 'List_of_S%26P_500_companies' in url:
+        return html_page(url, sp500_table()), 'text/html; charset=utf-8'
+    if 'lib.stat.cmu.edu/datasets/boston' in url:
+        return boston_text().encode(), 'text/plain; charset=utf-8'
+    return None
+
+
+class FixtureAdapter(requests.adapters.BaseAdapter):
+    """Transport of requests answering with fixture_body(); 304 if the ETag matches."""
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        found = fixture_body(request.url)
+        if found is None:
+            response.status_code, response._content = 404, b''
+            return response
+        body, content_type = found
+        etag = '"%08x"' % zlib.crc32(body)
+        response.headers['Content-Type'] = content_type
+        response.headers['ETag'] = etag
+        if request.headers.get('If-None-Match') == etag:
+            response.status_code, response._content = 304, b''
+        else:
+            response.status_code, response._content = 200, body
+        response.headers['Content-Length'] = str(len(response._content))
+        return response
+
+    def close(self):
+        pass
+
+
+def read_html(io_or_url, *args, **kwargs):
+    """Generated pages -> their table; anything else -> pandas.read_html."""
+    text = io_or_url.getvalue() if isinstance(io_or_url, io.StringIO) else ''
+    if text.startswith(MARKER):
+        url = text[len(MARKER):text.index(' -->')]
+        if 'basketball-reference.com' in url:
+            return [nba_per_game(int(url.split('NBA_')[1][:4]))]
+        if 'pro-football-reference.com' in url:
+            return [nfl_rushing(int(url.split('/years/')[1][:4]))]
+        return [sp500_table()]
+    return _read_html(io_or_url, *args, **kwargs)
+
+
+def yahoo_fetch(self, symbol, start, end=None):
+    end = pd.Timestamp.today().normalize() if end is None else pd.Timestamp(end)
+    return prices.synthetic_history([symbol], start, end, seed=_seed(symbol))[symbol]
+
+
+_read_html = pd.read_html
+HOSTS = ['https://www.basketball-reference.com/', 'https://www.pro-football-reference.com/',
+         'https://en.wikipedia.org/', 'http://lib.stat.cmu.edu/']
+
+
+def install():
+    """Patch the network sources (see the module docstring); returns the CMC server."""
+    session = fetch.default().session
+    for host in HOSTS:
+        session.mount(host, FixtureAdapter())
+    pd.read_html = read_html
+    prices.YahooProvider.fetch = yahoo_fetch
+    server = cmc.fixture_server(n_coins=100)
+    os.environ['CMC_URL'] = f'http://127.0.0.1:{server.server_port}'
+    return server
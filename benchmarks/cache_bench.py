@@ -0,0 +1,97 @@
+"""Benchmark: cache-hit overhead with large dataframes.
+
+Builds a frame of --gb gigabytes (float64 columns) and times one cache hit
+of a function that returns it, and of a function that takes it as argument:
+
+- legacy st.cache: hash of the arguments and of the return value on every
+  hit (large frames sampled with df.sample(10000, random_state=0), as the
+  legacy hasher does), i.e., the mutation check without allow_output_mutation
+- copy on read: a pickle round trip of the value, as caches that return
+  a fresh copy on every hit do
+- data_cache: common.caching, fingerprint keys, value returned as is
+- data_cache (disk tier): a hit after a restart, read from the pickle file
+
+Needs about 3x --gb of free memory (--gb 1 by default).
+
+Usage (from the repository root):
+
+    $ python benchmarks/cache_bench.py --gb 1
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.caching import data_cache, fingerprint
+
+
+def legacy_hash(obj):
+    """What the legacy st.cache hasher computes for a dataframe."""
+    if len(obj) >= 100_000:
+        obj = obj.sample(n=10_000, random_state=0)
+    return pd.util.hash_pandas_object(obj).sum()
+
+
+def best_ms(func, repeat):
+    """Best of repeat runs in ms."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--gb', type=float, default=1.0, help='size of the frame in GB')
+    parser.add_argument('--columns', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = int(args.gb * 1e9 / 8 / args.columns)
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.random((rows, args.columns)), columns=[f'c{i}' for i in range(args.columns)])
+    print(f'Frame: {rows} rows x {args.columns} columns, {frame.memory_usage().sum() / 1e9:.2f} GB')
+    print()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        @data_cache(persist=tmp)
+        def load():
+            return frame
+
+        @data_cache()
+        def summarize(df):
+            return df.iloc[:10]
+
+        load()
+        summarize(frame)
+
+        def disk_hit():
+            load.cache.clear(disk=False)
+            load()
+
+        runs = [
+            ('legacy st.cache: output', lambda: legacy_hash(frame)),
+            ('copy on read (pickle)', lambda: pickle.loads(pickle.dumps(frame, protocol=5))),
+            ('data_cache: output', load),
+            ('legacy st.cache: argument', lambda: legacy_hash(frame)),
+            ('data_cache: argument', lambda: summarize(frame)),
+            ('fingerprint() alone', lambda: fingerprint(frame)),
+            ('data_cache: disk tier', disk_hit),
+        ]
+        print(f'{"cache hit":<28}{"best [ms]":>12}')
+        for label, func in runs:
+            print(f'{label:<28}{best_ms(func, args.repeat):>12.2f}')
+        print()
+        print(load.cache.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: parsing a CoinMarketCap page into the crypto app dataframe.
+
+Compares, per page:
+
+- legacy: BeautifulSoup over the whole page, json.loads() and per-row
+  lists, as load_data() in the crypto app used to do
+- fast: common.cmc.coins_frame()
+
+Pages are saved HTML files (e.g., `curl -o pages/cmc.html https://coinmarketcap.com`)
+or fixture pages with the same structure, generated with common.cmc.fixture_page();
+--save writes the generated pages so that runs can be repeated with the same files.
+
+Usage (from the repository root):
+
+    $ python benchmarks/cmc_parse_bench.py --coins 100 1000 5000
+    $ python benchmarks/cmc_parse_bench.py --pages pages/
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from bs4 import BeautifulSoup
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.cmc import coins_frame, fixture_page
+
+
+def legacy_parse(html, currency_price_unit='USD'):
+    """load_data() of the crypto app before common.cmc, without the request."""
+    soup = BeautifulSoup(html, 'html.parser')
+    data = soup.find('script', id='__NEXT_DATA__', type='application/json')
+    coin_data = json.loads(data.contents[0])
+    coin_data_ = json.loads(coin_data['props']['initialState'])
+    listings = coin_data_['cryptocurrency']['listingLatest']['data']
+    keys = listings[0]['keysArr']
+    key2idx = {keys[i]: i for i in range(len(keys))}
+    columns = {name: [] for name in ['coin_name', 'coin_symbol', 'market_cap', 'percent_change_1h',
+                                     'percent_change_24h', 'percent_change_7d', 'price', 'volume_24h']}
+    key_base = 'quote.' + currency_price_unit
+    for i in listings[1:]:
+        columns['coin_name'].append(i[key2idx['slug']])
+        columns['coin_symbol'].append(i[key2idx['symbol']])
+        columns['price'].append(i[key2idx[key_base + '.price']])
+        columns['percent_change_1h'].append(i[key2idx[key_base + '.percentChange1h']])
+        columns['percent_change_24h'].append(i[key2idx[key_base + '.percentChange24h']])
+        columns['percent_change_7d'].append(i[key2idx[key_base + '.percentChange7d']])
+        columns['market_cap'].append(i[key2idx[key_base + '.marketCap']])
+        columns['volume_24h'].append(i[key2idx[key_base + '.volume24h']])
+    return pd.DataFrame(columns)
+
+
+def best_ms(func, html, repeat):
+    """Median time of repeat runs in ms."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        times.append((time.perf_counter() - start) * 1000)
+    return float(np.median(times))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', help='folder with saved pages (*.html)')
+    parser.add_argument('--coins', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='coins per generated fixture page (without --pages)')
+    parser.add_argument('--save', help='folder where the generated fixture pages are written')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.pages:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(args.pages, '*.html'))):
+            with open(path, 'rb') as f:
+                pages[os.path.basename(path)] = f.read()
+    else:
+        pages = {f'fixture_{n}.html': fixture_page(n) for n in args.coins}
+        if args.save:
+            os.makedirs(args.save, exist_ok=True)
+            for name, html in pages.items():
+                with open(os.path.join(args.save, name), 'wb') as f:
+                    f.write(html)
+
+    print(f'{"page":<22}{"size [MB]":>10}{"coins":>8}{"legacy [ms]":>13}{"fast [ms]":>11}{"speedup":>9}')
+    for name, html in pages.items():
+        fast = coins_frame(html)
+        pd.testing.assert_frame_equal(fast, legacy_parse(html), check_dtype=False)
+        legacy_ms = best_ms(legacy_parse, html, args.repeat)
+        fast_ms = best_ms(coins_frame, html, args.repeat)
+        print(f'{name:<22}{len(html) / 1e6:>10.2f}{len(fast):>8}{legacy_ms:>13.1f}{fast_ms:>11.1f}'
+              f'{legacy_ms / fast_ms:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""Benchmark: base64 data-URI links vs. lazy, compressed downloads.
+
+Compares, for a synthetic player-stats-like dataframe:
+
+- legacy: filedownload() as it was copied in the EDA apps;
+  its cost is paid on every rerun and the link is part of the page payload.
+- lazy: common.download; on a regular rerun nothing is serialized,
+  the cost is paid only in the rerun after 'Prepare download',
+  and the page only carries the media URL of the download button.
+
+Both run in Streamlit's bare mode (no server): download_buttons() as in a
+rerun without and with a click on 'Prepare download', the legacy link
+through st.markdown() as in the apps. The payload is the serialized size
+of the elements the call sends to the browser. In bare mode the download
+button has no media URL yet: MEDIA_URL_BYTES is added for it.
+
+Usage (from the repository root):
+
+    $ python benchmarks/download_bench.py --rows 1000000
+"""
+import argparse
+import base64
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit import logger as st_logger
+from streamlit.delta_generator import DeltaGenerator
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.download import FORMATS, download_buttons
+
+# st.download_button only sends something like this to the browser
+MEDIA_URL_BYTES = len('/media/0123456789abcdef0123456789abcdef0123456789abcdef01234567.gz')
+
+
+def make_frame(rows, seed=0):
+    """Dataframe with the column mix of the scraped NBA tables."""
+    rng = np.random.default_rng(seed)
+    teams = np.array(['ATL', 'BOS', 'BRK', 'CHI', 'DAL', 'DEN', 'GSW', 'LAL', 'MIA', 'NYK'])
+    positions = np.array(['C', 'PF', 'SF', 'PG', 'SG'])
+    df = pd.DataFrame({
+        'Player': ['Player ' + str(i) for i in rng.integers(0, 50_000, rows)],
+        'Pos': positions[rng.integers(0, len(positions), rows)],
+        'Age': rng.integers(19, 40, rows),
+        'Tm': teams[rng.integers(0, len(teams), rows)],
+    })
+    for col in ['G', 'MP', 'FG', 'FGA', 'FG%', '3P', '3PA', 'TRB', 'AST', 'PTS']:
+        df[col] = rng.random(rows).round(3) * 40
+    return df
+
+
+def filedownload(df):
+    """The legacy helper, verbatim."""
+    csv = df.to_csv(index=False)
+    b64 = base64.b64encode(csv.encode()).decode()
+    href = f'<a href="data:file/csv;base64,{b64}" download="playerstats.csv">Download CSV File</a>'
+    return href
+
+
+def legacy_rerun(df):
+    """What the EDA apps did on every rerun."""
+    st.markdown(filedownload(df), unsafe_allow_html=True)
+
+
+class Browser:
+    """Stands in for st as the container of download_buttons(): the user's choices in a rerun.
+
+    file_bytes: size of the file handed to the download button, if any.
+    """
+
+    def __init__(self, fmt, clicked):
+        self.fmt = fmt
+        self.clicked = clicked
+        self.file_bytes = None
+
+    def __getattr__(self, name):
+        return getattr(st, name)
+
+    def selectbox(self, *args, **kwargs):
+        st.selectbox(*args, **kwargs)
+        return self.fmt
+
+    def button(self, *args, **kwargs):
+        st.button(*args, **kwargs)
+        return self.clicked
+
+    def download_button(self, label, data, **kwargs):
+        self.file_bytes = len(data)
+        return st.download_button(label, data, **kwargs)
+
+
+@contextlib.contextmanager
+def recorded_payload():
+    """Serialized bytes of the elements sent in the block, one entry per element."""
+    sizes = []
+    enqueue = DeltaGenerator._enqueue
+
+    def record(self, delta_type, element_proto, *args, **kwargs):
+        sizes.append((delta_type, element_proto.ByteSize()))
+        return enqueue(self, delta_type, element_proto, *args, **kwargs)
+
+    DeltaGenerator._enqueue = record
+    try:
+        yield sizes
+    finally:
+        DeltaGenerator._enqueue = enqueue
+
+
+def measure(func, *args):
+    """Run func twice: once timed, once traced (tracemalloc slows it down).
+
+    Returns (seconds, peak traced MB, payload bytes); the payload counts a
+    media URL for each download button.
+    """
+    with recorded_payload() as sizes:
+        start = time.perf_counter()
+        func(*args)
+        seconds = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    payload = sum(size + (MEDIA_URL_BYTES if kind == 'download_button' else 0) for kind, size in sizes)
+    return seconds, peak / 1e6, payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+    # Bare mode: no warnings about the missing ScriptRunContext
+    st_logger.set_log_level('error')
+
+    df = make_frame(args.rows)
+    frame_mb = df.memory_usage(deep=True).sum() / 1e6
+    print(f'Frame: {args.rows} rows, {frame_mb:.1f} MB in memory')
+    print()
+    print(f'{"variant":<24}{"when":<14}{"time [ms]":>10}{"peak [MB]":>12}{"payload [MB]":>14}{"file [MB]":>12}')
+
+    seconds, peak, payload = measure(legacy_rerun, df)
+    print(f'{"legacy base64 link":<24}{"every rerun":<14}{seconds * 1000:>10.1f}{peak:>12.3f}{payload / 1e6:>14.4f}{"-":>12}')
+
+    seconds, peak, payload = measure(download_buttons, df, 'playerstats', Browser(next(iter(FORMATS)), False))
+    print(f'{"lazy (no click)":<24}{"every rerun":<14}{seconds * 1000:>10.1f}{peak:>12.3f}{payload / 1e6:>14.4f}{"-":>12}')
+    for fmt in FORMATS:
+        browser = Browser(fmt, True)
+        seconds, peak, payload = measure(download_buttons, df, 'playerstats', browser)
+        print(f'{"lazy " + fmt:<24}{"on click":<14}{seconds * 1000:>10.1f}{peak:>12.3f}{payload / 1e6:>14.4f}'
+              f'{browser.file_bytes / 1e6:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
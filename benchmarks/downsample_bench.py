@@ -0,0 +1,64 @@
+"""Benchmark: chart payload and server time with and without downsampling.
+
+st.line_chart() serializes the dataframe to Arrow and sends it to the
+browser, where Vega-Lite renders every point. This compares, for a
+daily series (10 years) and an intraday one (~1M points):
+
+- raw: all points
+- lttb / minmax: common.downsample to --points points
+
+reporting the Arrow payload size and the server-side time
+(downsampling + Arrow serialization). Browser render time grows
+roughly linearly with the number of points, so the point count
+is the figure to compare for it.
+
+Usage (from the repository root):
+
+    $ python benchmarks/downsample_bench.py --points 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.downsample import METHODS, downsample
+
+
+def arrow_bytes(series):
+    """Size of the Arrow IPC stream of the chart data, as Streamlit ships it."""
+    table = pa.Table.from_pandas(series.to_frame())
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def make_series(freq, periods, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2010-05-31', periods=periods, freq=freq, name='Date')
+    return pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.001, periods))), index=index, name='Close')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000)
+    args = parser.parse_args()
+
+    cases = [('daily, 10 years', make_series('B', 2610)), ('intraday, ~1M', make_series('min', 1_000_000))]
+    print(f'{"series":<18}{"method":<8}{"points":>10}{"payload [KB]":>14}{"server [ms]":>13}')
+    for label, series in cases:
+        for method in ['raw'] + METHODS:
+            start = time.perf_counter()
+            data = series if method == 'raw' else downsample(series, args.points, method)
+            size = arrow_bytes(data)
+            ms = (time.perf_counter() - start) * 1000
+            print(f'{label:<18}{method:<8}{len(data):>10}{size / 1e3:>14.1f}{ms:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: import time at startup, per app (python -X importtime).
+
+Each app (scenario of benchmarks/rerun_bench.py) is run once, headless,
+in a fresh interpreter with -X importtime, and the report of the
+interpreter is summarized:
+
+- imports: milliseconds spent importing modules in the whole run
+  (the benchmark harness itself, numpy and pandas, included)
+- heavy libraries: which of matplotlib, seaborn, shap, rdkit, altair,
+  sklearn and st_aggrid were imported, with the import time of their modules
+
+Heavy libraries imported lazily (common/lazy.py) only show up when
+the run goes through the code that uses them (e.g., pass
+--apps basketball basketball-heatmap to see both paths).
+
+--compare <git ref> runs the same on the tree at that ref (e.g.,
+HEAD~1), to confirm the savings of a change.
+
+Usage (from the repository root):
+
+    $ python benchmarks/import_bench.py
+    $ python benchmarks/import_bench.py --apps basketball boston --compare HEAD~1
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from rerun_bench import APPS, ROOT, copy_repository
+
+HEAVY = ['matplotlib', 'seaborn', 'shap', 'rdkit', 'altair', 'sklearn', 'st_aggrid']
+
+
+def parse_importtime(stderr):
+    """(total ms, {heavy library: ms}) from the -X importtime report.
+
+    Self times are summed: the nesting of the report is not reliable for
+    imports that happen while the app runs (the package line may be missing).
+    A library's time is that of its own modules (not of its dependencies).
+    """
+    total = 0
+    heavy = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        total += int(own)
+        package = name.strip().split('.')[0]
+        if package in HEAVY:
+            heavy[package] = heavy.get(package, 0) + int(own) / 1000
+    return total / 1000, heavy
+
+
+def checkout(ref, folder):
+    """The tree at git ref in folder, with the current benchmarks/ (the harness)."""
+    os.makedirs(folder)
+    archive = subprocess.run(['git', '-C', ROOT, 'archive', ref], capture_output=True, check=True)
+    subprocess.run(['tar', '-x', '-C', folder], input=archive.stdout, check=True)
+    shutil.copytree(os.path.join(ROOT, 'benchmarks'), os.path.join(folder, 'benchmarks'), dirs_exist_ok=True,
+                    ignore=shutil.ignore_patterns('__pycache__'))
+
+
+def measure(app, ref, timeout):
+    """(total ms, heavy) of one run of app, or {'error': ...}."""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        if ref:
+            checkout(ref, copy)
+        else:
+            copy_repository(copy)
+        proc = subprocess.run([sys.executable, '-X', 'importtime', os.path.join(copy, 'benchmarks', 'rerun_bench.py'),
+                               '--worker', app, '--reruns', '1', '--started', repr(time.time())],
+                              capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.splitlines() if line.strip() and not line.startswith('import time:')]
+        return {'error': lines[-1] if lines else f'exit code {proc.returncode}'}
+    return parse_importtime(proc.stderr)
+
+
+def describe(heavy):
+    return ', '.join(f'{name} {ms:.0f}' for name, ms in sorted(heavy.items(), key=lambda item: -item[1])) or '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', nargs='+', choices=list(APPS), default=list(APPS))
+    parser.add_argument('--compare', metavar='REF', help='git ref to compare with, e.g., HEAD~1')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per app')
+    args = parser.parse_args()
+
+    trees = [(args.compare, args.compare), ('working tree', None)] if args.compare else [('working tree', None)]
+    print(f'{"app":<20}{"tree":<14}{"imports [ms]":>14}  heavy libraries [ms]')
+    for app in args.apps:
+        for label, ref in trees:
+            result = measure(app, ref, args.timeout)
+            if isinstance(result, dict):
+                print(f'{app:<20}{label:<14}  skipped: {result["error"]}')
+                continue
+            total, heavy = result
+            print(f'{app:<20}{label:<14}{total:>14.0f}  {describe(heavy)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""Load test: N concurrent browser sessions against a local Streamlit server.
+
+The app is served by a real `streamlit run` process (in a temporary copy
+of the repository), with the network sources replaced by the local
+stand-ins of benchmarks/app_fixtures.py. Each simulated session talks the
+browser's websocket protocol (protobuf BackMsg/ForwardMsg on
+/_stcore/stream, /stream before Streamlit 1.18): it loads the page, then
+repeatedly changes widgets following the scenario of the app (e.g., the
+year, the currency, a slider) and waits for the rerun to finish.
+
+For each number of sessions (--sessions 1 2 4 8), during --duration
+seconds, it reports:
+
+- throughput: finished reruns per second (all sessions)
+- p50 / p95 / p99: milliseconds from the widget change to the end of the rerun
+- errors: exceptions shown by the app, widgets not found, dropped connections
+- cpu / rss: mean CPU (100% = one core) and peak resident memory of the
+  server (and its child processes, if psutil is installed)
+
+Needs the websockets package (pip install websockets).
+
+Usage (from the repository root):
+
+    $ python benchmarks/load_test.py crypto --sessions 1 2 4 8 16 --duration 20
+    $ python benchmarks/load_test.py multipage --sessions 4 --think 0.5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+from rerun_bench import copy_repository
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+try:
+    import psutil
+except ImportError:  # only the server process, from /proc
+    psutil = None
+
+# App -> (script, steps); each step sets widgets by label:
+# selectbox/radio: option, multiselect: list of options, slider: number,
+# checkbox: bool, button: True, text_input/text_area: string
+SCENARIOS = {
+    'stock': ('app_1_simple_stock_price/myapp2.py', [
+        {'Tickers': ['GOOGL', 'AAPL']},
+        {'Tickers': ['MSFT', 'AMZN', 'META']},
+        {'Tickers': ['GOOGL']},
+    ]),
+    'dna': ('app_2_simple_bioinformatics_dna/dna-app.py', [
+        {'Sequence input': '>DNA Query 2\nGAACACGTGGAGGCAAACAGGAAGGTGAAGAAGAACTTATCCTATCAGGACGGAAGGTCCTGTGCTCGGG'},
+        {'Sequence input': '>DNA Query 3\nATCGATCGATTTTTGGGGCCCCAAAAATTTTCCCCGGGG'},
+    ]),
+    'basketball': ('app_3_eda_basketball/basketball_app.py', [
+        {'Year': '2018'},
+        {'Year': '2019', 'Position': ['C', 'PF']},
+        {'Position': ['C', 'PF', 'SF', 'PG', 'SG']},
+    ]),
+    'football': ('app_4_eda_football/football_app.py', [
+        {'Year': '2018'},
+        {'Year': '2019', 'Position': ['RB', 'QB']},
+        {'Position': ['RB', 'QB', 'WR', 'FB', 'TE']},
+    ]),
+    'sp500': ('app_5_eda_sp500_stock/sp500-app.py', [
+        {'Sector': ['Energy', 'Financials']},
+        {'Number of Companies': 3, 'Show Plots': True},
+        {'Sector': ['Energy', 'Financials', 'Health Care', 'Industrials', 'Utilities']},
+    ]),
+    'crypto': ('app_6_eda_cryptocurrency/crypto-price-app.py', [
+        {'Select currency for price': 'BTC'},
+        {'Percent change time frame': '24h'},
+        {'Select currency for price': 'USD', 'Sort values?': 'No'},
+        {'Percent change time frame': '7d', 'Sort values?': 'Yes'},
+    ]),
+    'iris': ('app_7_classification_iris/iris-ml-app.py', [
+        {'Sepal length': 6.1, 'Petal length': 4.5},
+        {'Sepal length': 5.0, 'Petal length': 1.4},
+    ]),
+    'penguins': ('app_8_classification_penguins/penguins-app.py', [
+        {'Island': 'Dream', 'Bill length (mm)': 48.0},
+        {'Island': 'Biscoe', 'Body mass (g)': 5200.0},
+    ]),
+    'boston': ('app_9_regression_boston_housing/boston-house-ml-app.py', [
+        {'RM': 7.0, 'LSTAT': 5.0},
+        {'RM': 6.0, 'LSTAT': 15.0},
+    ]),
+    'solubility': ('app_10_regression_bioinformatics_solubility/solubility-app.py', [
+        {'SMILES input': 'C\nCC(=O)OC1=CC=CC=C1C(=O)O\nCCCCCCCC'},
+        {'SMILES input': 'C\nCCO\nc1ccccc1'},
+    ]),
+    # Home page of the multipage host (the pages are the apps above)
+    'multipage': ('multipage/Home.py', [{}]),
+}
+WIDGETS = {'button', 'checkbox', 'multiselect', 'number_input', 'radio', 'selectbox', 'slider', 'text_area',
+           'text_input'}
+
+
+def widget_state(kind, widget, value):
+    """WidgetState proto setting a widget to value (None if value is not an option)."""
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    state = WidgetState(id=widget.id)
+    options = list(getattr(widget, 'options', []))
+    # Newer Streamlit versions send the options themselves instead of their indices
+    by_value = 'raw_value' in type(widget).DESCRIPTOR.fields_by_name or \
+               'raw_values' in type(widget).DESCRIPTOR.fields_by_name
+    if kind == 'button':
+        state.trigger_value = True
+    elif kind == 'checkbox':
+        state.bool_value = bool(value)
+    elif kind in ('selectbox', 'radio'):
+        if str(value) not in options:
+            return None
+        if by_value:
+            state.string_value = str(value)
+        else:
+            state.int_value = options.index(str(value))
+    elif kind == 'multiselect':
+        if any(str(v) not in options for v in value):
+            return None
+        if by_value:
+            state.string_array_value.data.extend(str(v) for v in value)
+        else:
+            state.int_array_value.data.extend(options.index(str(v)) for v in value)
+    elif kind == 'slider':
+        state.double_array_value.data.extend(value if isinstance(value, (list, tuple)) else [value])
+    elif kind == 'number_input':
+        state.double_value = float(value)
+    else:
+        state.string_value = str(value)
+    return state
+
+
+class Session:
+    """One simulated browser tab; page: name of a page of a multipage app (e.g., 'DNA_Nucleotide_Count')."""
+
+    def __init__(self, url, steps, think, page=''):
+        self.url = url
+        self.steps = steps
+        self.think = think
+        self.page = page
+        self.widgets = {}  # label -> (kind, proto)
+        self.states = {}  # widget id -> WidgetState (persistent values, not triggers)
+        self.latencies = []
+        self.errors = 0
+        self.bytes = 0
+
+    async def rerun(self, ws, triggers=()):
+        """Send a rerun with the current widget states; wait for the end of the script."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.query_string = ''
+        msg.rerun_script.page_script_hash = ''
+        msg.rerun_script.page_name = self.page
+        msg.rerun_script.widget_states.widgets.extend(list(self.states.values()) + list(triggers))
+        start = time.perf_counter()
+        await ws.send(msg.SerializeToString())
+        while True:
+            data = await ws.recv()
+            self.bytes += len(data)
+            fwd = ForwardMsg()
+            fwd.ParseFromString(data)
+            kind = fwd.WhichOneof('type')
+            if kind == 'script_finished':
+                return time.perf_counter() - start
+            if kind == 'delta' and fwd.delta.WhichOneof('type') == 'new_element':
+                element = fwd.delta.new_element
+                element_kind = element.WhichOneof('type')
+                if element_kind in WIDGETS:
+                    widget = getattr(element, element_kind)
+                    self.widgets[widget.label] = (element_kind, widget)
+                elif element_kind == 'exception':
+                    self.errors += 1
+
+    async def run(self, until):
+        ws = await connect(self.url)
+        try:
+            await self.rerun(ws)  # page load
+            step = 0
+            while time.perf_counter() < until:
+                triggers = []
+                for label, value in self.steps[step % len(self.steps)].items():
+                    kind, widget = self.widgets.get(label, (None, None))
+                    state = widget_state(kind, widget, value) if widget is not None else None
+                    if state is None:
+                        self.errors += 1
+                        continue
+                    if kind == 'button':
+                        triggers.append(state)
+                    else:
+                        self.states[widget.id] = state
+                self.latencies.append(await self.rerun(ws, triggers))
+                step += 1
+                if self.think:
+                    await asyncio.sleep(self.think)
+        except websockets.ConnectionClosed:
+            self.errors += 1
+        finally:
+            await ws.close()
+
+
+async def connect(url):
+    """Websocket of a new session; the endpoint moved in Streamlit 1.18."""
+    for path in ['/_stcore/stream', '/stream']:
+        try:
+            return await websockets.connect(url + path, subprotocols=['streamlit'], max_size=None)
+        except websockets.InvalidStatus if hasattr(websockets, 'InvalidStatus') else websockets.InvalidStatusCode:
+            continue
+    raise RuntimeError(f'No Streamlit websocket endpoint at {url}')
+
+
+class Sampler(threading.Thread):
+    """CPU and resident memory of the server process, sampled every interval seconds."""
+
+    def __init__(self, pid, interval=0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.cpu = []
+        self.rss = 0
+        self._done = threading.Event()
+
+    def _read(self):
+        """(CPU seconds, RSS bytes) of the server (and its children with psutil)."""
+        if psutil is not None:
+            procs = [psutil.Process(self.pid)]
+            procs += procs[0].children(recursive=True)
+            cpu = rss = 0
+            for proc in procs:
+                try:
+                    times = proc.cpu_times()
+                    cpu += times.user + times.system
+                    rss += proc.memory_info().rss
+                except psutil.NoSuchProcess:
+                    pass
+            return cpu, rss
+        with open(f'/proc/{self.pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{self.pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        ticks = os.sysconf('SC_CLK_TCK')
+        return (int(fields[11]) + int(fields[12])) / ticks, pages * os.sysconf('SC_PAGE_SIZE')
+
+    def run(self):
+        last_cpu, _ = self._read()
+        last = time.perf_counter()
+        while not self._done.wait(self.interval):
+            cpu, rss = self._read()
+            now = time.perf_counter()
+            self.cpu.append((cpu - last_cpu) / (now - last) * 100)
+            self.rss = max(self.rss, rss)
+            last_cpu, last = cpu, now
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+async def load_level(url, steps, n, duration, think):
+    sessions = [Session(url, steps, think) for _ in range(n)]
+    until = time.perf_counter() + duration
+    start = time.perf_counter()
+    results = await asyncio.gather(*[session.run(until) for session in sessions], return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = sum(isinstance(result, Exception) for result in results)
+    return sessions, elapsed, failed
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve(script, port):
+    """Run `streamlit run script` in this process, with the local stand-ins installed."""
+    import app_fixtures
+    app_fixtures.install()
+    from streamlit.web import cli
+    sys.argv = ['streamlit', 'run', script, '--server.port', str(port), '--server.address', '127.0.0.1',
+                '--server.headless', 'true', '--server.fileWatcherType', 'none',
+                '--browser.gatherUsageStats', 'false']
+    cli.main()
+
+
+def wait_ready(url, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        for path in ['/_stcore/health', '/healthz']:
+            try:
+                with urllib.request.urlopen(url + path, timeout=1) as response:
+                    if response.status == 200:
+                        return
+            except OSError:
+                pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Streamlit server not ready after {timeout} s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('app', choices=list(SCENARIOS))
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--duration', type=float, default=20, help='seconds per number of sessions')
+    parser.add_argument('--think', type=float, default=0, help='seconds between interactions of a session')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for the server')
+    parser.add_argument('--serve', nargs=2, metavar=('SCRIPT', 'PORT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]))
+        return
+    if websockets is None:
+        sys.exit('The load test needs the websockets package: pip install websockets')
+
+    script, steps = SCENARIOS[args.app]
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        copy_repository(copy)
+        # The server logs the exceptions of the app: to a file, not to a pipe that nobody reads while it fills up
+        log = open(os.path.join(tmp, 'server.log'), 'w+b')
+        server = subprocess.Popen([sys.executable, os.path.join(copy, 'benchmarks', 'load_test.py'), args.app,
+                                   '--serve', os.path.join(copy, script), str(port)],
+                                  cwd=copy, stdout=subprocess.DEVNULL, stderr=log)
+        try:
+            wait_ready(url, args.timeout)
+            ws_url = url.replace('http', 'ws')
+            print(f'{args.app}: {script}, {args.duration:g} s per level, think time {args.think:g} s')
+            print(f'{"sessions":>8}{"reruns":>8}{"rerun/s":>9}{"p50 [ms]":>10}{"p95 [ms]":>10}{"p99 [ms]":>10}'
+                  f'{"errors":>8}{"KB/rerun":>10}{"cpu [%]":>9}{"rss [MB]":>10}')
+            for n in args.sessions:
+                sampler = Sampler(server.pid)
+                sampler.start()
+                sessions, elapsed, failed = asyncio.run(load_level(ws_url, steps, n, args.duration, args.think))
+                sampler.stop()
+                latencies = np.array([t for s in sessions for t in s.latencies]) * 1000
+                errors = failed + sum(s.errors for s in sessions)
+                reruns = len(latencies)
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if reruns else (np.nan,) * 3
+                kb = sum(s.bytes for s in sessions) / 1024 / max(reruns + n, 1)
+                cpu = np.mean(sampler.cpu) if sampler.cpu else np.nan
+                print(f'{n:>8}{reruns:>8}{reruns / elapsed:>9.1f}{p50:>10.0f}{p95:>10.0f}{p99:>10.0f}'
+                      f'{errors:>8}{kb:>10.1f}{cpu:>9.0f}{sampler.rss / 2**20:>10.0f}')
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            if server.returncode not in (0, -15, None):
+                log.seek(0)
+                print(log.read().decode(errors='replace')[-2000:], file=sys.stderr)
+            log.close()
+
+
+if __name__ == '__main__':
+    main()
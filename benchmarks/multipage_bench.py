@@ -0,0 +1,111 @@
+"""Benchmark: memory of the multipage host vs. one process per app.
+
+- separate: each app runs in its own process (like one `streamlit run`
+  per app); the peak resident memory of all processes is added up
+- host: all the pages of multipage/ run in a single process, from the
+  repository root (like `streamlit run multipage/Home.py`), each
+  --reruns times
+
+The apps are executed headless, as in benchmarks/rerun_bench.py (same
+widget stubs and local stand-ins for the network sources), in a temporary
+copy of the repository. Apps whose dependencies are not installed are
+reported and left out of both setups. The memory of the Streamlit server
+itself and of the sessions is not included (the same in both setups,
+per process and per session).
+
+Usage (from the repository root):
+
+    $ python benchmarks/multipage_bench.py
+    $ python benchmarks/multipage_bench.py --reruns 5
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from rerun_bench import APPS, ROOT, compile_script, copy_repository, measure, stub_widgets
+
+PAGES = os.path.join(ROOT, 'multipage', 'pages')
+
+
+def pages():
+    """Scenario of rerun_bench.py -> page file name, for the apps that are pages."""
+    scripts = {os.path.realpath(os.path.join(ROOT, script)): app for app, (script, values) in APPS.items()
+               if not values}
+    found = {}
+    for name in sorted(os.listdir(PAGES), key=lambda name: int(name.split('_')[0])):
+        app = scripts.get(os.path.realpath(os.path.join(PAGES, name)))
+        if app is not None:
+            found[app] = name
+    return found
+
+
+def host_worker(names, reruns):
+    """Run the given pages in this process; prints the peak memory as JSON."""
+    import app_fixtures
+    app_fixtures.install()
+    stub_widgets({})
+    os.chdir(ROOT)
+    for _ in range(reruns):
+        for name in names:
+            path = os.path.join(PAGES, name)
+            exec(compile_script(path), {'__name__': '__main__', '__file__': path})
+    print(json.dumps({'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+
+
+def measure_host(names, reruns, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        copy_repository(copy)
+        proc = subprocess.run([sys.executable, os.path.join(copy, 'benchmarks', 'multipage_bench.py'),
+                               '--reruns', str(reruns), '--host-worker'] + names,
+                              capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.strip().splitlines() if line.strip()]
+        return {'error': lines[-1] if lines else f'exit code {proc.returncode}'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reruns', type=int, default=1, help='runs of each app')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per process')
+    parser.add_argument('--host-worker', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.host_worker:
+        host_worker(args.host_worker, args.reruns)
+        return
+
+    print(f'{"app":<20}{"page":<30}{"rss [MB]":>10}')
+    included = []
+    separate = 0
+    for app, name in pages().items():
+        result = measure(app, args.reruns, args.timeout)
+        if 'error' in result:
+            print(f'{app:<20}{name:<30}  skipped: {result["error"]}')
+            continue
+        included.append(name)
+        separate += result['rss']
+        print(f'{app:<20}{name:<30}{result["rss"]:>10.0f}')
+    if not included:
+        return
+
+    start = time.time()
+    host = measure_host(included, args.reruns, args.timeout)
+    print()
+    if 'error' in host:
+        print(f'host: failed: {host["error"]}')
+        sys.exit(1)
+    print(f'{len(included)} apps, peak resident memory:')
+    print(f'  separate processes: {separate:>8.0f} MB')
+    print(f'  multipage host:     {host["rss"]:>8.0f} MB  ({host["rss"] / separate:.0%}, '
+          f'{time.time() - start:.1f} s for all pages)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Benchmark: latency under concurrent load, model work in the script threads vs. in the process pool.
+
+The multipage host (multipage/Home.py) serves all the apps from one
+process, as in production, with the local stand-ins of
+benchmarks/app_fixtures.py. Two groups of simulated browser sessions
+(see load_test.py) use it at the same time:
+
+- heavy: sessions of an app with CPU-bound model work on every rerun,
+  e.g., the RDKit descriptors of the solubility app
+- light: sessions of a cheap app, e.g., the DNA app, which only wait
+  for the GIL
+
+The server runs twice: with OFFLOAD_WORKERS=0 (the work runs in the
+script threads, as before) and with the shared process pool of
+common/offload.py. The p50/p95 latency of each group shows whether the
+heavy sessions still slow down everyone else.
+
+Needs the websockets package (pip install websockets), like load_test.py.
+
+Usage (from the repository root):
+
+    $ python benchmarks/offload_bench.py
+    $ python benchmarks/offload_bench.py --heavy boston --light crypto --sessions 4 4 --duration 30
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from load_test import SCENARIOS, Session, connect, free_port, wait_ready, websockets
+from rerun_bench import ROOT, copy_repository
+
+PAGES = os.path.join(ROOT, 'multipage', 'pages')
+
+
+async def server_pages(url):
+    """url_pathname of the pages the server announces to a new session."""
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    msg = BackMsg()
+    msg.rerun_script.query_string = ''
+    pages = set()
+    ws = await connect(url)
+    try:
+        await ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await ws.recv())
+            kind = fwd.WhichOneof('type')
+            if kind == 'new_session':
+                pages |= {page.url_pathname for page in fwd.new_session.app_pages}
+            elif kind == 'navigation':  # newer Streamlit versions
+                pages |= {page.url_pathname for page in fwd.navigation.app_pages}
+            elif kind == 'script_finished':
+                return pages
+    finally:
+        await ws.close()
+
+
+def page_name(app, pages):
+    """Name of the page of the multipage host that runs the script of app.
+
+    Older Streamlit versions name the pages after the links in pages/
+    ('2_DNA_Nucleotide_Count.py' -> 'DNA_Nucleotide_Count'), newer ones
+    after the scripts they point to ('dna-app').
+    """
+    script = os.path.realpath(os.path.join(ROOT, SCENARIOS[app][0]))
+    for name in os.listdir(PAGES):
+        if os.path.realpath(os.path.join(PAGES, name)) == script:
+            candidates = [os.path.splitext(name)[0].split('_', 1)[1], os.path.splitext(os.path.basename(script))[0]]
+            for candidate in candidates:
+                if candidate in pages:
+                    return candidate
+    raise ValueError(f'{app} is not a page of the multipage host')
+
+
+async def mixed_load(url, groups, duration, think):
+    """{group: sessions} after duration seconds of all the sessions at once."""
+    pages = await server_pages(url)
+    until = time.perf_counter() + duration
+    sessions = {group: [Session(url, SCENARIOS[app][1], think, page_name(app, pages)) for _ in range(n)]
+                for group, (app, n) in groups.items()}
+    everyone = [session for group in sessions.values() for session in group]
+    results = await asyncio.gather(*[session.run(until) for session in everyone], return_exceptions=True)
+    for session, result in zip(everyone, results):
+        if isinstance(result, Exception):
+            session.errors += 1
+    return sessions
+
+
+def measure(groups, workers, args):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(os.environ, OFFLOAD_WORKERS=str(workers))
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        copy_repository(copy)
+        log = open(os.path.join(tmp, 'server.log'), 'w+b')
+        server = subprocess.Popen([sys.executable, os.path.join(copy, 'benchmarks', 'load_test.py'), 'multipage',
+                                   '--serve', os.path.join(copy, 'multipage', 'Home.py'), str(port)],
+                                  cwd=copy, env=env, stdout=subprocess.DEVNULL, stderr=log)
+        try:
+            wait_ready(url, args.timeout)
+            ws_url = url.replace('http', 'ws')
+            # Once, so that the models, datasets and pool are loaded before the timing
+            asyncio.run(mixed_load(ws_url, {group: (app, 1) for group, (app, _) in groups.items()}, 0, 0))
+            return asyncio.run(mixed_load(ws_url, groups, args.duration, args.think))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--heavy', choices=list(SCENARIOS), default='solubility', help='app of the heavy sessions')
+    parser.add_argument('--light', choices=list(SCENARIOS), default='dna', help='app of the light sessions')
+    parser.add_argument('--sessions', type=int, nargs=2, default=[2, 4], metavar=('HEAVY', 'LIGHT'))
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: as common/offload.py)')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load per mode')
+    parser.add_argument('--think', type=float, default=0, help='seconds between interactions of a session')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds to wait for the server')
+    args = parser.parse_args()
+    if websockets is None:
+        sys.exit('The benchmark needs the websockets package: pip install websockets')
+
+    groups = {'heavy': (args.heavy, args.sessions[0]), 'light': (args.light, args.sessions[1])}
+    modes = [('script threads', 0),
+             ('process pool', args.workers if args.workers is not None else min(4, os.cpu_count() or 1))]
+    print(f'heavy: {args.sessions[0]} x {args.heavy}, light: {args.sessions[1]} x {args.light}, '
+          f'{args.duration:g} s per mode')
+    print(f'{"mode":<16}{"group":<7}{"reruns":>8}{"p50 [ms]":>10}{"p95 [ms]":>10}{"errors":>8}')
+    for mode, workers in modes:
+        sessions = measure(groups, workers, args)
+        for group, group_sessions in sessions.items():
+            latencies = np.array([t for s in group_sessions for t in s.latencies]) * 1000
+            p50, p95 = np.percentile(latencies, [50, 95]) if len(latencies) else (np.nan,) * 2
+            errors = sum(s.errors for s in group_sessions)
+            print(f'{mode:<16}{group:<7}{len(latencies):>8}{p50:>10.0f}{p95:>10.0f}{errors:>8}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
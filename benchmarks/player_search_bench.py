@@ -0,0 +1,108 @@
+"""Benchmark: player search latency, index vs. scanning all seasons.
+
+Builds a synthetic multi-season players table (the real one is produced
+by `python -m common.seasons ...`) and compares, per query:
+
+- scan: str.contains() over each season's dataframe, as one would do
+  without an index
+- prefix / fuzzy: common.player_search.PlayerIndex
+
+Usage (from the repository root):
+
+    $ python benchmarks/player_search_bench.py --seasons 70 --players 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.player_search import PlayerIndex
+
+FIRST = ['James', 'Kevin', 'Michael', 'Chris', 'Anthony', 'Stephen', 'Nikola', 'Luka', 'Tim', 'Kobe',
+         'Dwyane', 'Kawhi', 'Russell', 'Paul', 'Jayson', 'Damian', 'Giannis', 'Joel', 'Devin', 'Zion']
+LAST = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Miller', 'Davis', 'Garcia', 'Rodriguez', 'Wilson',
+        'Martinez', 'Anderson', 'Taylor', 'Thomas', 'Hernandez', 'Moore', 'Martin', 'Jackson', 'Thompson', 'White']
+
+
+def make_players(n_seasons, n_players, seed=0):
+    """One row per player and season; players have ~10-season careers."""
+    rng = np.random.default_rng(seed)
+    n_names = n_seasons * n_players // 10
+    names = np.array([rng.choice(FIRST) + ' ' + rng.choice(LAST) + ' ' + str(i) for i in range(n_names)])
+    debut = np.arange(n_names) * n_seasons // n_names - 5
+    seasons = []
+    for s in range(n_seasons):
+        active = names[(debut <= s) & (s < debut + 10)]
+        picked = active[rng.integers(0, len(active), n_players)]
+        seasons.append(pd.DataFrame({'Season': 1950 + s, 'Player': picked, 'PTS': rng.random(n_players) * 30}))
+    return seasons
+
+
+def latencies(func, queries):
+    """Per-query latencies in ms."""
+    out = []
+    for q in queries:
+        start = time.perf_counter()
+        func(q)
+        out.append((time.perf_counter() - start) * 1000)
+    return np.array(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seasons', type=int, default=70)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    seasons = make_players(args.seasons, args.players)
+    players = pd.concat(seasons, ignore_index=True)
+
+    start = time.perf_counter()
+    index = PlayerIndex.build(players['Player'])
+    build_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'player_index.npz')
+        index.save(path)
+        size_mb = os.path.getsize(path) / 1e6
+        start = time.perf_counter()
+        index = PlayerIndex.load(path)
+        load_s = time.perf_counter() - start
+    print(f'{len(players)} rows, {len(index)} players, {args.seasons} seasons')
+    print(f'Index: build {build_s:.2f} s, load {load_s * 1000:.1f} ms, {size_mb:.1f} MB on disk')
+    print()
+
+    rng = np.random.default_rng(1)
+    sample = [str(index.names[i]) for i in rng.integers(0, len(index), args.queries)]
+    prefix_queries = [name[:rng.integers(3, 8)] for name in sample]
+    # Drop one character to simulate typos
+    typo_queries = []
+    for name in sample:
+        i = rng.integers(1, len(name) - 1)
+        typo_queries.append(name[:i] + name[i + 1:])
+
+    def scan(q):
+        return [s[s['Player'].str.contains(q, case=False, regex=False)] for s in seasons]
+
+    def rows(matches):
+        return [players.iloc[index.rows(i)] for i, _ in matches]
+
+    runs = [
+        ('scan str.contains', scan, prefix_queries),
+        ('index prefix', index.prefix, prefix_queries),
+        ('index fuzzy', index.fuzzy, typo_queries),
+        ('index search + rows', lambda q: rows(index.search(q)), typo_queries),
+    ]
+    print(f'{"query":<24}{"p50 [ms]":>10}{"p95 [ms]":>10}')
+    for label, func, queries in runs:
+        ms = latencies(func, queries)
+        print(f'{label:<24}{np.percentile(ms, 50):>10.3f}{np.percentile(ms, 95):>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
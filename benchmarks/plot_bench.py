@@ -0,0 +1,99 @@
+"""Benchmark: rendering price charts for many tickers.
+
+Renders the closing price chart of N tickers (50 by default, one year of
+synthetic daily prices) to PNG, as st.pyplot/st.image would, with:
+
+- pyplot, not closed: the original price_plot() loop
+- pyplot, closed: the same, with plt.close(fig)
+- small multiples: common.plotting.small_multiples(), one figure
+- process pool: common.plotting.render_pngs()
+
+Each variant runs several times (like reruns) and reports the wall-clock
+time per run and the RSS growth of this process (plus the pool workers).
+
+Usage (from the repository root):
+
+    $ python benchmarks/plot_bench.py --tickers 50 --runs 3
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import psutil
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.plotting import make_pool, render_pngs, small_multiples
+from common.prices import synthetic_history
+
+
+def to_png(fig):
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def pyplot_loop(series, close):
+    for symbol, (dates, values) in series.items():
+        fig = plt.figure()
+        plt.fill_between(dates, values, color='skyblue', alpha=0.3)
+        plt.plot(dates, values, color='skyblue', alpha=0.8)
+        plt.xticks(rotation=90)
+        plt.title(symbol, fontweight='bold')
+        plt.xlabel('Date', fontweight='bold')
+        plt.ylabel('Closing Price', fontweight='bold')
+        to_png(fig)
+        if close:
+            plt.close(fig)
+
+
+def rss_mb(pool=None):
+    """RSS of this process plus its children (e.g., pool workers), in MB."""
+    me = psutil.Process()
+    total = me.memory_info().rss
+    for child in me.children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except psutil.NoSuchProcess:
+            pass
+    return total / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=50)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    history = synthetic_history(['T' + str(i) for i in range(args.tickers)], '2023-01-01', '2023-12-31')
+    series = {symbol: (df.index.values, df.Close.values) for symbol, df in history.items()}
+    pool = make_pool(args.workers)
+    # Start the workers outside of the measurements
+    render_pngs(dict(list(series.items())[:1]), pool)
+
+    variants = [
+        ('pyplot, not closed', lambda: pyplot_loop(series, close=False)),
+        ('pyplot, closed', lambda: pyplot_loop(series, close=True)),
+        ('small multiples', lambda: to_png(small_multiples(series))),
+        ('process pool', lambda: render_pngs(series, pool)),
+    ]
+    print(f'{args.tickers} tickers, {args.runs} runs, {pool._max_workers} pool workers')
+    print(f'{"variant":<22}{"time/run [s]":>14}{"RSS growth [MB]":>18}')
+    for label, func in variants:
+        before = rss_mb()
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            func()
+        seconds = (time.perf_counter() - start) / args.runs
+        print(f'{label:<22}{seconds:>14.2f}{rss_mb() - before:>18.1f}')
+    plt.close('all')
+    pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Benchmark: script rerun latency of all apps, headless.
+
+Each app runs in its own process, in a temporary copy of the repository
+(so disk caches start empty and nothing is written to the working tree),
+from its folder, like `streamlit run` would. The script is executed
+the same way Streamlit does it (magic commands included) but without a
+server ("bare" mode): widgets return their default values, or the values
+given per scenario (e.g., a pressed button), and the network sources are
+replaced by the local stand-ins of benchmarks/app_fixtures.py.
+
+Per app (scenario), it records:
+
+- cold: seconds from process start to the end of the first run
+  (interpreter start, imports, cold caches)
+- p50 / p95: milliseconds of the warm reruns
+- rss: peak resident memory in MB
+
+--save-baseline stores the results as JSON; later runs are compared against
+it, and the script exits with code 1 if any metric is worse than the
+baseline by more than --threshold (relative) and --min-delta (absolute).
+Apps whose dependencies are not installed are reported and skipped.
+
+Usage (from the repository root):
+
+    $ python benchmarks/rerun_bench.py --save-baseline
+    $ python benchmarks/rerun_bench.py --threshold 0.2
+    $ python benchmarks/rerun_bench.py --apps iris penguins --reruns 50
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+sys.path.append(ROOT)
+
+# Scenario -> (script, widget values by label)
+APPS = {
+    'stock': ('app_1_simple_stock_price/myapp.py', {}),
+    'stock-multi': ('app_1_simple_stock_price/myapp2.py', {}),
+    'dna': ('app_2_simple_bioinformatics_dna/dna-app.py', {}),
+    'basketball': ('app_3_eda_basketball/basketball_app.py', {}),
+    'basketball-heatmap': ('app_3_eda_basketball/basketball_app.py', {'Intercorrelation Heatmap': True}),
+    'football': ('app_4_eda_football/football_app.py', {}),
+    'sp500': ('app_5_eda_sp500_stock/sp500-app.py', {}),
+    'sp500-plots': ('app_5_eda_sp500_stock/sp500-app.py', {'Show Plots': True}),
+    'crypto': ('app_6_eda_cryptocurrency/crypto-price-app.py', {}),
+    'iris': ('app_7_classification_iris/iris-ml-app.py', {}),
+    'penguins': ('app_8_classification_penguins/penguins-app.py', {}),
+    'boston': ('app_9_regression_boston_housing/boston-house-ml-app.py', {}),
+    'solubility': ('app_10_regression_bioinformatics_solubility/solubility-app.py', {}),
+}
+METRICS = [('cold', 's'), ('p50', 'ms'), ('p95', 'ms'), ('rss', 'MB')]
+BASELINE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'rerun_baseline.json')
+WIDGETS = ['button', 'checkbox', 'radio', 'selectbox', 'multiselect', 'slider', 'select_slider', 'text_input',
+           'text_area', 'number_input', 'date_input', 'time_input', 'file_uploader', 'color_picker']
+
+
+def stub_widgets(values):
+    """Widgets whose label is in values return that value instead of their default."""
+    import streamlit as st
+    from streamlit.delta_generator import DeltaGenerator
+
+    for name in WIDGETS:
+        original = getattr(DeltaGenerator, name, None)
+        if original is None:
+            continue
+
+        def widget(self, label, *args, _original=original, **kwargs):
+            value = _original(self, label, *args, **kwargs)
+            return values.get(label, value)
+
+        setattr(DeltaGenerator, name, widget)
+        # st.button & co. are bound methods of the main container
+        setattr(st, name, getattr(st._main, name))
+
+
+def compile_script(path):
+    """Code of the app script, with Streamlit's magic (bare expressions are written)."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    try:
+        from streamlit.runtime.scriptrunner.magic import add_magic
+        return compile(add_magic(source, path), path, 'exec')
+    except ImportError:
+        return compile(source, path, 'exec')
+
+
+def worker(app, reruns, started):
+    """Run one scenario in this process; prints the results as JSON."""
+    script, values = APPS[app]
+    path = os.path.realpath(os.path.join(ROOT, script))
+    import app_fixtures
+    app_fixtures.install()
+    stub_widgets(values)
+    os.chdir(os.path.dirname(path))
+    sys.path.insert(0, os.path.dirname(path))
+
+    def run():
+        start = time.perf_counter()
+        exec(compile_script(path), {'__name__': '__main__', '__file__': path})
+        return (time.perf_counter() - start) * 1000
+
+    run()
+    cold = time.time() - started
+    warm = np.array([run() for _ in range(reruns)])
+    print(json.dumps({
+        'cold': cold,
+        'p50': float(np.percentile(warm, 50)),
+        'p95': float(np.percentile(warm, 95)),
+        'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def copy_repository(folder):
+    """The repository without git data, bytecode and disk caches."""
+    def ignore(directory, names):
+        skip = {'.git', '__pycache__'}
+        if os.path.basename(directory) == 'data':
+            skip |= {'cache', 'history'}
+        return [name for name in names if name in skip]
+    shutil.copytree(ROOT, folder, ignore=ignore, symlinks=True)
+
+
+def measure(app, reruns, timeout):
+    """Results of one scenario (or {'error': ...}), in a fresh process and copy."""
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        copy_repository(copy)
+        started = time.time()
+        proc = subprocess.run([sys.executable, os.path.join(copy, 'benchmarks', 'rerun_bench.py'),
+                               '--worker', app, '--reruns', str(reruns), '--started', repr(started)],
+                              capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        lines = [line for line in proc.stderr.strip().splitlines() if line.strip()]
+        return {'error': lines[-1] if lines else f'exit code {proc.returncode}'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def regressions(result, base, threshold, min_delta):
+    """Metrics of result worse than base by more than threshold (relative) and min_delta."""
+    worse = []
+    for metric, unit in METRICS:
+        if metric not in result or metric not in base:
+            continue
+        # min_delta is in ms; cold starts are in s
+        delta = min_delta / 1000 if unit == 's' else min_delta
+        if result[metric] > base[metric] * (1 + threshold) and result[metric] - base[metric] > delta:
+            worse.append(metric)
+    return worse
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', nargs='+', choices=list(APPS), default=list(APPS))
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=600, help='seconds per app')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative regression threshold (0.2 = 20%%)')
+    parser.add_argument('--min-delta', type=float, default=5.0,
+                        help='ignore regressions smaller than this (ms; MB for rss)')
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--started', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.reruns, args.started)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    failed = False
+    header = ''.join(f'{metric + " [" + unit + "]":>12}' for metric, unit in METRICS)
+    print(f'{"app":<20}{header}  {"vs. baseline" if baseline else ""}')
+    for app in args.apps:
+        result = measure(app, args.reruns, args.timeout)
+        if 'error' in result:
+            print(f'{app:<20}  skipped: {result["error"]}')
+            continue
+        results[app] = result
+        row = f'{result["cold"]:>12.2f}{result["p50"]:>12.1f}{result["p95"]:>12.1f}{result["rss"]:>12.0f}'
+        note = ''
+        if app in baseline:
+            worse = regressions(result, baseline[app], args.threshold, args.min_delta)
+            failed |= bool(worse)
+            note = 'REGRESSION: ' + ', '.join(worse) if worse else 'ok'
+        print(f'{app:<20}{row}  {note}')
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f'\nBaseline saved to {args.baseline}')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark: vectorized sector performance vs. per-ticker loops.
+
+Fills a temporary PriceStore with synthetic prices for the full S&P 500
+universe (500 tickers, 10 years by default) and times:
+
+- loop: per-ticker pct_change + pandas groupby by sector,
+  i.e., what one would write on top of per-ticker frames
+- vectorized: common.sectors.sector_performance over the
+  memory-mapped (dates x tickers) matrix
+- cached: a second request for the same date range (dict lookup),
+  as the app does with st.cache
+
+Usage (from the repository root):
+
+    $ python benchmarks/sector_bench.py --tickers 500 --years 10
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common.prices import synthetic_history
+from common.sectors import TRADING_DAYS, sector_performance
+from common.tsstore import PriceStore
+
+SECTORS = ['Communication Services', 'Consumer Discretionary', 'Consumer Staples', 'Energy', 'Financials',
+           'Health Care', 'Industrials', 'Information Technology', 'Materials', 'Real Estate', 'Utilities']
+
+
+def loop_performance(store, labels, start, end):
+    """Reference implementation: one pandas series per ticker."""
+    returns = {}
+    for symbol in store.symbols:
+        close = store.frame(symbol, start, end)['Close']
+        returns[symbol] = close.pct_change().iloc[1:]
+    by_sector = {}
+    for sector in sorted(set(labels)):
+        members = [returns[s] for s, label in zip(store.symbols, labels) if label == sector]
+        by_sector[sector] = pd.concat(members, axis=1).mean(axis=1)
+    by_sector = pd.DataFrame(by_sector)
+    summary = pd.DataFrame({
+        'Return': (1 + by_sector.fillna(0)).prod() - 1,
+        'Volatility': by_sector.std() * np.sqrt(TRADING_DAYS),
+    })
+    return summary, by_sector.corr()
+
+
+def timed(func, *args, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--years', type=int, default=10)
+    args = parser.parse_args()
+
+    symbols = ['T' + str(i) for i in range(args.tickers)]
+    labels = tuple(SECTORS[i % len(SECTORS)] for i in range(args.tickers))
+    end = pd.Timestamp('2023-12-31')
+    start = end - pd.DateOffset(years=args.years)
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        store = PriceStore.create(tmp).ingest_frames(synthetic_history(symbols, start, end))
+        print(f'Store: {len(store.symbols)} tickers x {len(store)} dates, ingest {time.perf_counter() - t0:.1f} s')
+
+        (summary_loop, _), loop_s = timed(loop_performance, store, labels, start, end, repeat=1)
+
+        def vectorized():
+            lo, hi = store.window(start, end)
+            return sector_performance(store.matrix('Close', start, end), labels, store.dates[lo:hi])
+        result, vector_s = timed(vectorized)
+
+        cache = {}
+
+        def cached():
+            key = (start, end)
+            if key not in cache:
+                cache[key] = vectorized()
+            return cache[key]
+        cached()
+        _, cached_s = timed(cached)
+
+        same = np.allclose(summary_loop['Return'].values, result['summary']['Return'].values) and \
+            np.allclose(summary_loop['Volatility'].values, result['summary']['Volatility'].values)
+        print(f'Results match: {same}')
+        print()
+        print(f'{"variant":<16}{"time [ms]":>12}')
+        print(f'{"loop":<16}{loop_s * 1000:>12.1f}')
+        print(f'{"vectorized":<16}{vector_s * 1000:>12.1f}')
+        print(f'{"cached":<16}{cached_s * 1000:>12.4f}')
+        del store
+
+
+if __name__ == '__main__':
+    main()
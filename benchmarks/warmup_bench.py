@@ -0,0 +1,118 @@
+"""Benchmark: time-to-ready and first-request latency, with and without warm-up.
+
+Each app is served twice by a real Streamlit server, in a fresh temporary
+copy of the repository (empty disk caches, as after a deploy), with the
+local stand-ins of benchmarks/app_fixtures.py:
+
+- cold: `streamlit run <script>`, as in the Procfile before
+- warm: `python -m common.warmup <script>`: the warm-up tasks of
+  common/warmup.py run in parallel before the server starts
+
+and reports:
+
+- ready: seconds from the start of the process until /_stcore/health answers
+- first: milliseconds of the first page load of the first session
+  (the one the first user waits for)
+- second: milliseconds of the page load of a second session
+
+The first user arrives right when the server is ready, which is the worst
+case: the warm-up moves the cold work from the first request to the startup.
+
+Needs the websockets package (pip install websockets), like load_test.py.
+
+Usage (from the repository root):
+
+    $ python benchmarks/warmup_bench.py
+    $ python benchmarks/warmup_bench.py --apps penguins boston multipage
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from load_test import SCENARIOS, Session, connect, free_port, wait_ready, websockets
+from rerun_bench import copy_repository
+
+DEFAULT_APPS = ['stock', 'basketball', 'sp500', 'crypto', 'penguins', 'boston', 'solubility', 'multipage']
+SERVER_ARGS = ['--server.headless', 'true', '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false']
+
+
+def serve(script, port, warm):
+    """Run the server in this process, with the local stand-ins installed."""
+    import app_fixtures
+    app_fixtures.install()
+    from common import warmup
+    args = [script] + ([] if warm else ['--no-warmup'])
+    warmup.main(args + ['--', '--server.port', str(port), '--server.address', '127.0.0.1'] + SERVER_ARGS)
+
+
+async def page_load(url):
+    """(milliseconds of a page load of a new session, errors shown by the app)."""
+    session = Session(url, [], 0)
+    ws = await connect(url)
+    try:
+        seconds = await session.rerun(ws)
+    finally:
+        await ws.close()
+    return seconds * 1000, session.errors
+
+
+def measure(app, warm, timeout):
+    script = SCENARIOS[app][0]
+    port = free_port()
+    url = f'http://127.0.0.1:{port}'
+    with tempfile.TemporaryDirectory() as tmp:
+        copy = os.path.join(tmp, 'repo')
+        copy_repository(copy)
+        log = open(os.path.join(tmp, 'server.log'), 'w+b')
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, os.path.join(copy, 'benchmarks', 'warmup_bench.py'),
+                                   '--serve', os.path.join(copy, script), str(port)] + (['--warm'] if warm else []),
+                                  cwd=copy, stdout=log, stderr=subprocess.STDOUT)
+        try:
+            wait_ready(url, timeout)
+            ready = time.perf_counter() - start
+            first, errors = asyncio.run(page_load(url.replace('http', 'ws')))
+            second, more_errors = asyncio.run(page_load(url.replace('http', 'ws')))
+            return {'ready': ready, 'first': first, 'second': second, 'errors': errors + more_errors}
+        except Exception as e:
+            return {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+            log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--apps', nargs='+', choices=list(SCENARIOS), default=DEFAULT_APPS)
+    parser.add_argument('--timeout', type=float, default=180, help='seconds to wait for the server')
+    parser.add_argument('--serve', nargs=2, metavar=('SCRIPT', 'PORT'), help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve[0], int(args.serve[1]), args.warm)
+        return
+    if websockets is None:
+        sys.exit('The benchmark needs the websockets package: pip install websockets')
+
+    print(f'{"app":<14}{"mode":<8}{"ready [s]":>10}{"first [ms]":>12}{"second [ms]":>13}{"errors":>8}')
+    for app in args.apps:
+        for mode in ['cold', 'warm']:
+            result = measure(app, mode == 'warm', args.timeout)
+            if 'error' in result:
+                print(f'{app:<14}{mode:<8}  failed: {result["error"]}')
+                continue
+            print(f'{app:<14}{mode:<8}{result["ready"]:>10.2f}{result["first"]:>12.0f}{result["second"]:>13.0f}'
+                  f'{result["errors"]:>8}', flush=True)
+
+
+if __name__ == '__main__':
+    main()
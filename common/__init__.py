@@ -0,0 +1,10 @@
+"""Shared helpers for the apps in this repository.
+
+The apps live in their own folders and are run from there, e.g.:
+
+    $ cd app_3_eda_basketball
+    $ streamlit run basketball_app.py
+
+so each app appends the repository root to `sys.path`
+before importing from `common`.
+"""
@@ -0,0 +1,370 @@
+"""Caching of function results for all apps: data and resources.
+
+The apps used the legacy @st.cache, which on every call hashes all the
+arguments and, unless allow_output_mutation=True, the return value too
+(to warn about mutations); large dataframes are sampled with
+df.sample(), which shuffles all the rows first. It has no TTL, no size
+bound and nothing survives a restart. Here:
+
+- data_cache: for data (dataframes, arrays, results). Keys are cheap
+  fingerprints of the arguments (large frames/arrays are sampled, see
+  fingerprint()); return values are not hashed. Entries expire after
+  ttl seconds; the least recently used ones are evicted beyond
+  max_entries or max_bytes; persist=<folder> adds an on-disk tier
+  (pickle files) that survives restarts.
+- resource_cache: for shared objects (caches, models, thread pools,
+  connections): one instance per arguments, never copied or pickled.
+
+Values are returned as they are (like allow_output_mutation=True):
+don't mutate them, or use data_cache(copy=True).
+
+Streamlit re-executes the app script on every rerun, which defines the
+decorated functions again; their caches are registered by source file and
+function name, so reruns find the same cache. Changing the code of
+the function starts a new cache.
+
+Usage:
+
+    @data_cache(ttl=3600, max_entries=100, persist='data/cache')
+    def load_data(year):
+        ...
+
+    @resource_cache()
+    def load_price_cache():
+        return PriceCache(YahooProvider())
+
+    load_data.clear(); stats()
+"""
+import datetime
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Frames/arrays with more rows are fingerprinted from a sample of rows
+SAMPLE_ROWS = 10_000
+
+_registry = {}  # (file, qualified name) -> Cache
+_registry_lock = threading.Lock()
+
+
+def _sample(n):
+    """Evenly spaced positions of SAMPLE_ROWS of n rows (first and last included)."""
+    if n <= SAMPLE_ROWS:
+        return slice(None)
+    return np.linspace(0, n - 1, SAMPLE_ROWS).astype(np.int64)
+
+
+def _update(h, obj, hash_funcs):
+    """Feed obj into the hash h; containers recursively."""
+    if hash_funcs:
+        for kind, func in hash_funcs.items():
+            if isinstance(obj, kind):
+                h.update(b'custom:' + kind.__qualname__.encode())
+                _update(h, func(obj), None)
+                return
+    h.update(type(obj).__qualname__.encode())
+    if obj is None or isinstance(obj, (bool, int, float, complex, str, datetime.date, datetime.time,
+                                       datetime.timedelta, np.generic)):
+        h.update(repr(obj).encode())
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        h.update(bytes(obj))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        items = sorted(obj, key=repr) if isinstance(obj, (set, frozenset)) else obj
+        h.update(b'[%d' % len(items))
+        for item in items:
+            _update(h, item, hash_funcs)
+    elif isinstance(obj, dict):
+        h.update(b'{%d' % len(obj))
+        for key in sorted(obj, key=repr):
+            _update(h, key, hash_funcs)
+            _update(h, obj[key], hash_funcs)
+    elif isinstance(obj, np.ndarray):
+        h.update(repr((obj.shape, obj.dtype.str)).encode())
+        rows = obj[_sample(len(obj))] if obj.ndim else obj
+        h.update(np.ascontiguousarray(rows).tobytes() if obj.dtype != object else pickle.dumps(rows))
+    elif isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        h.update(repr(obj.shape).encode())
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(zip(obj.columns, obj.dtypes.astype(str)))).encode())
+        else:
+            h.update(repr((obj.name, str(obj.dtype))).encode())
+        sample = obj[_sample(len(obj))] if isinstance(obj, pd.Index) else obj.iloc[_sample(len(obj))]
+        h.update(pd.util.hash_pandas_object(sample).to_numpy().tobytes())
+    elif callable(obj) and hasattr(obj, '__qualname__'):
+        h.update((getattr(obj, '__module__', '') + '.' + obj.__qualname__).encode())
+    else:
+        try:
+            h.update(pickle.dumps(obj, protocol=4))
+        except Exception as e:
+            raise TypeError(f'Cannot fingerprint an argument of type {type(obj).__qualname__}; '
+                            f'pass hash_funcs={{{type(obj).__qualname__}: ...}}') from e
+
+
+def fingerprint(obj, hash_funcs=None):
+    """Cheap digest of obj, used as cache key.
+
+    Scalars, strings and containers are hashed completely; dataframes,
+    series and arrays by shape, dtypes and a sample of SAMPLE_ROWS rows
+    (like st.cache_data), so a 1 GB frame costs milliseconds.
+    hash_funcs: type -> function returning what to hash instead.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update(h, obj, hash_funcs)
+    return h.hexdigest()
+
+
+def _memory_usage(value, deep=False):
+    usage = value.memory_usage(index=True, deep=deep)
+    return int(usage.sum()) if isinstance(value, pd.DataFrame) else int(usage)
+
+
+def _frame_bytes(value):
+    """Bytes of a frame/series, the strings and objects of its object columns included.
+
+    With more than SAMPLE_ROWS rows, the bytes of the objects are measured on
+    a sample of rows and scaled up: deep=True on all the rows would walk
+    every object on every put.
+    """
+    rows = _sample(len(value))
+    dtypes = list(value.dtypes) if isinstance(value, pd.DataFrame) else [value.dtype]
+    if isinstance(rows, slice) or object not in dtypes + [value.index.dtype]:
+        return _memory_usage(value, deep=True)
+    sample = value.iloc[rows]
+    objects = _memory_usage(sample, deep=True) - _memory_usage(sample)
+    return _memory_usage(value) + int(objects * len(value) / len(sample))
+
+
+def sizeof(value):
+    """Approximate size of a cached value in bytes."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return _frame_bytes(value)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (list, tuple)):
+        return sum(sizeof(item) for item in value)
+    if isinstance(value, dict):
+        return sum(sizeof(item) for item in value.values())
+    # Objects that know their size, e.g., common.memory.RowSelection
+    if isinstance(getattr(value, 'nbytes', None), int):
+        return value.nbytes
+    return 64
+
+
+def _code_digest(code):
+    """Digest of a code object (and its nested functions) that survives reruns."""
+    h = hashlib.blake2b(code.co_code, digest_size=8)
+    for const in code.co_consts:
+        h.update(_code_digest(const).encode() if inspect.iscode(const) else repr(const).encode())
+    return h.hexdigest()
+
+
+class Cache:
+    """In-memory LRU cache with TTL, entry and byte bounds, and an optional disk tier."""
+
+    def __init__(self, name, ttl=None, max_entries=None, max_bytes=None, persist=None, copy=False,
+                 clock=time.time):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.persist = os.path.join(persist, name) if persist else None
+        self.copy = copy
+        self.clock = clock
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._entries = OrderedDict()  # key -> (value, stored_at, size)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and self.clock() - stored_at >= self.ttl
+
+    def _evict(self):
+        while self._entries and ((self.max_entries is not None and len(self._entries) > self.max_entries) or
+                                 (self.max_bytes is not None and self.bytes > self.max_bytes)):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.bytes -= size
+            self.evictions += 1
+
+    def _path(self, key):
+        return os.path.join(self.persist, key + '.pkl')
+
+    def _read_disk(self, key):
+        """(value, stored_at) from the disk tier, or None."""
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if self._expired(stored_at):
+                return None
+            with open(path, 'rb') as f:
+                return pickle.load(f), stored_at
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_disk(self, key, value):
+        os.makedirs(self.persist, exist_ok=True)
+        # Write to a temporary file first: readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.persist, suffix='.pkl')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def _out(self, value):
+        if not self.copy:
+            return value
+        return value.copy() if hasattr(value, 'copy') else pickle.loads(pickle.dumps(value))
+
+    def _lookup(self, key):
+        """(found, value) from memory; the caller holds self._lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if self._expired(entry[1]):
+            del self._entries[key]
+            self.bytes -= entry[2]
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, key, value, stored_at=None):
+        size = sizeof(value)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self._entries[key] = (value, self.clock() if stored_at is None else stored_at, size)
+            self.bytes += size
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """Cached value of key, or compute() it (once, even if several threads ask)."""
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return self._out(value)
+            key_lock = self._locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                with self._lock:
+                    # Another thread may have computed it in the meantime
+                    found, value = self._lookup(key)
+                    if found:
+                        self.hits += 1
+                        return self._out(value)
+                stored = self._read_disk(key) if self.persist else None
+                if stored is not None:
+                    value, stored_at = stored
+                    with self._lock:
+                        self.disk_hits += 1
+                else:
+                    with self._lock:
+                        self.misses += 1
+                    value, stored_at = compute(), None
+                    if self.persist:
+                        self._write_disk(key, value)
+                self.put(key, value, stored_at)
+        finally:
+            # Also when compute() raised: failed keys don't keep their lock
+            with self._lock:
+                self._locks.pop(key, None)
+        return self._out(value)
+
+    def clear(self, disk=True):
+        """Drop all entries, in memory and (unless disk=False) on disk."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if disk and self.persist and os.path.isdir(self.persist):
+            for name in os.listdir(self.persist):
+                if name.endswith('.pkl'):
+                    os.unlink(os.path.join(self.persist, name))
+
+    def stats(self):
+        requests = self.hits + self.disk_hits + self.misses
+        return {'name': self.name, 'entries': len(self._entries), 'bytes': self.bytes, 'hits': self.hits,
+                'disk_hits': self.disk_hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / requests if requests else None}
+
+
+def _cached(func, hash_funcs, **options):
+    """Wrap func with the registered Cache of its file, name and code."""
+    code = func.__code__
+    # Resolved, so that an app run through a symlink (e.g., a page of the
+    # multipage host) uses the same cache and disk tier
+    path = os.path.realpath(code.co_filename)
+    # e.g. 'basketball_app.load_data'; also the subfolder of the disk tier
+    name = re.sub(r'[^\w.-]', '', os.path.splitext(os.path.basename(path))[0] + '.' + func.__qualname__)
+    registry_key = (path, func.__qualname__)
+    digest = _code_digest(code)
+    with _registry_lock:
+        cache = _registry.get(registry_key)
+        if cache is None or cache.code_digest != digest:
+            cache = Cache(name, **options)
+            cache.code_digest = digest
+            _registry[registry_key] = cache
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = digest + '-' + fingerprint(tuple(bound.arguments.items()), hash_funcs)
+        return cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    wrapper.cache = cache
+    wrapper.clear = cache.clear
+    return wrapper
+
+
+def data_cache(ttl=None, max_entries=None, max_bytes=None, persist=None, copy=False, hash_funcs=None):
+    """Decorator: cache the data returned by a function (see the module docstring).
+
+    persist: folder of the on-disk tier (one subfolder per function);
+    values must be picklable.
+    """
+    return lambda func: _cached(func, hash_funcs, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes,
+                                persist=persist, copy=copy)
+
+
+def resource_cache(ttl=None, max_entries=None, hash_funcs=None):
+    """Decorator: one shared object per arguments (models, pools, caches); never copied."""
+    return lambda func: _cached(func, hash_funcs, ttl=ttl, max_entries=max_entries)
+
+
+def caches():
+    """All registered caches."""
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def stats():
+    """Dataframe with the stats of all registered caches."""
+    return pd.DataFrame([cache.stats() for cache in caches()]).set_index('name') if _registry else pd.DataFrame()
+
+
+def clear_all():
+    for cache in caches():
+        cache.clear()
@@ -0,0 +1,167 @@
+"""Career aggregates for the NBA/NFL apps.
+
+Two materialized tables per league, stored next to the seasons
+(see common/seasons.py):
+
+    career.pkl          # one row per player
+    career_teams.pkl    # one row per player and team (team splits)
+
+with career totals, per-game averages, ratios (e.g., FG%) and the
+first/last season. They are maintained when seasons are ingested:
+adding a season only aggregates that season and adds it to the stored
+sums (a replaced season is subtracted first, and the first/last season
+of its players is recomputed), so we never group decades of rows again,
+neither at ingest time nor when the apps rerun.
+
+Players who changed teams during a season have one row per team plus
+a combined row (e.g., 'TOT'); careers use the combined row and team
+splits use the per-team rows.
+"""
+import os
+
+import pandas as pd
+
+from common import seasons
+
+# counts: summed as they are; per_game: multiplied by G before summing
+AGGREGATES = {
+    'nba': {
+        'counts': ['G', 'GS'],
+        'per_game': ['MP', 'FG', 'FGA', '3P', '3PA', '2P', '2PA', 'FT', 'FTA',
+                     'ORB', 'DRB', 'TRB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS'],
+        'ratios': {'FG%': ('FG', 'FGA'), '3P%': ('3P', '3PA'), 'FT%': ('FT', 'FTA')},
+    },
+    'nfl': {
+        'counts': ['G', 'GS', 'Att', 'Yds', 'TD', '1D', 'Fmb'],
+        'per_game': [],
+        'ratios': {'Y/A': ('Yds', 'Att')},
+    },
+}
+# Team codes of the combined rows of players with several teams in a season
+COMBINED_TEAMS = ['TOT', '2TM', '3TM', '4TM', '5TM']
+CAREER_FILE = 'career.pkl'
+TEAMS_FILE = 'career_teams.pkl'
+
+
+def stat_columns(league):
+    config = AGGREGATES[league]
+    return config['counts'] + config['per_game']
+
+
+def season_totals(league, rows):
+    """Totals of each row, i.e., per-game stats times games; one 'Seasons' per row."""
+    config = AGGREGATES[league]
+    # Older seasons lack some columns (e.g., 3P before 1980)
+    stats = rows.reindex(columns=stat_columns(league)).fillna(0)
+    stats[config['per_game']] = stats[config['per_game']].mul(stats['G'], axis=0)
+    totals = pd.concat([rows[['Player', 'Tm', 'Season']], stats], axis=1)
+    totals['Seasons'] = 1
+    return totals
+
+
+def partial_aggregates(league, rows):
+    """Aggregate some seasons: (career partial, team splits partial)."""
+    totals = season_totals(league, rows)
+    sums = ['Seasons'] + stat_columns(league)
+    agg = dict({col: 'sum' for col in sums}, From=('Season', 'min'), To=('Season', 'max'))
+    agg = {key: value if isinstance(value, tuple) else (key, value) for key, value in agg.items()}
+
+    combined = totals['Tm'].isin(COMBINED_TEAMS)
+    # Seasons with a combined row: keep only that one for the career
+    player_season = totals['Player'] + '|' + totals['Season'].astype(str)
+    has_combined = player_season.isin(player_season[combined])
+    career = totals[combined | ~has_combined].groupby('Player').agg(**agg)
+    teams = totals[~combined].groupby(['Player', 'Tm']).agg(**agg)
+    return career, teams
+
+
+def merge(league, table, added=None, removed=None):
+    """table + added - removed; all indexed the same way."""
+    sums = ['Seasons'] + stat_columns(league)
+    parts = [t for t in [table, added] if t is not None]
+    if removed is not None:
+        negative = removed.copy()
+        negative[sums] = -negative[sums]
+        negative[['From', 'To']] = float('nan')  # min/max ignore NaN
+        parts.append(negative)
+    stacked = pd.concat(parts)
+    levels = list(range(stacked.index.nlevels))
+    grouped = stacked.groupby(level=levels)
+    merged = pd.concat([grouped[sums].sum(), grouped['From'].min(), grouped['To'].max()], axis=1)
+    merged = merged[merged['Seasons'] > 0]
+    merged[['From', 'To']] = merged[['From', 'To']].astype(int)
+    return merged
+
+
+def season_span(rows, by):
+    """From/To: first and last season of each group of rows."""
+    return rows.groupby(by)['Season'].agg(['min', 'max']).set_axis(['From', 'To'], axis=1)
+
+
+def fix_span(table, span):
+    """Set From/To of the rows of table found in span."""
+    keys = table.index.intersection(span.index)
+    table.loc[keys, ['From', 'To']] = span.loc[keys, ['From', 'To']].astype(int).to_numpy()
+    return table
+
+
+def finish(league, table):
+    """Add per-game averages and ratios to the summed table."""
+    config = AGGREGATES[league]
+    table = table.copy()
+    games = table['G'].where(table['G'] > 0)
+    for col in stat_columns(league):
+        if col != 'G':
+            table[col + '/G'] = (table[col] / games).round(1)
+    for col, (num, den) in config['ratios'].items():
+        table[col] = (table[num] / table[den].where(table[den] > 0)).round(3)
+    return table
+
+
+def load(league):
+    """(career, team splits), or (None, None) if they haven't been built yet."""
+    career_path = os.path.join(seasons.data_dir(league), CAREER_FILE)
+    teams_path = os.path.join(seasons.data_dir(league), TEAMS_FILE)
+    if not (os.path.exists(career_path) and os.path.exists(teams_path)):
+        return None, None
+    return pd.read_pickle(career_path), pd.read_pickle(teams_path)
+
+
+def save(league, career, teams):
+    career.to_pickle(os.path.join(seasons.data_dir(league), CAREER_FILE))
+    teams.to_pickle(os.path.join(seasons.data_dir(league), TEAMS_FILE))
+
+
+def update(league, added=None, removed=None, players=None):
+    """Add (and subtract) season rows to the stored aggregates.
+
+    players: all the season rows after the change; needed with removed.
+    """
+    if removed is not None and players is None:
+        raise ValueError('players is needed to subtract seasons')
+    sums = ['Seasons'] + stat_columns(league) + ['From', 'To']
+    career, teams = load(league)
+    if career is not None:
+        career, teams = career[sums], teams[sums]
+    added_career, added_teams = partial_aggregates(league, added) if added is not None else (None, None)
+    removed_career, removed_teams = partial_aggregates(league, removed) if removed is not None else (None, None)
+    career = merge(league, career, added_career, removed_career)
+    teams = merge(league, teams, added_teams, removed_teams)
+    if removed is not None:
+        # min/max can't take a removed season back out of From/To: recompute
+        # them for the players of the removed rows (a few, not all careers)
+        rows = players[players['Player'].isin(removed['Player'])]
+        career = fix_span(career, season_span(rows, 'Player'))
+        teams = fix_span(teams, season_span(rows[~rows['Tm'].isin(COMBINED_TEAMS)], ['Player', 'Tm']))
+    career, teams = finish(league, career), finish(league, teams)
+    save(league, career, teams)
+    return career, teams
+
+
+def build(league, players):
+    """Rebuild the aggregates from scratch from all seasons."""
+    for name in [CAREER_FILE, TEAMS_FILE]:
+        path = os.path.join(seasons.data_dir(league), name)
+        if os.path.exists(path):
+            os.remove(path)
+    return update(league, added=players)
@@ -0,0 +1,138 @@
+"""Memoized % price change bar charts for the crypto app.
+
+The app used to have one copy of the chart code per timeframe (7d, 24h, 1h);
+each rerun re-sorted the table, recomputed the colors and drew a new
+5x25-inch pyplot figure, even if only another widget had changed. Here:
+
+- change_orders(): once per snapshot (and currency), the values, the
+  sort order and the sign mask of every timeframe, as NumPy arrays.
+- ChangeCharts.chart(): PNG bytes of the chart, memoized on
+  (snapshot id, currency, timeframe, sort, selection); the selection is
+  keyed by a digest of the row positions. Toggling the timeframe or the
+  sort order back and forth only looks up the memo.
+
+One ChangeCharts instance can be shared by all sessions (e.g., with st.cache).
+
+Usage:
+
+    charts = ChangeCharts()
+    png = charts.chart(snapshot_id, 'USD', df, positions, '7d', sort=True)
+    st.image(png)
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from common.lazy import lazy_import
+
+# matplotlib is imported when the first chart is drawn (see common/lazy.py)
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+mpl_figure = lazy_import('matplotlib.figure')
+
+TIMEFRAMES = {'7d': 'percent_change_7d', '24h': 'percent_change_24h', '1h': 'percent_change_1h'}
+# At most MAX_BARS bars are drawn: the largest MAX_BARS // 2 gains and losses
+MAX_BARS = 100
+
+
+def change_orders(df):
+    """timeframe -> (values, order, positive) for the rows of df.
+
+    order: row positions sorted by value (stable; NaN last).
+    """
+    orders = {}
+    for timeframe, column in TIMEFRAMES.items():
+        values = df[column].to_numpy(dtype=np.float64)
+        orders[timeframe] = (values, np.argsort(values, kind='stable'), values > 0)
+    return orders
+
+
+def selection_key(positions):
+    """Cheap, fixed-size key of a selection of row positions."""
+    positions = np.ascontiguousarray(positions, dtype=np.int64)
+    return hashlib.blake2b(positions.tobytes(), digest_size=16).hexdigest()
+
+
+def bar_positions(values, order, positions, sort):
+    """Row positions of the bars, bottom to top.
+
+    The selection keeps its order (or the sort order), and is reduced to
+    its largest gains and losses if it has more than MAX_BARS rows.
+    """
+    if sort:
+        selected = np.zeros(len(values), dtype=bool)
+        selected[positions] = True
+        positions = order[selected[order]]
+    if len(positions) <= MAX_BARS:
+        return positions
+    # Extremes of the selection, in the current order (NaN never selected)
+    selection = values[positions]
+    ranked = np.argsort(np.where(np.isnan(selection), np.inf, selection), kind='stable')
+    valid = np.count_nonzero(~np.isnan(selection))
+    half = MAX_BARS // 2
+    keep = np.union1d(ranked[:min(half, valid)], ranked[max(0, valid - half):valid])
+    return positions[keep]
+
+
+def bar_chart(symbols, values, positive):
+    """PNG bytes of the horizontal bar chart (green: gain, red: loss)."""
+    fig = mpl_figure.Figure(figsize=(5, max(2, 0.25 * len(values))))
+    backend_agg.FigureCanvasAgg(fig)
+    fig.subplots_adjust(top=1, bottom=0)
+    ax = fig.add_subplot()
+    ax.barh(np.arange(len(values)), values, color=np.where(positive, 'g', 'r'))
+    ax.set_yticks(np.arange(len(values)))
+    ax.set_yticklabels(symbols)
+    ax.set_ylabel('coin_symbol')
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    return buffer.getvalue()
+
+
+class ChangeCharts:
+    """Memo of sort orders per snapshot and of rendered charts; thread-safe."""
+
+    def __init__(self, max_charts=256, max_snapshots=8):
+        self.max_charts = max_charts
+        self.max_snapshots = max_snapshots
+        self.hits = 0
+        self.misses = 0
+        self._orders = OrderedDict()  # (snapshot id, currency) -> change_orders()
+        self._charts = OrderedDict()  # (snapshot id, currency, timeframe, sort, selection) -> PNG
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _remember(memo, key, value, size):
+        memo[key] = value
+        while len(memo) > size:
+            memo.popitem(last=False)
+
+    def orders(self, snapshot_id, currency, df):
+        """change_orders(df), computed once per snapshot and currency."""
+        key = (snapshot_id, currency)
+        with self._lock:
+            if key in self._orders:
+                self._orders.move_to_end(key)
+                return self._orders[key]
+        orders = change_orders(df)
+        with self._lock:
+            self._remember(self._orders, key, orders, self.max_snapshots)
+        return orders
+
+    def chart(self, snapshot_id, currency, df, positions, timeframe, sort):
+        """PNG bytes of the chart of the rows at positions of df (a snapshot in currency)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        key = (snapshot_id, currency, timeframe, bool(sort), selection_key(positions))
+        with self._lock:
+            if key in self._charts:
+                self._charts.move_to_end(key)
+                self.hits += 1
+                return self._charts[key]
+            self.misses += 1
+        values, order, positive = self.orders(snapshot_id, currency, df)[timeframe]
+        bars = bar_positions(values, order, positions, sort)
+        png = bar_chart(df['coin_symbol'].to_numpy()[bars], values[bars], positive[bars])
+        with self._lock:
+            self._remember(self._charts, key, png, self.max_charts)
+        return png
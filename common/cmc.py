@@ -0,0 +1,490 @@
+"""Fast extraction of the coin listing embedded in CoinMarketCap pages.
+
+The CoinMarketCap front page embeds its data in a script tag:
+
+    <script id="__NEXT_DATA__" type="application/json">{...}</script>
+
+load_data() in the crypto app parsed the complete HTML with BeautifulSoup
+just to find that tag, and built eight Python lists row by row. Here:
+
+- The payload is located with plain byte searches (no HTML parsing).
+- It is decoded with a single json.loads(). Newer pages embed
+  props.initialState as a JSON string, so that part is decoded once more;
+  there is no way around that.
+- The listing is {keysArr: [...]} followed by one list per coin; we pick
+  the needed positions of every row with operator.itemgetter and build
+  the dataframe column-wise in one go.
+
+A snapshot holds the quotes in all CURRENCIES side by side, so that the
+currency selector of the app is a column switch (in_currency()), not a
+new request. A SnapshotCache keeps the latest snapshot for a TTL and can
+be shared by all sessions; a Poller refreshes it periodically and keeps
+the recent prices in ring buffers. fixture_server() serves fixture pages locally,
+to run the app (CMC_URL=http://localhost:8765) or tests offline.
+
+Usage:
+
+    html = fetch.content(CMC_URL)
+    df = coins_frame(html, 'USD')
+
+    cache = SnapshotCache(CMC_URL, ttl=300)
+    df = in_currency(cache.snapshot(), 'BTC')
+
+    # Beyond the front page: 50 pages of 100 coins, 8 requests at a time
+    snapshot = fetch_listing(CMC_URL, pages=50, max_workers=8, retries=3)
+
+    # Offline: a page with the same structure, or a local server
+    html = fixture_page(n_coins=100)
+    $ python -m common.cmc serve --port 8765 [--coins 5000] [--change-every 5] [--fail-rate 0.1]
+
+    # Live mode: one poller for all sessions, prices kept in ring buffers
+    poller = Poller(cache, interval=60, capacity=720).start()
+    times, prices = poller.buffers['USD'].window(['BTC', 'ETH'])
+"""
+import argparse
+import http.server
+import json
+import operator
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import requests
+
+from common import fetch
+from common.ringbuffer import RingBuffer
+
+CMC_URL = 'https://coinmarketcap.com'
+CURRENCIES = ['USD', 'BTC', 'ETH']
+# Column in the apps -> key suffix in keysArr ('quote.<currency>.<suffix>')
+QUOTE_FIELDS = {
+    'market_cap': 'marketCap',
+    'percent_change_1h': 'percentChange1h',
+    'percent_change_24h': 'percentChange24h',
+    'percent_change_7d': 'percentChange7d',
+    'price': 'price',
+    'volume_24h': 'volume24h',
+}
+COLUMNS = ['coin_name', 'coin_symbol', 'market_cap', 'percent_change_1h',
+           'percent_change_24h', 'percent_change_7d', 'price', 'volume_24h']
+
+# The front page lists PAGE_SIZE coins; the next ones are in ?page=2, 3, ...
+PAGE_SIZE = 100
+# Answers worth retrying (rate limits, overloaded or restarting servers)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+START_MARKER = b'id="__NEXT_DATA__"'
+END_MARKER = b'</script>'
+
+
+def next_data(html):
+    """Raw JSON bytes of the __NEXT_DATA__ script tag."""
+    if isinstance(html, str):
+        html = html.encode()
+    tag = html.find(START_MARKER)
+    if tag < 0:
+        raise ValueError('No __NEXT_DATA__ script in the page')
+    start = html.index(b'>', tag) + 1
+    end = html.index(END_MARKER, start)
+    return html[start:end]
+
+
+def listing(html):
+    """(keys, rows) of the latest listing: keysArr and one list per coin."""
+    data = json.loads(next_data(html))
+    state = data['props']['initialState']
+    if isinstance(state, str):
+        state = json.loads(state)
+    listings = state['cryptocurrency']['listingLatest']['data']
+    return listings[0]['keysArr'], listings[1:]
+
+
+def columns(keys, rows, wanted):
+    """Pick the columns wanted (name -> key) from the rows: name -> tuple of values."""
+    key2idx = {key: i for i, key in enumerate(keys)}
+    names = list(wanted)
+    # itemgetter of 2+ positions returns a tuple per row (position 0 is appended
+    # so that there are always 2+, and dropped by zip below); zip(*...) transposes in C
+    getter = operator.itemgetter(*[key2idx[wanted[name]] for name in names], 0)
+    picked = list(zip(*map(getter, rows))) if rows else [()] * (len(names) + 1)
+    return dict(zip(names, picked))
+
+
+def coins_frame(html, currency='USD'):
+    """The dataframe of the crypto app (COLUMNS) for one quote currency."""
+    keys, rows = listing(html)
+    wanted = {'coin_name': 'slug', 'coin_symbol': 'symbol'}
+    wanted.update({name: 'quote.' + currency + '.' + suffix for name, suffix in QUOTE_FIELDS.items()})
+    picked = columns(keys, rows, wanted)
+    df = pd.DataFrame({name: np.array(picked[name], dtype=object) for name in ['coin_name', 'coin_symbol']})
+    for name in QUOTE_FIELDS:
+        # None (e.g. no volume yet) -> NaN
+        df[name] = np.array(picked[name], dtype=np.float64)
+    return df[COLUMNS]
+
+
+def snapshot_frame(html, currencies=CURRENCIES):
+    """coin_name, coin_symbol and '<field>.<currency>' columns for all currencies.
+
+    Quote currencies missing in the page but listed as coins (BTC, ETH)
+    are derived from the USD quotes with the USD price of that coin.
+    """
+    keys, rows = listing(html)
+    present = [c for c in currencies if 'quote.' + c + '.price' in keys]
+    wanted = {'coin_name': 'slug', 'coin_symbol': 'symbol'}
+    for c in present:
+        wanted.update({name + '.' + c: 'quote.' + c + '.' + suffix for name, suffix in QUOTE_FIELDS.items()})
+    picked = columns(keys, rows, wanted)
+    data = {name: np.array(picked[name], dtype=object) for name in ['coin_name', 'coin_symbol']}
+    for name in wanted:
+        if name not in data:
+            data[name] = np.array(picked[name], dtype=np.float64)
+    for c in currencies:
+        if c in present or 'USD' not in present:
+            continue
+        rate = np.flatnonzero(data['coin_symbol'] == c)
+        if not len(rate):
+            continue
+        rate = rate[0]
+        for name in ['market_cap', 'price', 'volume_24h']:
+            data[name + '.' + c] = data[name + '.USD'] / data['price.USD'][rate]
+        for name in ['percent_change_1h', 'percent_change_24h', 'percent_change_7d']:
+            # Change relative to the coin: (1 + a) / (1 + b) - 1, in %
+            usd = data[name + '.USD']
+            data[name + '.' + c] = ((1 + usd / 100) / (1 + usd[rate] / 100) - 1) * 100
+    return pd.DataFrame(data)
+
+
+def in_currency(snapshot, currency):
+    """The dataframe of the crypto app (COLUMNS) from a snapshot; no I/O."""
+    if 'price.' + currency not in snapshot:
+        raise ValueError(f'No {currency} quotes in the snapshot')
+    df = snapshot[['coin_name', 'coin_symbol'] + [name + '.' + currency for name in QUOTE_FIELDS]]
+    df.columns = ['coin_name', 'coin_symbol'] + list(QUOTE_FIELDS)
+    return df[COLUMNS]
+
+
+def fetch_page(url, page=1, retries=3, backoff=0.5, timeout=30, sleep=time.sleep):
+    """HTML bytes of one listing page; retried with exponential backoff.
+
+    Connection errors, timeouts and RETRY_STATUS answers are retried;
+    other HTTP errors (e.g., 404) are raised right away. The requests go
+    through common/fetch.py (pooled connections, record/replay).
+    """
+    for attempt in range(retries + 1):
+        try:
+            response = fetch.get(url, params={'page': page} if page > 1 else None, timeout=timeout)
+            if response.status_code not in RETRY_STATUS:
+                response.raise_for_status()
+                return response.content
+            error = requests.HTTPError(f'{response.status_code} for page {page}', response=response)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+        if attempt < retries:
+            sleep(backoff * 2 ** attempt)
+    raise error
+
+
+def fetch_listing(url, pages=1, currencies=CURRENCIES, max_workers=8, retries=3, timeout=30):
+    """Snapshot of the first pages listing pages, fetched concurrently.
+
+    At most max_workers requests are in flight at once (be nice to the server).
+    Each page is parsed as soon as it arrives; the pages are merged in order
+    into one columnar frame. A coin can move to the next page between two
+    requests, so duplicates are dropped (first occurrence wins).
+    """
+    def load(page):
+        return snapshot_frame(fetch_page(url, page, retries, timeout=timeout), currencies)
+
+    if pages <= 1:
+        return load(1)
+    with ThreadPoolExecutor(max_workers=min(max_workers, pages)) as pool:
+        frames = list(pool.map(load, range(1, pages + 1)))
+    snapshot = pd.concat(frames, ignore_index=True)
+    return snapshot.drop_duplicates('coin_name', ignore_index=True)
+
+
+class SnapshotCache:
+    """Latest snapshot of the listing pages, refetched after the TTL; thread-safe.
+
+    One instance can be shared by all sessions (e.g., with st.cache).
+    """
+
+    def __init__(self, url=CMC_URL, ttl=300, clock=time.time, currencies=CURRENCIES, timeout=30,
+                 pages=1, max_workers=8, retries=3):
+        self.url = url
+        self.ttl = ttl
+        self.clock = clock
+        self.currencies = currencies
+        self.timeout = timeout
+        self.pages = pages
+        self.max_workers = max_workers
+        self.retries = retries
+        self.fetch_count = 0
+        self.fetched_at = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def fetch(self):
+        """A new snapshot from the listing pages; bypasses the cache."""
+        return fetch_listing(self.url, self.pages, self.currencies, self.max_workers, self.retries, self.timeout)
+
+    def current(self):
+        """(snapshot id, snapshot); fetched if there is none or it is older than the TTL.
+
+        The id changes with every fetch, so it can key anything derived from the snapshot.
+        """
+        # Concurrent sessions wait for the same fetch instead of all fetching
+        with self._lock:
+            now = self.clock()
+            if self._snapshot is None or now - self.fetched_at >= self.ttl:
+                self._snapshot = self.fetch()
+                self.fetched_at = now
+                self.fetch_count += 1
+            return self.fetch_count, self._snapshot
+
+    def snapshot(self):
+        """The cached snapshot; see current()."""
+        return self.current()[1]
+
+    def refresh(self):
+        """Fetch a new snapshot now (e.g., from a Poller) and return it."""
+        snapshot = self.fetch()
+        with self._lock:
+            self._snapshot = snapshot
+            self.fetched_at = self.clock()
+            self.fetch_count += 1
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self.fetched_at = None
+
+
+class Poller:
+    """Refreshes a SnapshotCache every interval seconds in a background thread.
+
+    The prices of every snapshot are appended to one RingBuffer per
+    currency (coin symbol -> price), so the last capacity snapshots
+    are available for sparklines and rolling changes.
+    A single Poller is shared by all sessions (e.g., with st.cache);
+    sessions only read the buffers.
+    """
+
+    def __init__(self, cache, interval=60, capacity=720):
+        self.cache = cache
+        self.interval = interval
+        self.buffers = {c: RingBuffer(capacity) for c in cache.currencies}
+        self.errors = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """One poll: refresh the snapshot and append its prices."""
+        snapshot = self.cache.refresh()
+        now = self.cache.fetched_at
+        symbols = list(snapshot['coin_symbol'])
+        for c, buffer in self.buffers.items():
+            if 'price.' + c in snapshot:
+                buffer.append(now, symbols, snapshot['price.' + c].to_numpy())
+        return snapshot
+
+    def _run(self):
+        # The first poll was made by start()
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:  # keep polling; the source may be back next time
+                self.errors += 1
+                self.last_error = repr(e)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start polling, unless it is already running; returns self.
+
+        The first poll runs right away in the calling thread, so that the
+        caller already has fresh data; other sessions calling start()
+        meanwhile wait for it instead of polling too.
+        """
+        with self._lock:
+            if not self.running:
+                self._stop.clear()
+                self.poll()
+                self._thread = threading.Thread(target=self._run, name='cmc-poller', daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+# Fixtures: pages with the same structure as the real one, for benchmarks
+# and offline runs (the real page is ~1 MB and changes every minute).
+
+BASE_KEYS = ['id', 'name', 'symbol', 'slug', 'cmcRank', 'marketPairCount', 'circulatingSupply',
+             'selfReportedCirculatingSupply', 'totalSupply', 'maxSupply', 'isActive', 'lastUpdated',
+             'dateAdded', 'isAudited', 'badges']
+QUOTE_KEYS = ['name', 'price', 'volume24h', 'volume7d', 'volume30d', 'marketCap', 'selfReportedMarketCap',
+              'percentChange1h', 'percentChange24h', 'percentChange7d', 'lastUpdated', 'percentChange30d',
+              'percentChange60d', 'percentChange90d', 'fullyDilluttedMarketCap', 'marketCapByTotalSupply',
+              'dominance', 'turnover', 'ytdPriceChangePercentage', 'percentChange1y']
+
+
+def fixture_listing(n_coins=100, seed=0, currencies=CURRENCIES, step=0):
+    """(keys, rows) with random values in the layout of listingLatest.
+
+    step > 0: USD prices after step steps of a random walk (~0.3% per step),
+    to simulate a page that changes over time.
+    """
+    rng = np.random.default_rng(seed)
+    keys = BASE_KEYS + ['quote.' + c + '.' + k for c in currencies for k in QUOTE_KEYS]
+    # Prices relative to the first currency; BTC/ETH quotes are USD / their price
+    usd = np.sort(rng.lognormal(0, 3, n_coins))[::-1]
+    usd[:2] = [60000.0, 3000.0] if n_coins >= 2 else usd[:2]
+    if step:
+        walk = np.random.default_rng(seed + 1).normal(0, 0.003, (step, n_coins))
+        usd = usd * np.exp(walk.sum(axis=0))
+    supply = rng.lognormal(18, 2, n_coins)
+    unit = {'USD': 1.0, 'BTC': float(usd[0]), 'ETH': float(usd[min(1, n_coins - 1)])}
+    rows = []
+    for i in range(n_coins):
+        symbol = 'C%03d' % i if i >= 2 else ['BTC', 'ETH'][i]
+        row = [i + 1, 'Coin %d' % i, symbol, 'coin-%d' % i, i + 1, int(rng.integers(1, 500)),
+               float(supply[i]), 0, float(supply[i]), None, 1, '2024-01-01T00:00:00.000Z',
+               '2020-01-01T00:00:00.000Z', False, []]
+        changes = rng.normal(0, [1, 4, 10, 20, 30, 40, 50], 7)
+        for c in currencies:
+            price = float(usd[i]) / unit.get(c, 1.0)
+            row += [c, price, price * supply[i] * 0.05, price * supply[i] * 0.3, price * supply[i],
+                    price * supply[i], 0, float(changes[0]), float(changes[1]), float(changes[2]),
+                    '2024-01-01T00:00:00.000Z', float(changes[3]), float(changes[4]), float(changes[5]),
+                    price * supply[i], price * supply[i], 0.1, 0.05, float(changes[6]), float(changes[6])]
+        rows.append(row)
+    return keys, rows
+
+
+def listing_page(keys, rows, page=1):
+    """HTML bytes of a page with the listing (keys, rows), like the real one.
+
+    The real page also has the markup of the table and other scripts,
+    which any HTML parser has to go through as well.
+    """
+    state = {'cryptocurrency': {'listingLatest': {'page': page, 'sort': 'rank', 'data': [{'keysArr': keys}] + rows}}}
+    data = {'props': {'initialState': json.dumps(state)}, 'page': '/', 'query': {'page': str(page)}}
+    table = ''.join(
+        '<tr><td><span class="rank">%d</span></td><td><div class="name"><a href="/currencies/%s/">'
+        '<p>%s</p><p class="symbol">%s</p></a></div></td><td><div class="price"><span>$%.2f</span></div></td>'
+        '<td><span class="change">%.2f%%</span></td></tr>' % (row[0], row[3], row[1], row[2], row[16], row[22])
+        for row in rows)
+    html = ('<!DOCTYPE html><html><head><meta charset="utf-8"><title>Cryptocurrency Prices</title>'
+            '<script src="/static/main.js"></script></head><body><div id="__next"><table><tbody>' + table +
+            '</tbody></table></div><script id="__NEXT_DATA__" type="application/json">' + json.dumps(data) +
+            '</script></body></html>')
+    return html.encode()
+
+
+def fixture_page(n_coins=100, seed=0, currencies=CURRENCIES, step=0, page=None, page_size=PAGE_SIZE):
+    """HTML bytes of a page with a fixture listing of n_coins.
+
+    page=None: all coins in one page; otherwise only the coins of that page
+    (1-based; the pages after the last coin are empty).
+    """
+    keys, rows = fixture_listing(n_coins, seed, currencies, step)
+    if page is None:
+        return listing_page(keys, rows)
+    return listing_page(keys, rows[(page - 1) * page_size:page * page_size], page)
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the fixture pages of its server (?page=N; default 1)."""
+
+    def do_GET(self):
+        if self.server.fail_rate and self.server.random.random() < self.server.fail_rate:
+            self.send_error(503)
+            return
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        try:
+            page = int(query.get('page', ['1'])[0])
+        except ValueError:
+            page = 0
+        if page < 1:
+            self.send_error(400)
+            return
+        body = self.server.page(page)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def fixture_server(port=0, n_coins=100, seed=0, currencies=CURRENCIES, change_every=None, clock=time.time,
+                   fail_rate=0.0):
+    """Local stand-in for CMC_URL, serving fixture pages in a daemon thread.
+
+    port=0 picks a free port; the URL is f'http://127.0.0.1:{server.server_port}'.
+    n_coins are split in pages of PAGE_SIZE coins (?page=N).
+    change_every: seconds after which the pages move one step ahead
+    (prices follow a random walk); None: always the same pages.
+    fail_rate: fraction of requests answered with 503, to test retries.
+    Stop it with server.shutdown().
+    """
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', port), FixtureHandler)
+    server.fail_rate = fail_rate
+    server.random = random.Random(seed)
+    started = clock()
+    cache = {}  # (step, page) -> HTML; and step -> (keys, rows)
+    lock = threading.Lock()
+
+    def page(number):
+        step = int((clock() - started) // change_every) if change_every else 0
+        with lock:
+            if step not in cache:
+                cache.clear()
+                cache[step] = fixture_listing(n_coins, seed, currencies, step)
+            if (step, number) not in cache:
+                keys, rows = cache[step]
+                cache[step, number] = listing_page(keys, rows[(number - 1) * PAGE_SIZE:number * PAGE_SIZE], number)
+            return cache[step, number]
+
+    server.page = page
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in server for CoinMarketCap pages.')
+    parser.add_argument('command', choices=['serve'])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--coins', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--change-every', type=float, help='seconds between price changes (default: never)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='fraction of requests answered with 503')
+    args = parser.parse_args()
+    server = fixture_server(args.port, args.coins, args.seed, change_every=args.change_every,
+                            fail_rate=args.fail_rate)
+    print(f'Serving {args.coins} coins on http://127.0.0.1:{server.server_port} (Ctrl+C to stop)')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""File downloads for (filtered) dataframes.
+
+The original apps used a base64 data-URI link:
+
+    csv = df.to_csv(index=False)
+    b64 = base64.b64encode(csv.encode()).decode()
+    href = f'<a href="data:file/csv;base64,{b64}" ...>'
+
+That serializes and encodes the whole dataframe on every rerun
+(CSV string + bytes + base64 string, ~2.3x the data size) and pushes
+it to the browser even if nobody downloads anything.
+
+Here, instead:
+
+- Nothing is generated until the user clicks on "Prepare download".
+- The file is written chunk by chunk into a spooled temporary file,
+  so we never hold the complete CSV text in memory.
+- The file is compressed: gzip CSV or Parquet (if pyarrow is installed).
+- The file is served with st.download_button, i.e., via the
+  Streamlit media endpoint and not inlined in the page.
+
+Usage:
+
+    from common.download import download_buttons
+    download_buttons(df_selected_team, 'playerstats')  # a dataframe or a RowSelection
+"""
+import gzip
+import tempfile
+
+import streamlit as st
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet is optional
+    pa = None
+    pq = None
+
+# Rows serialized per chunk
+CHUNK_ROWS = 100_000
+# Temporary files are kept in memory up to this size, then spilled to disk
+SPOOL_MAX_BYTES = 32 * 1024 * 1024
+
+
+def iter_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Yield consecutive row slices (views) of df.
+
+    df can also be a common.memory.RowSelection: then each chunk is a small
+    frame of its own, and the selection is never copied as a whole.
+    """
+    if hasattr(df, 'iter_frames'):
+        yield from df.iter_frames(chunk_rows)
+        return
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Yield the CSV text of df as encoded byte chunks; header only once."""
+    for i, chunk in enumerate(iter_chunks(df, chunk_rows)):
+        yield chunk.to_csv(index=False, header=(i == 0)).encode()
+
+
+def write_csv_gz(df, fileobj, chunk_rows=CHUNK_ROWS):
+    """Write df as gzip-compressed CSV into an open binary file."""
+    # Level 1: much faster than the default 9 and still ~4x smaller than plain CSV
+    with gzip.GzipFile(fileobj=fileobj, mode='wb', compresslevel=1) as gz:
+        for block in iter_csv_chunks(df, chunk_rows):
+            gz.write(block)
+
+
+def write_parquet(df, fileobj, chunk_rows=CHUNK_ROWS):
+    """Write df as Parquet into an open binary file, one row group per chunk."""
+    # Scraped tables have object columns with mixed values
+    # (e.g., strings and the 0 from fillna(0)); Parquet needs one type per column
+    as_text = {col: str for col, dtype in df.dtypes.items() if dtype == object}
+    writer = None
+    try:
+        for chunk in iter_chunks(df, chunk_rows):
+            table = pa.Table.from_pandas(chunk.astype(as_text), preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(fileobj, table.schema, compression='snappy')
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+# Format label -> (file extension, MIME type, writer)
+FORMATS = {
+    'CSV (gzip)': ('csv.gz', 'application/gzip', write_csv_gz),
+}
+if pq is not None:
+    FORMATS['Parquet'] = ('parquet', 'application/vnd.apache.parquet', write_parquet)
+
+
+def build_file(df, fmt='CSV (gzip)', chunk_rows=CHUNK_ROWS):
+    """Serialize df in the given format; returns a rewound binary file object."""
+    _, _, writer = FORMATS[fmt]
+    fileobj = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    writer(df, fileobj, chunk_rows)
+    fileobj.seek(0)
+    return fileobj
+
+
+def download_buttons(df, file_name, container=st):
+    """Format selector + lazy download button for df.
+
+    The file is only built in the rerun triggered by "Prepare download";
+    in any other rerun this costs two small widgets and no serialization.
+    container can be st, st.sidebar or a column.
+    """
+    fmt = container.selectbox('Download format', list(FORMATS), key=file_name + '_download_format')
+    if container.button('Prepare download', key=file_name + '_download_prepare'):
+        extension, mime, _ = FORMATS[fmt]
+        with st.spinner('Preparing file...'):
+            with build_file(df, fmt) as fileobj:
+                data = fileobj.read()  # compressed bytes only
+        container.download_button(
+            label='Download ' + fmt + ' File',
+            data=data,
+            file_name=file_name + '.' + extension,
+            mime=mime,
+            key=file_name + '_download_button',
+        )
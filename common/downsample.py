@@ -0,0 +1,106 @@
+"""Downsampling of long time series before charting them.
+
+st.line_chart() sends every point to the browser: 10 years of daily prices
+are ~2.5k points, but intraday data quickly grows to millions, which makes
+the transfer and the rendering slow. A chart a few hundred pixels wide
+can't show more than a couple of points per pixel anyway.
+
+Two methods reduce a series to (about) a target number of points
+while keeping the visual peaks:
+
+- lttb: Largest-Triangle-Three-Buckets (Steinarsson, 2013);
+  per bucket, keep the point that forms the largest triangle with the
+  point kept in the previous bucket and the mean of the next bucket.
+- minmax: keep the minimum and the maximum of each bucket.
+
+Usage:
+
+    st.line_chart(downsample(tickerDf.Close, 1000))
+"""
+import numpy as np
+import pandas as pd
+
+METHODS = ['lttb', 'minmax']
+
+
+def _as_float(x):
+    """Datetimes -> int64 ns -> float, so that we can compute areas."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype('datetime64[ns]').astype(np.int64)
+    return x.astype(np.float64)
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the n_out points kept by LTTB; first and last are always kept."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = _as_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    # Mean of each bucket (the next bucket's mean is the third triangle vertex)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Twice the triangle area; the constant factor doesn't change the argmax
+        area = np.abs((x[a] - mean_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (mean_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(y, n_out):
+    """Indices of the min and max of n_out // 2 buckets, sorted; first/last kept."""
+    n = len(y)
+    n_buckets = n_out // 2
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    # Pad the buckets to equal length so that argmin/argmax are vectorized
+    width = int(np.diff(edges).max())
+    rows = edges[:-1, None] + np.arange(width)[None, :]
+    valid = rows < edges[1:, None]
+    rows = np.minimum(rows, n - 1)
+    values = y[rows]
+    lows = np.where(valid, values, np.inf).argmin(axis=1)
+    highs = np.where(valid, values, -np.inf).argmax(axis=1)
+    keep = np.concatenate([[0], rows[np.arange(n_buckets), lows], rows[np.arange(n_buckets), highs], [n - 1]])
+    return np.unique(keep)
+
+
+def downsample(series, n_out=1000, method='lttb'):
+    """Downsample a pandas Series (index = x axis) to about n_out points.
+
+    NaNs are dropped first; the index of the kept points is preserved.
+    """
+    series = series.dropna()
+    if len(series) <= n_out:
+        return series
+    if method == 'lttb':
+        keep = lttb_indices(series.index.values, series.values, n_out)
+    elif method == 'minmax':
+        keep = minmax_indices(series.values, n_out)
+    else:
+        raise ValueError(f'Unknown method {method!r}; use one of {METHODS}')
+    return series.iloc[keep]
+
+
+def downsample_frame(df, n_out=1000, method='lttb'):
+    """Downsample each column of df separately and align them on the union index.
+
+    The gaps of each column are filled by linear interpolation along the
+    index, which is what its line would show between the kept points anyway.
+    """
+    df = pd.concat({col: downsample(df[col], n_out, method) for col in df.columns}, axis=1)
+    return df.interpolate(method='index', limit_area='inside')
@@ -0,0 +1,284 @@
+"""Shared HTTP layer for the scraped data sources: pooled, conditional, recordable.
+
+The apps fetched basketball-reference, pro-football-reference, Wikipedia,
+CoinMarketCap and lib.stat.cmu.edu with pd.read_html(url),
+pd.read_csv(url) or requests.get(url): a new connection for every
+request, and the whole page downloaded again every time a cache expired.
+Here, all of them go through one Fetcher per process:
+
+- A pooled requests.Session: keep-alive connections per host.
+- An on-disk response cache (body + ETag/Last-Modified). Within ttl
+  seconds a response is served without any request; after that,
+  the request is conditional (If-None-Match / If-Modified-Since) and
+  a 304 Not Modified reuses the cached body.
+- Record/replay: with FETCH_MODE=record every response is also saved
+  in a cassette folder; with FETCH_MODE=replay responses only come from
+  the cassette (no network at all; a missing one raises FetchError),
+  so that benchmarks and tests run offline and reproducibly.
+- Stats per host: requests sent, bytes downloaded, requests avoided
+  (fresh or replayed) or answered with 304, and the bytes they saved;
+  also exported as counters of common/metrics.py.
+
+Sources that are not plain pages (e.g., Yahoo Finance through yfinance)
+can take part in record/replay with Fetcher.recorded().
+
+Configuration (environment variables):
+
+- FETCH_MODE: live (default), record or replay
+- FETCH_CACHE_DIR: response cache (default: data/http_cache in the repository)
+- FETCH_CASSETTE: cassette folder for record/replay (default: FETCH_CACHE_DIR)
+
+Usage:
+
+    from common import fetch
+    html = fetch.text(url, ttl=3600)  # or fetch.get(url): Response
+    df = pd.read_html(io.StringIO(html), header=0)[0]
+    fetch.stats()
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import pandas as pd
+import requests
+
+from common import metrics
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+MODES = ['live', 'record', 'replay']
+CACHE_DIR = os.path.join(ROOT, 'data', 'http_cache')
+# Some sources answer 403 to the default python-requests agent
+USER_AGENT = 'Mozilla/5.0 (compatible; streamlit-guide-apps)'
+POOL_SIZE = 16
+COUNTERS = ['requests', 'bytes', 'fresh', 'not_modified', 'replayed', 'bytes_avoided']
+
+
+class FetchError(Exception):
+    """A response that can't be served, e.g., missing from the cassette in replay mode."""
+
+
+class Response:
+    """The parts of a requests.Response the apps use; source tells where it came from:
+    'network', 'not_modified' (304, cached body), 'fresh' (cache, no request) or 'replay'."""
+
+    def __init__(self, url, status_code, content, headers, source):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.source = source
+
+    @property
+    def text(self):
+        encoding = requests.utils.get_encoding_from_headers(self.headers) or 'utf-8'
+        return self.content.decode(encoding, errors='replace')
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f'{self.status_code} for {self.url}', response=self)
+
+
+def request_key(url, params=None):
+    """File name of a request: host + hash of the URL with its (sorted) parameters."""
+    if params:
+        url += ('&' if '?' in url else '?') + urllib.parse.urlencode(sorted(params.items()))
+    host = urllib.parse.urlsplit(url).netloc.replace(':', '_') or 'local'
+    return host + '-' + hashlib.sha1(url.encode()).hexdigest()[:20], url
+
+
+class Store:
+    """Responses on disk: <key>.body and <key>.json (status, headers, stored_at)."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def load(self, key):
+        """(meta, body) or None."""
+        try:
+            with open(os.path.join(self.folder, key + '.json')) as f:
+                meta = json.load(f)
+            with open(os.path.join(self.folder, key + '.body'), 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, path, data):
+        # Write to a temporary file first: readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+    def save(self, key, meta, body):
+        os.makedirs(self.folder, exist_ok=True)
+        # Body first: a meta file always has its body
+        self._write(os.path.join(self.folder, key + '.body'), body)
+        self._write(os.path.join(self.folder, key + '.json'), json.dumps(meta).encode())
+
+    def touch(self, key, meta):
+        meta = dict(meta, stored_at=time.time())
+        self._write(os.path.join(self.folder, key + '.json'), json.dumps(meta).encode())
+
+
+class Fetcher:
+    """GET with a pooled session, a conditional disk cache and record/replay; thread-safe."""
+
+    def __init__(self, mode='live', cache_dir=CACHE_DIR, cassette=None, pool_size=POOL_SIZE,
+                 session=None, clock=time.time):
+        if mode not in MODES:
+            raise ValueError(f'mode should be one of {MODES}, not {mode!r}')
+        self.mode = mode
+        self.cache = Store(cache_dir) if cache_dir else None
+        self.cassette = Store(cassette or cache_dir) if mode != 'live' else None
+        self.clock = clock
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+            self.session.headers['User-Agent'] = USER_AGENT
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _count(self, host, **values):
+        with self._lock:
+            counters = self._stats.setdefault(host, dict.fromkeys(COUNTERS, 0))
+            for name, value in values.items():
+                counters[name] += value
+        for name, value in values.items():
+            metrics.increment(f'app_http_{name}_total', value, host=host)
+
+    def _record(self, key, meta, body):
+        if self.mode == 'record' and self.cassette.folder != getattr(self.cache, 'folder', None):
+            self.cassette.save(key, meta, body)
+
+    def get(self, url, params=None, ttl=0, timeout=30, headers=None):
+        """Response of GET url (see the module docstring).
+
+        ttl: seconds during which a cached response is served without any
+        request (0: always revalidate; None: never expires).
+        HTTP errors are returned, not raised (see Response.raise_for_status).
+        """
+        key, full_url = request_key(url, params)
+        host = urllib.parse.urlsplit(full_url).netloc
+        if self.mode == 'replay':
+            stored = self.cassette.load(key)
+            if stored is None:
+                raise FetchError(f'{full_url} is not in the cassette {self.cassette.folder}')
+            meta, body = stored
+            self._count(host, replayed=1, bytes_avoided=len(body))
+            return Response(full_url, meta['status'], body, meta['headers'], 'replay')
+
+        stored = self.cache.load(key) if self.cache else None
+        request_headers = dict(headers or {})
+        if stored is not None:
+            meta, body = stored
+            if ttl is None or self.clock() - meta['stored_at'] < ttl:
+                self._count(host, fresh=1, bytes_avoided=len(body))
+                self._record(key, meta, body)
+                return Response(full_url, meta['status'], body, meta['headers'], 'fresh')
+            if meta['headers'].get('ETag'):
+                request_headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        response = self.session.get(url, params=params, timeout=timeout, headers=request_headers)
+        if response.status_code == 304 and stored is not None:
+            meta, body = stored
+            self._count(host, requests=1, not_modified=1, bytes_avoided=len(body))
+            self.cache.touch(key, meta)
+            self._record(key, meta, body)
+            return Response(full_url, meta['status'], body, meta['headers'], 'not_modified')
+
+        body = response.content
+        # On the wire: compressed size if the server sent one
+        self._count(host, requests=1, bytes=int(response.headers.get('Content-Length') or len(body)))
+        kept = {name: response.headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified')
+                if name in response.headers}
+        meta = {'url': full_url, 'status': response.status_code, 'headers': kept, 'stored_at': self.clock()}
+        if self.cache and response.status_code == 200:
+            self.cache.save(key, meta, body)
+        self._record(key, meta, body)
+        return Response(full_url, response.status_code, body, kept, 'network')
+
+    def recorded(self, name, produce):
+        """Bytes of produce() (a call to a non-HTTP client), under record/replay.
+
+        live: produce(); record: produce() and save it in the cassette;
+        replay: the saved bytes (FetchError if missing). name identifies the call.
+        """
+        key, _ = request_key('recorded://' + name)
+        host = name.split('/')[0]
+        if self.mode == 'replay':
+            stored = self.cassette.load(key)
+            if stored is None:
+                raise FetchError(f'{name} is not in the cassette {self.cassette.folder}')
+            self._count(host, replayed=1, bytes_avoided=len(stored[1]))
+            return stored[1]
+        body = produce()
+        self._count(host, requests=1, bytes=len(body))
+        if self.mode == 'record':
+            self.cassette.save(key, {'url': name, 'status': 200, 'headers': {}, 'stored_at': self.clock()}, body)
+        return body
+
+    def stats(self):
+        """Dataframe with the counters of each host; avoided: share of the responses
+        served without downloading the body (fresh, replayed or 304)."""
+        with self._lock:
+            rows = [dict(counters, host=host) for host, counters in self._stats.items()]
+        if not rows:
+            return pd.DataFrame()
+        df = pd.DataFrame(rows).set_index('host')[COUNTERS]
+        served = df.requests + df.fresh + df.replayed
+        df['avoided'] = ((df.fresh + df.replayed + df.not_modified) / served).where(served > 0)
+        return df
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default():
+    """The Fetcher of this process, configured with the FETCH_* environment variables."""
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                cache_dir = os.environ.get('FETCH_CACHE_DIR', CACHE_DIR)
+                _default = Fetcher(os.environ.get('FETCH_MODE', 'live'), cache_dir,
+                                   os.environ.get('FETCH_CASSETTE') or None)
+    return _default
+
+
+def get(url, params=None, ttl=0, timeout=30, headers=None):
+    return default().get(url, params=params, ttl=ttl, timeout=timeout, headers=headers)
+
+
+def text(url, params=None, ttl=0):
+    """Decoded body of GET url; raises requests.HTTPError for error answers."""
+    response = get(url, params=params, ttl=ttl)
+    response.raise_for_status()
+    return response.text
+
+
+def content(url, params=None, ttl=0):
+    """Body (bytes) of GET url; raises requests.HTTPError for error answers."""
+    response = get(url, params=params, ttl=ttl)
+    response.raise_for_status()
+    return response.content
+
+
+def recorded(name, produce):
+    return default().recorded(name, produce)
+
+
+def stats():
+    return default().stats()
@@ -0,0 +1,87 @@
+"""Persistent cache of price histories for fixed, closed date ranges.
+
+The simple stock price apps chart a fixed historical range
+(2010-05-31 to 2020-05-31). That history never changes, so once it has
+been fetched it can be stored on disk and reused forever: repeated runs
+(and restarts) don't need any network I/O.
+
+One file per (ticker, start, end, interval), in a compact binary format:
+
+    <folder>/GOOGL_2010-05-31_2020-05-31_1d.npz
+        dates    int64 ns since epoch
+        values   float64 (n_dates x n_columns)
+        columns  column names
+
+Ranges that reach today (or later) are still open and are not persisted.
+Several tickers can be fetched concurrently with histories().
+
+Usage:
+
+    cache = HistoryCache('data/history', YahooProvider())
+    dfs = cache.histories(['GOOGL', 'AAPL'], '2010-05-31', '2020-05-31')
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class HistoryCache:
+    """On-disk cache in front of a common.prices.PriceProvider."""
+
+    def __init__(self, folder, provider, max_workers=8):
+        self.folder = folder
+        self.provider = provider
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, ticker, start, end):
+        interval = getattr(self.provider, 'interval', '1d')
+        name = f'{ticker}_{start.date()}_{end.date()}_{interval}.npz'
+        return os.path.join(self.folder, name)
+
+    @staticmethod
+    def _read(path):
+        with np.load(path, allow_pickle=False) as data:
+            index = pd.DatetimeIndex(data['dates'].astype('datetime64[ns]'), name='Date')
+            return pd.DataFrame(data['values'], index=index, columns=list(data['columns']))
+
+    def _write(self, path, df):
+        os.makedirs(self.folder, exist_ok=True)
+        # Write to a temporary file first: readers never see half a file
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(f, dates=df.index.values.astype('datetime64[ns]').astype(np.int64),
+                                values=df.to_numpy(dtype=np.float64),
+                                columns=np.array(df.columns, dtype=str))
+        os.replace(tmp, path)
+
+    def history(self, ticker, start, end):
+        """History of ticker in [start, end]; from disk if the range is closed and cached."""
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        closed = end < pd.Timestamp.today().normalize()
+        path = self._path(ticker, start, end)
+        if closed and os.path.exists(path):
+            with self._lock:
+                self.hits += 1
+            return self._read(path)
+        with self._lock:
+            self.misses += 1
+        df = self.provider.fetch(ticker, start, end)
+        if closed and len(df):
+            self._write(path, df)
+        return df
+
+    def histories(self, tickers, start, end):
+        """ticker -> history; the tickers are fetched concurrently (I/O-bound)."""
+        tickers = list(tickers)
+        if len(tickers) <= 1:
+            return {ticker: self.history(ticker, start, end) for ticker in tickers}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tickers))) as pool:
+            futures = {ticker: pool.submit(self.history, ticker, start, end) for ticker in tickers}
+            return {ticker: future.result() for ticker, future in futures.items()}
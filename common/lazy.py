@@ -0,0 +1,62 @@
+"""Lazy imports of heavy libraries.
+
+matplotlib, seaborn, shap, rdkit, altair, sklearn or st_aggrid take
+from tenths of a second to seconds to import, and the apps imported them at
+the top even when only a button (e.g., the heatmap) uses them. With:
+
+    from common.lazy import lazy_import
+    plt = lazy_import('matplotlib.pyplot')
+    sns = lazy_import('seaborn')
+
+the names work as before (plt.subplots(...), sns.heatmap(...)), but the
+module is imported on the first attribute access, i.e., at the point of
+use. After that, attributes are read from the proxy's own __dict__ (a copy
+of the module namespace), so the proxy costs nothing on later accesses.
+
+Missing optional libraries raise ImportError at the point of use too.
+Startup report per app: benchmarks/import_bench.py.
+"""
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_loaded'] = False
+
+    def _load(self):
+        module = importlib.import_module(self.__name__)
+        # Later accesses find the attributes without going through __getattr__
+        self.__dict__.update(module.__dict__)
+        self.__dict__['_lazy_loaded'] = True
+        return module
+
+    def __getattr__(self, attr):
+        module = self._load()
+        # Submodules imported after the first access (e.g., matplotlib.colors)
+        # are not in the copied namespace
+        return getattr(module, attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_loaded'] else 'not loaded'
+        return f'<lazy module {self.__name__!r} ({state})>'
+
+
+def lazy_import(name):
+    """Proxy of module name, imported on first use (or the module itself if already imported)."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def is_loaded(module):
+    """False for proxies that were not used yet."""
+    return not isinstance(module, LazyModule) or module.__dict__['_lazy_loaded']
@@ -0,0 +1,120 @@
+"""Memory held per session and per cache, and row selections without copies.
+
+In the EDA apps, every session filtered the cached frame with a boolean
+mask (df[mask]), i.e., a full copy of the selected rows, and then copied
+parts of it again (df_coins, df_change). With many sessions, the copies
+add up. Instead:
+
+- RowSelection: the positions of the selected rows in the shared base
+  frame (the one in the cache), as an int64 array: 8 bytes per row,
+  whatever the number of columns. A frame is only built where one is
+  needed (st.dataframe, a download), with the needed columns, and not
+  kept; downloads build it one chunk at a time (see common/download.py).
+- track(name, value): what a session holds, e.g., its selections; the
+  bytes are recorded per app and session (the last rerun of each of the
+  latest MAX_SESSIONS sessions).
+- sessions() / caches(): dataframes with the bytes held per session and
+  per cache (common/caching.py); also exported as the gauges
+  app_session_bytes and app_cache_bytes by common/metrics.py.
+
+Usage:
+
+    df_selected_team = RowSelection(playerstats, playerstats.Tm.isin(selected_team))
+    st.dataframe(df_selected_team.frame())
+    memory.track('df_selected_team', df_selected_team)
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from common import caching, metrics
+
+MAX_SESSIONS = metrics.MAX_SESSIONS
+
+
+class RowSelection:
+    """Selected rows of a shared base frame: positions only, no copy of the data."""
+
+    def __init__(self, base, rows):
+        """rows: boolean mask (array or Series aligned with base) or positions."""
+        self.base = base
+        rows = np.asarray(rows)
+        self.positions = np.flatnonzero(rows) if rows.dtype == bool else rows.astype(np.int64, copy=False)
+        self.positions.flags.writeable = False
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def shape(self):
+        return len(self.positions), self.base.shape[1]
+
+    @property
+    def columns(self):
+        return self.base.columns
+
+    @property
+    def dtypes(self):
+        return self.base.dtypes
+
+    @property
+    def nbytes(self):
+        """Bytes held by the selection itself (the base is shared)."""
+        return self.positions.nbytes
+
+    def head(self, n):
+        """The first n selected rows (a slice of the positions: a view)."""
+        return RowSelection(self.base, self.positions[:n])
+
+    def column(self, name):
+        """Values of one column for the selected rows (only that column is gathered)."""
+        return self.base[name].to_numpy()[self.positions]
+
+    def frame(self, columns=None):
+        """A new dataframe with the selected rows (and columns); don't keep it."""
+        base = self.base if columns is None else self.base[list(columns)]
+        return base.take(self.positions)
+
+    def iter_frames(self, chunk_rows):
+        """Frames of at most chunk_rows selected rows, e.g., to write a file."""
+        for start in range(0, max(len(self.positions), 1), chunk_rows):
+            yield self.base.take(self.positions[start:start + chunk_rows])
+
+
+_sessions = OrderedDict()  # (app, session) -> {name: bytes}
+_lock = threading.Lock()
+
+
+def track(name, value):
+    """Record the bytes of value held by the current session under name."""
+    key = (metrics._app(), metrics._session_id())
+    size = caching.sizeof(value)
+    with _lock:
+        held = _sessions.pop(key, {})
+        held[name] = size
+        _sessions[key] = held
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def session_bytes():
+    """{(app, session): bytes held}."""
+    with _lock:
+        return {key: sum(held.values()) for key, held in _sessions.items()}
+
+
+def sessions():
+    """Dataframe: app, session, name, bytes of the tracked values of each session."""
+    with _lock:
+        rows = [(app, session, name, size) for (app, session), held in _sessions.items()
+                for name, size in held.items()]
+    return pd.DataFrame(rows, columns=['app', 'session', 'name', 'bytes'])
+
+
+def caches():
+    """Dataframe: name, entries, bytes of the registered caches, largest first."""
+    rows = [(cache.name, len(cache), cache.bytes) for cache in caching.caches()]
+    df = pd.DataFrame(rows, columns=['name', 'entries', 'bytes'])
+    return df.sort_values('bytes', ascending=False, ignore_index=True)
@@ -0,0 +1,300 @@
+"""Timing of the hot paths of the apps, exported in the Prometheus text format.
+
+Where does a slow page come from: data loading, model prediction, SHAP,
+chart rendering? The apps time their sections with:
+
+    from common import metrics
+    metrics.rerun_started('boston')          # top of the script
+
+    @metrics.timed('load_data')              # a function
+    def load_data(year): ...
+
+    with metrics.section('shap_values'):     # a block
+        shap_values = explainer.shap_values(X)
+
+    metrics.rerun_finished()                 # bottom of the script
+
+Durations go into histograms with fixed buckets (a bisect and a counter
+increment per observation). Also recorded: rerun totals and durations,
+reruns per session, the hit rates and sizes of the common.caching caches
+(and any object with hits/misses counters passed to track_cache()), and
+the bytes held per session (common/memory.py).
+
+Export (configured with environment variables, started once per process):
+
+- APP_METRICS_PORT=9464: http://<APP_METRICS_HOST or 127.0.0.1>:9464/metrics
+- APP_METRICS_FILE=/path/metrics.prom: the file is rewritten every
+  APP_METRICS_INTERVAL seconds (default 15), e.g., for the textfile
+  collector of node_exporter
+
+APP_METRICS=0 turns everything off: timed() returns the function
+unchanged, section() a shared no-op context manager, histogram() a
+shared no-op histogram and increment() does nothing.
+"""
+import bisect
+import contextlib
+import functools
+import http.server
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+ENABLED = os.environ.get('APP_METRICS', '1').lower() not in ('0', 'false', 'off', 'no')
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Reruns per session are kept for the most recent sessions only (bounded label set)
+MAX_SESSIONS = 100
+
+_NULL = contextlib.nullcontext()
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> Histogram
+_counters = {}  # (name, labels) -> value
+_sessions = OrderedDict()  # (app, session id) -> reruns
+_tracked = {}  # name -> object with hits/misses
+_local = threading.local()
+_exporting = False
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations; thread-safe."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """Approximate quantile: upper bound of the bucket that reaches q."""
+        total = self.count
+        if not total:
+            return None
+        seen = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            seen += n
+            if seen >= q * total:
+                return bound
+
+
+class _NullHistogram:
+    def observe(self, value):
+        pass
+
+
+_NULL_HISTOGRAM = _NullHistogram()
+
+
+def histogram(name, **labels):
+    if not ENABLED:
+        return _NULL_HISTOGRAM
+    key = (name, tuple(sorted(labels.items())))
+    h = _histograms.get(key)
+    if h is None:
+        with _lock:
+            h = _histograms.setdefault(key, Histogram())
+    return h
+
+
+def increment(name, value=1, **labels):
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def _app():
+    return getattr(_local, 'app', 'unknown')
+
+
+@contextlib.contextmanager
+def _section(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram('app_section_seconds', app=_app(), section=name).observe(time.perf_counter() - start)
+
+
+def section(name):
+    """Context manager: time the block as section name of the current app."""
+    return _section(name) if ENABLED else _NULL
+
+
+def timed(name=None):
+    """Decorator: time every call of the function as a section (default: its name)."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _section(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return 'bare'
+    try:
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except TypeError:  # older Streamlit
+        ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else 'bare'
+
+
+def rerun_started(app):
+    """Mark the start of a script run of app (call it at the top of the script)."""
+    if not ENABLED:
+        return
+    start_exporter()
+    _local.app = app
+    _local.rerun_start = time.perf_counter()
+    increment('app_reruns_started_total', app=app)
+    key = (app, _session_id())
+    with _lock:
+        _sessions[key] = _sessions.pop(key, 0) + 1
+        while len(_sessions) > MAX_SESSIONS:
+            _sessions.popitem(last=False)
+
+
+def rerun_finished():
+    """Mark the end of the script run (reruns interrupted by exceptions are not timed)."""
+    if not ENABLED or getattr(_local, 'rerun_start', None) is None:
+        return
+    histogram('app_rerun_seconds', app=_app()).observe(time.perf_counter() - _local.rerun_start)
+    _local.rerun_start = None
+
+
+def track_cache(name, cache):
+    """Export the hits/misses counters of another cache object (e.g., HistoryCache)."""
+    _tracked[name] = cache
+
+
+def _labels(labels, **extra):
+    items = list(labels) + sorted(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in items) + '}'
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    with _lock:
+        histograms = sorted(_histograms.items())
+        counters = sorted(_counters.items())
+        sessions = list(_sessions.items())
+    for name in sorted({name for (name, _), _ in histograms}):
+        lines.append(f'# TYPE {name} histogram')
+        for (hname, labels), h in histograms:
+            if hname != name:
+                continue
+            cumulative = 0
+            for bound, n in zip(h.buckets + (float('inf'),), h.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{_labels(labels, le=le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {h.sum}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    for name in sorted({name for (name, _), _ in counters}):
+        lines.append(f'# TYPE {name} counter')
+        lines += [f'{name}{_labels(labels)} {value}' for (cname, labels), value in counters if cname == name]
+    lines.append('# TYPE app_session_reruns gauge')
+    lines += [f'app_session_reruns{_labels((), app=app, session=session)} {n}' for (app, session), n in sessions]
+    try:
+        from common import memory
+        held = memory.session_bytes()
+    except ImportError:
+        held = {}
+    lines.append('# TYPE app_session_bytes gauge')
+    lines += [f'app_session_bytes{_labels((), app=app, session=session)} {n}' for (app, session), n in held.items()]
+
+    caches = {}
+    try:
+        from common import caching
+        caches = {cache.name: cache for cache in caching.caches()}
+    except ImportError:
+        pass
+    caches.update(_tracked)
+    for metric in ['hits', 'disk_hits', 'misses', 'evictions']:
+        values = [(name, getattr(cache, metric)) for name, cache in caches.items() if hasattr(cache, metric)]
+        if values:
+            lines.append(f'# TYPE app_cache_{metric}_total counter')
+            lines += [f'app_cache_{metric}_total{_labels((), cache=name)} {value}' for name, value in values]
+    lines.append('# TYPE app_cache_bytes gauge')
+    lines += [f'app_cache_bytes{_labels((), cache=name)} {cache.bytes}' for name, cache in caches.items()
+              if isinstance(getattr(cache, 'bytes', None), int)]
+    lines.append('# TYPE app_cache_hit_ratio gauge')
+    for name, cache in caches.items():
+        hits = getattr(cache, 'hits', 0) + getattr(cache, 'disk_hits', 0)
+        total = hits + getattr(cache, 'misses', 0)
+        if total:
+            lines.append(f'app_cache_hit_ratio{_labels((), cache=name)} {hits / total:.6f}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_file(path):
+    """Write render() to path atomically."""
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix='.prom')
+    with os.fdopen(fd, 'w') as f:
+        f.write(render())
+    os.replace(tmp, path)
+
+
+def _write_loop(path, interval):
+    while True:
+        try:
+            write_file(path)
+        except OSError:
+            pass
+        time.sleep(interval)
+
+
+def start_exporter():
+    """Start the endpoint and/or file writer configured by the environment, once per process."""
+    global _exporting
+    with _lock:
+        if _exporting:
+            return
+        _exporting = True
+    port = os.environ.get('APP_METRICS_PORT')
+    if port:
+        server = http.server.ThreadingHTTPServer((os.environ.get('APP_METRICS_HOST', '127.0.0.1'), int(port)),
+                                                 MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    path = os.environ.get('APP_METRICS_FILE')
+    if path:
+        interval = float(os.environ.get('APP_METRICS_INTERVAL', 15))
+        threading.Thread(target=_write_loop, args=(path, interval), name='metrics-file', daemon=True).start()
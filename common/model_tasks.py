@@ -0,0 +1,43 @@
+"""CPU-bound model work of the apps, run in the worker processes of common/offload.py.
+
+The workers import these functions by name, so they live here and not
+in the app scripts (which are not importable modules). The libraries
+are imported by the workers, on the first call (see common/lazy.py).
+"""
+import numpy as np
+import pandas as pd
+
+from common.lazy import lazy_import
+
+shap = lazy_import('shap')
+Chem = lazy_import('rdkit.Chem')
+Descriptors = lazy_import('rdkit.Chem.Descriptors')
+
+DESCRIPTORS = ['MolLogP', 'MolWt', 'NumRotatableBonds', 'AromaticProportion']
+
+
+def fit(model, X, Y):
+    """The model (e.g., an unfitted RandomForestClassifier) fitted on X, Y."""
+    model.fit(X, Y)
+    return model
+
+
+def shap_values(model, X):
+    """SHAP values of the rows of X for a tree model."""
+    return shap.TreeExplainer(model).shap_values(X)
+
+
+def aromatic_proportion(mol):
+    """Aromatic atoms / heavy atoms."""
+    aromatic = sum(1 for i in range(mol.GetNumAtoms()) if mol.GetAtomWithIdx(i).GetIsAromatic())
+    return aromatic / Descriptors.HeavyAtomCount(mol)
+
+
+def molecular_descriptors(smiles):
+    """Dataframe with the DESCRIPTORS of each SMILES string, one row per molecule."""
+    rows = []
+    for elem in smiles:
+        mol = Chem.MolFromSmiles(elem)
+        rows.append([Descriptors.MolLogP(mol), Descriptors.MolWt(mol), Descriptors.NumRotatableBonds(mol),
+                     aromatic_proportion(mol)])
+    return pd.DataFrame(np.array(rows, dtype=float).reshape(-1, len(DESCRIPTORS)), columns=DESCRIPTORS)
@@ -0,0 +1,205 @@
+"""Shared process pool for the CPU-bound model work of the apps.
+
+Streamlit runs the script of every session in a thread of one process.
+A RandomForest fit (iris, Boston), the SHAP values or the RDKit
+descriptors hold the GIL while they run, and the reruns of all the other
+sessions (and pages of the multipage host) wait for them. Here, these
+calls run in one process pool shared by all sessions:
+
+- run(func, *args, timeout=...): the call runs in a worker process; the
+  script thread waits for its result without holding the GIL. func must
+  be importable by the workers (a function of a module, e.g.,
+  common/model_tasks.py, not of an app script), and its arguments and
+  result picklable.
+- Bounded queue: at most MAX_PENDING calls are queued or running. When
+  it is full, a session waits for a free slot (within its timeout)
+  instead of piling up more work.
+- Timeout: OffloadTimeout after timeout seconds, the wait for a slot
+  included.
+- Cancellation: while waiting, the script thread checks whether its
+  session asked for a rerun (a widget changed) or a stop (the tab was
+  closed), at Streamlit's own yield point (st.session_state). Then the
+  call is cancelled if it hasn't started yet, and Streamlit reruns or
+  stops the script as usual. A running call can't be interrupted: it
+  finishes in its worker and its result is dropped.
+
+Calls per status (done, error, timeout, cancelled) and their durations
+are recorded by common/metrics.py.
+
+Configuration (environment variables):
+
+- OFFLOAD_WORKERS: worker processes (default: the CPUs, at most 4); 0 runs
+  the calls in the script thread, as before (see benchmarks/offload_bench.py)
+- OFFLOAD_MAX_PENDING: size of the queue (default: 4 calls per worker)
+
+Usage:
+
+    from common import model_tasks, offload
+    clf = offload.run(model_tasks.fit, ensemble.RandomForestClassifier(), X, Y, timeout=60)
+"""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from common import metrics
+
+try:
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+except ImportError:
+    st = get_script_run_ctx = None
+
+WORKERS = int(os.environ.get('OFFLOAD_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_PENDING = int(os.environ.get('OFFLOAD_MAX_PENDING', 4 * max(WORKERS, 1)))
+TIMEOUT = 120
+# Seconds between two checks for a rerun of the session
+POLL = 0.1
+
+
+class OffloadError(Exception):
+    """A call that didn't run to the end in the pool."""
+
+
+class OffloadTimeout(OffloadError):
+    """No result (or no free slot in the queue) within the timeout."""
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_barrier = None  # in the workers: the barrier of the startup tasks
+_slots = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _init_worker(barrier):
+    global _barrier
+    _barrier = barrier
+
+
+def _started():
+    """Startup task of a worker: returns once every worker runs one (see pool())."""
+    _barrier.wait(timeout=TIMEOUT)
+    return os.getpid()
+
+
+def pool():
+    """The process pool of this process, started on the first call.
+
+    'spawn' instead of fork: the Streamlit server is multi-threaded
+    and forking it could copy locks held by other threads.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                context = multiprocessing.get_context('spawn')
+                executor = ProcessPoolExecutor(max_workers=WORKERS, mp_context=context, initializer=_init_worker,
+                                               initargs=(context.Barrier(WORKERS),))
+                # Spawned workers import the __main__ module of the moment they
+                # start; under streamlit run, that's the app script, which they
+                # would run again. Give them this module instead. The workers
+                # start on submit, one per call while none is idle: all of them
+                # start here, as the startup tasks wait for each other
+                main = sys.modules['__main__']
+                sys.modules['__main__'] = sys.modules[__name__]
+                try:
+                    started = [executor.submit(_started) for _ in range(WORKERS)]
+                finally:
+                    # Unless a script started meanwhile and set its own
+                    if sys.modules['__main__'] is sys.modules[__name__]:
+                        sys.modules['__main__'] = main
+                for future in started:
+                    future.result()
+                _pool = executor
+    return _pool
+
+
+def _reset(broken):
+    """Forget a pool whose worker died (e.g., killed for its memory): the next call starts a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False)
+
+
+def yield_to_session():
+    """Raise Streamlit's rerun/stop exception if the session asked for one.
+
+    Reading st.session_state is a yield point of the script thread, like
+    any st.* call; outside a session (e.g., the warm-up) it does nothing.
+    """
+    if get_script_run_ctx is not None and get_script_run_ctx() is not None:
+        '_offload' in st.session_state
+
+
+def _wait(future, deadline):
+    """Result of future; checks for a rerun every POLL seconds."""
+    while True:
+        try:
+            return future.result(timeout=POLL)
+        except FutureTimeout:
+            pass
+        if deadline is not None and time.monotonic() >= deadline:
+            raise OffloadTimeout('no result in time')
+        yield_to_session()
+
+
+def run(func, *args, timeout=TIMEOUT, **kwargs):
+    """func(*args, **kwargs) in the process pool (see the module docstring).
+
+    timeout: seconds, or None to wait as long as it takes.
+    Exceptions raised by func are raised here.
+    """
+    name = getattr(func, '__name__', 'call')
+    start = time.perf_counter()
+    if WORKERS <= 0:
+        result = func(*args, **kwargs)
+        _observe(name, 'done', start)
+        return result
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    status = 'cancelled'
+    future = None
+    try:
+        while not _slots.acquire(timeout=POLL):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise OffloadTimeout('the queue is full')
+            yield_to_session()
+        executor = pool()
+        try:
+            try:
+                future = executor.submit(func, *args, **kwargs)
+            except BaseException:
+                _slots.release()
+                raise
+            # The slot is free again when the call ends, even if nobody waits for it anymore
+            future.add_done_callback(lambda _: _slots.release())
+            result = _wait(future, deadline)
+        except BrokenProcessPool:
+            # Also raised by submit, if a worker died while no call was waiting
+            _reset(executor)
+            raise
+        status = 'done'
+        return result
+    except OffloadTimeout as e:
+        status = 'timeout'
+        raise OffloadTimeout(f'{name}: {e} after {timeout} s') from None
+    except Exception as e:
+        # Streamlit's rerun and stop exceptions (BaseException) stay 'cancelled'
+        if not type(e).__module__.startswith('streamlit'):
+            status = 'error'
+        raise
+    finally:
+        if future is not None and status != 'done':
+            future.cancel()
+        _observe(name, status, start)
+
+
+def _observe(name, status, start):
+    metrics.increment('app_offload_calls_total', task=name, status=status)
+    metrics.histogram('app_offload_seconds', task=name).observe(time.perf_counter() - start)
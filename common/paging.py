@@ -0,0 +1,198 @@
+"""Server-side paging of large tables for AgGrid (streamlit-aggrid).
+
+AgGrid(df) serializes every row of df to the browser, and with
+DataReturnMode.FILTERED_AND_SORTED the whole table comes back on each
+interaction. With hundreds of thousands of rows the page stalls.
+Instead, the full table stays in the server and only the visible page
+goes to the grid:
+
+- filter_rows: row positions passing the filters, as an int64 array;
+  the filters use the format of AgGrid's filter model, e.g.,
+  {'TITLE': {'filterType': 'text', 'type': 'contains', 'filter': 'python'}}
+- sort_rows: the positions ordered by a sort model, e.g.,
+  [{'colId': 'YEAR', 'sort': 'desc'}], with np.lexsort
+- group_rows: one row per group of the filtered rows (count + aggregates)
+- page: the rows of one page, with a ROW_ID column
+
+No intermediate DataFrame is created: the filters and the sorting work on
+the column arrays and only pass positions around; df.take() is called once,
+on the page.
+
+The row id is the position of the row in the full table, so it doesn't
+change with the filters, the sorting or the page; the selection is a set of
+row ids (update_selection) that survives paging.
+
+Usage:
+
+    positions = sort_rows(df, filter_rows(df, filters), sort_model)
+    rows, n_pages = page(df, positions, number, size=100)
+    response = AgGrid(rows, ...)
+    selected = update_selection(selected, rows[ROW_ID], response['selected_rows'], response['data'])
+"""
+import numpy as np
+import pandas as pd
+
+ROW_ID = '_row_id'
+PAGE_SIZES = [25, 50, 100, 500]
+
+
+def _values(df, column, positions):
+    return df[column].to_numpy()[positions]
+
+
+def _text_mask(values, kind, value):
+    text = pd.Series(values, dtype=object).fillna('').astype(str).str.lower()
+    value = str(value or '').lower()
+    if kind == 'contains':
+        mask = text.str.contains(value, regex=False)
+    elif kind == 'notContains':
+        mask = ~text.str.contains(value, regex=False)
+    elif kind == 'equals':
+        mask = text == value
+    elif kind == 'notEqual':
+        mask = text != value
+    elif kind == 'startsWith':
+        mask = text.str.startswith(value)
+    elif kind == 'endsWith':
+        mask = text.str.endswith(value)
+    else:
+        raise ValueError(f'Unknown text filter: {kind}')
+    return mask.to_numpy(dtype=bool)
+
+
+def _number_mask(values, kind, value, value_to=None):
+    values = values.astype(np.float64)
+    with np.errstate(invalid='ignore'):
+        if kind == 'equals':
+            return values == value
+        if kind == 'notEqual':
+            return values != value
+        if kind == 'lessThan':
+            return values < value
+        if kind == 'lessThanOrEqual':
+            return values <= value
+        if kind == 'greaterThan':
+            return values > value
+        if kind == 'greaterThanOrEqual':
+            return values >= value
+        if kind == 'inRange':
+            return (values >= value) & (values <= value_to)
+    raise ValueError(f'Unknown number filter: {kind}')
+
+
+def _mask(values, spec):
+    """Boolean mask of one filter (an entry of AgGrid's filter model)."""
+    # Two or more conditions joined with AND/OR
+    conditions = spec.get('conditions') or [spec[key] for key in ('condition1', 'condition2') if key in spec]
+    if conditions:
+        masks = [_mask(values, dict(condition, filterType=spec.get('filterType'))) for condition in conditions]
+        combine = np.logical_or if spec.get('operator') == 'OR' else np.logical_and
+        return combine.reduce(masks)
+
+    filter_type = spec.get('filterType', 'text')
+    if filter_type == 'set':
+        return pd.Series(values).isin(spec.get('values', [])).to_numpy()
+    kind = spec.get('type', 'contains' if filter_type == 'text' else 'equals')
+    if kind in ('blank', 'notBlank'):
+        blank = (pd.Series(values, dtype=object).fillna('').astype(str).str.strip() == '').to_numpy()
+        return blank if kind == 'blank' else ~blank
+    if filter_type == 'number':
+        return _number_mask(values, kind, spec.get('filter'), spec.get('filterTo'))
+    return _text_mask(values, kind, spec.get('filter'))
+
+
+def filter_rows(df, filters=None):
+    """Positions (int64 array) of the rows of df that pass all the filters.
+
+    The filters are applied one after the other, each one only on the rows
+    that passed the previous ones.
+    """
+    positions = np.arange(len(df), dtype=np.int64)
+    for column, spec in (filters or {}).items():
+        if not spec or not len(positions):
+            continue
+        positions = positions[_mask(_values(df, column, positions), spec)]
+    return positions
+
+
+def _sort_key(values, descending):
+    """Integer codes that sort like values; missing values always last."""
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = np.where(codes < 0, len(uniques), codes)
+    if descending:
+        codes = np.where(codes < len(uniques), len(uniques) - 1 - codes, codes)
+    return codes
+
+
+def sort_rows(df, positions, sort_model=None):
+    """The positions ordered by the sort model (first entry = primary key); stable."""
+    if not sort_model or not len(positions):
+        return positions
+    keys = [_sort_key(_values(df, item['colId'], positions), item.get('sort') == 'desc') for item in sort_model]
+    # lexsort sorts by the last key first
+    return positions[np.lexsort(keys[::-1])]
+
+
+def group_rows(df, positions, by, aggregations=None):
+    """One row per group of the given rows: the group columns, 'count' and aggregations.
+
+    aggregations maps columns to functions of pandas, e.g., {'PRICE': 'mean'}.
+    Only the columns involved are taken from df.
+    """
+    columns = list(by) + [c for c in (aggregations or {}) if c not in by]
+    grouped = df[columns].take(positions).groupby(list(by), sort=True, dropna=False)
+    groups = grouped.size().rename('count').to_frame()
+    if aggregations:
+        groups = groups.join(grouped.agg(aggregations))
+    return groups.reset_index()
+
+
+def page(df, positions, number, size=100):
+    """(rows of page number, number of pages); pages are numbered from 0.
+
+    The rows come with their row id in the ROW_ID column, the first one.
+    """
+    n_pages = max(1, -(-len(positions) // size))
+    number = min(max(number, 0), n_pages - 1)
+    ids = positions[number * size:(number + 1) * size]
+    rows = df.take(ids)
+    rows.insert(0, ROW_ID, ids)
+    return rows.reset_index(drop=True), n_pages
+
+
+def row_ids(rows):
+    """Row ids of rows returned by the grid (list of dicts or DataFrame)."""
+    if rows is None:
+        return set()
+    if isinstance(rows, pd.DataFrame):
+        return set(rows[ROW_ID].astype(np.int64).tolist()) if ROW_ID in rows else set()
+    return {int(row[ROW_ID]) for row in rows if ROW_ID in row}
+
+
+def selected_ids(selected_rows):
+    """Row ids of the rows selected in the grid (list of dicts or DataFrame)."""
+    return row_ids(selected_rows)
+
+
+def update_selection(selected, page_ids, selected_rows, grid_rows=None):
+    """New selection after an interaction with the grid showing the rows page_ids.
+
+    The grid only knows the rows of its page: rows of other pages keep
+    their state, the rows of this page are selected iff they are selected
+    in the grid.
+
+    grid_rows: the data returned by the grid (response['data']). The first
+    response after a page change can still be the one of the previous
+    page; if its rows (or its selected rows) are not the ones of page_ids,
+    the selection is returned unchanged.
+    """
+    page_ids = set(np.asarray(page_ids, dtype=np.int64).tolist())
+    in_grid = selected_ids(selected_rows)
+    if not in_grid <= page_ids or (grid_rows is not None and len(grid_rows) and row_ids(grid_rows) != page_ids):
+        return set(selected)
+    return (set(selected) - page_ids) | in_grid
+
+
+def preselected(rows, selected):
+    """Positions in the page rows of the selected row ids, for the grid."""
+    return np.flatnonzero(np.isin(rows[ROW_ID].to_numpy(), list(selected))).tolist()
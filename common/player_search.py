@@ -0,0 +1,161 @@
+"""Player name search over all ingested seasons.
+
+Scanning every season with str.contains() on each keystroke doesn't scale,
+so we prebuild an index when seasons are ingested (see common/seasons.py):
+
+- A sorted prefix array: every normalized name, plus every suffix
+  starting at a word (so 'jam' finds 'LeBron James').
+  A prefix query is two binary searches.
+- Trigram postings: for each trigram, the sorted ids of the names that
+  contain it. A fuzzy query counts shared trigrams with np.bincount
+  and ranks names by the fraction of query trigrams they contain
+  (ties: Jaccard similarity, i.e., shorter names first).
+- Row postings: for each name, the rows of the players table, so that
+  a match gives us the player's rows in every season directly.
+
+Everything is stored in flat NumPy arrays (CSR-like offsets + values)
+and saved with np.savez next to the data.
+
+Usage:
+
+    index = PlayerIndex.load('data/player_index.npz')
+    for name_id, name in index.search('lebrn'):
+        rows = players.iloc[index.rows(name_id)]
+"""
+import re
+import unicodedata
+
+import numpy as np
+
+INDEX_FILE = 'player_index.npz'
+# Sorts after any character we keep in normalized names
+MAX_CHAR = '\U0010ffff'
+
+
+def normalize(name):
+    """Lowercase, without accents and punctuation, single spaces."""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(c for c in name if not unicodedata.combining(c))
+    name = re.sub(r'[^a-z0-9 ]', '', name.lower())
+    return ' '.join(name.split())
+
+
+def trigrams(name):
+    """Set of trigrams of a normalized name; padded to mark word boundaries."""
+    padded = ' ' + name + ' '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _csr(group_ids, values, n_groups):
+    """Group values by group_ids: returns (offsets, values sorted by group)."""
+    order = np.argsort(group_ids, kind='stable')
+    counts = np.bincount(group_ids, minlength=n_groups)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return offsets, values[order]
+
+
+class PlayerIndex:
+    """Prefix + trigram index of player names; see module docstring."""
+
+    ARRAYS = ['names', 'prefixes', 'prefix_ids', 'grams', 'gram_offsets',
+              'gram_postings', 'gram_counts', 'row_offsets', 'row_postings']
+
+    def __init__(self, **arrays):
+        for key in self.ARRAYS:
+            setattr(self, key, arrays[key])
+
+    @classmethod
+    def build(cls, players):
+        """Build the index from the Player column (one entry per row)."""
+        originals = np.asarray(players, dtype=str)
+        normalized = np.array([normalize(n) for n in originals], dtype=str)
+        keys, first, inverse = np.unique(normalized, return_index=True, return_inverse=True)
+        n_names = len(keys)
+        # Display name: first spelling seen for each normalized name
+        names = originals[first]
+
+        # Rows of each name
+        row_offsets, row_postings = _csr(inverse.ravel(), np.arange(len(originals)), n_names)
+
+        # Prefix array: each name and each of its word-suffixes
+        prefixes, prefix_ids = [], []
+        for name_id, key in enumerate(keys):
+            words = key.split(' ')
+            for i in range(len(words)):
+                prefixes.append(' '.join(words[i:]))
+                prefix_ids.append(name_id)
+        prefixes = np.array(prefixes, dtype=str)
+        order = np.argsort(prefixes, kind='stable')
+
+        # Trigram postings
+        gram_of_pair, id_of_pair = [], []
+        gram_counts = np.zeros(n_names, dtype=np.int32)
+        for name_id, key in enumerate(keys):
+            grams = trigrams(key)
+            gram_counts[name_id] = len(grams)
+            gram_of_pair.extend(grams)
+            id_of_pair.extend([name_id] * len(grams))
+        grams, gram_inverse = np.unique(np.array(gram_of_pair, dtype=str), return_inverse=True)
+        gram_offsets, gram_postings = _csr(gram_inverse.ravel(), np.array(id_of_pair, dtype=np.int32), len(grams))
+
+        return cls(names=names, prefixes=prefixes[order],
+                   prefix_ids=np.array(prefix_ids, dtype=np.int32)[order],
+                   grams=grams, gram_offsets=gram_offsets, gram_postings=gram_postings,
+                   gram_counts=gram_counts, row_offsets=row_offsets, row_postings=row_postings)
+
+    def save(self, path):
+        np.savez(path, **{key: getattr(self, key) for key in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{key: data[key] for key in cls.ARRAYS})
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows(self, name_id):
+        """Row positions (in the players table) of a name."""
+        return self.row_postings[self.row_offsets[name_id]:self.row_offsets[name_id + 1]]
+
+    def prefix(self, query, limit=10):
+        """Ids of names (or name words) starting with query, alphabetically."""
+        query = normalize(query)
+        if not query:
+            return []
+        lo = np.searchsorted(self.prefixes, query, side='left')
+        hi = np.searchsorted(self.prefixes, query + MAX_CHAR, side='left')
+        ids = []
+        for name_id in self.prefix_ids[lo:hi]:
+            if name_id not in ids:
+                ids.append(int(name_id))
+                if len(ids) == limit:
+                    break
+        return ids
+
+    def fuzzy(self, query, limit=10, min_score=0.5):
+        """Ids of the names most similar to query (shared trigrams), best first."""
+        query_grams = np.array(sorted(trigrams(normalize(query))), dtype=str)
+        if not len(query_grams) or not len(self.grams):
+            return []
+        pos = np.searchsorted(self.grams, query_grams)
+        found = self.grams[np.minimum(pos, len(self.grams) - 1)] == query_grams
+        pos = pos[found]
+        if not len(pos):
+            return []
+        postings = np.concatenate([self.gram_postings[self.gram_offsets[p]:self.gram_offsets[p + 1]] for p in pos])
+        shared = np.bincount(postings, minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        shared = shared[candidates]
+        containment = shared / len(query_grams)
+        jaccard = shared / (len(query_grams) + self.gram_counts[candidates] - shared)
+        keep = containment >= min_score
+        best = np.lexsort((-jaccard[keep], -containment[keep]))[:limit]
+        return [int(i) for i in candidates[keep][best]]
+
+    def search(self, query, limit=10):
+        """Prefix matches first, then fuzzy matches; list of (name_id, name)."""
+        ids = self.prefix(query, limit)
+        if len(ids) < limit:
+            ids += [i for i in self.fuzzy(query, limit) if i not in ids][:limit - len(ids)]
+        return [(i, str(self.names[i])) for i in ids]
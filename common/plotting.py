@@ -0,0 +1,97 @@
+"""Closing price charts for many tickers.
+
+price_plot() in the S&P 500 app used to draw one pyplot figure per ticker,
+one after the other, and never closed them: pyplot keeps every figure
+alive, so memory grew with each rerun. Here:
+
+- Figures are built with the object-oriented API (matplotlib.figure.Figure),
+  which doesn't register them in pyplot's global state, so they are
+  freed as soon as they have been rendered.
+- small_multiples(): a single figure with a grid of small charts;
+  one render instead of N.
+- render_pngs(): one PNG per ticker, rendered in parallel in a process pool
+  (matplotlib rendering is CPU-bound and holds the GIL).
+
+series arguments are dicts: symbol -> (dates, close) NumPy arrays,
+which are cheap to send to worker processes.
+"""
+import io
+import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from common.lazy import lazy_import
+
+# matplotlib is imported when the first chart is drawn (see common/lazy.py)
+backend_agg = lazy_import('matplotlib.backends.backend_agg')
+mpl_figure = lazy_import('matplotlib.figure')
+
+
+def draw_price(ax, symbol, dates, close, small=False):
+    """Same chart as price_plot() in the S&P 500 app, on a given axes."""
+    ax.fill_between(dates, close, color='skyblue', alpha=0.3)
+    ax.plot(dates, close, color='skyblue', alpha=0.8)
+    ax.set_title(symbol, fontweight='bold', fontsize=9 if small else None)
+    if small:
+        ax.tick_params(labelsize=6)
+        ax.tick_params(axis='x', labelrotation=90)
+    else:
+        ax.tick_params(axis='x', labelrotation=90)
+        ax.set_xlabel('Date', fontweight='bold')
+        ax.set_ylabel('Closing Price', fontweight='bold')
+
+
+def price_figure(symbol, dates, close):
+    """One chart per ticker, as a pyplot-independent Figure."""
+    fig = mpl_figure.Figure()
+    backend_agg.FigureCanvasAgg(fig)
+    draw_price(fig.add_subplot(), symbol, dates, close)
+    return fig
+
+
+def small_multiples(series, ncols=5, cell_size=(2.4, 1.8)):
+    """All tickers in one figure: a grid with ncols columns and a shared date axis."""
+    nrows = max(1, math.ceil(len(series) / ncols))
+    fig = mpl_figure.Figure(figsize=(cell_size[0] * ncols, cell_size[1] * nrows))
+    backend_agg.FigureCanvasAgg(fig)
+    # Shared x: dates are only labeled on the bottom row, which also saves
+    # computing ticks for every cell (layout engines are slow with many axes)
+    axes = fig.subplots(nrows, ncols, squeeze=False, sharex=True).ravel()
+    fig.subplots_adjust(left=0.05, right=0.98, top=1 - 0.3 / nrows, bottom=0.9 / (nrows * cell_size[1]),
+                        hspace=0.35, wspace=0.3)
+    for ax, (symbol, (dates, close)) in zip(axes, series.items()):
+        draw_price(ax, symbol, dates, close, small=True)
+    for ax in axes[len(series):]:
+        ax.set_visible(False)
+    return fig
+
+
+def render_png(symbol, dates, close, dpi=100):
+    """PNG bytes of price_figure(); runs in worker processes."""
+    fig = price_figure(symbol, dates, close)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    fig.clear()
+    return buffer.getvalue()
+
+
+def make_pool(max_workers=None):
+    """Process pool for render_pngs().
+
+    'spawn' instead of fork: the Streamlit server is multi-threaded
+    and forking it could copy locks held by other threads.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def render_pngs(series, pool=None, dpi=100):
+    """symbol -> PNG bytes, rendered in parallel; keeps the order of series."""
+    own_pool = pool is None
+    pool = make_pool() if own_pool else pool
+    try:
+        futures = {symbol: pool.submit(render_png, symbol, dates, close, dpi)
+                   for symbol, (dates, close) in series.items()}
+        return {symbol: future.result() for symbol, future in futures.items()}
+    finally:
+        if own_pool:
+            pool.shutdown()
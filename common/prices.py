@@ -0,0 +1,198 @@
+"""Daily price history with a per-ticker cache.
+
+The S&P 500 app used to download the YTD history of the first 10 selected
+tickers with yf.download() on every rerun, even if no plot was requested.
+Instead:
+
+- Prices are requested only when needed (e.g., after 'Show Plots').
+- A PriceCache keeps the history of each ticker in memory;
+  within the TTL, a ticker costs no network I/O at all.
+- After the TTL, the refresh is incremental: only the days from the
+  last cached date on are fetched; they replace that date (its bar may
+  have been cached before the close) and are appended.
+- The source is a pluggable PriceProvider: YahooProvider in production,
+  FixtureProvider (CSV files or in-memory frames) offline.
+
+Usage:
+
+    cache = PriceCache(YahooProvider(), ttl=3600)
+    df = cache.history('AAPL', start='2023-01-01')  # Open, High, Low, Close, Volume
+"""
+import datetime
+import io
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import fetch
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+ONE_DAY = pd.Timedelta(days=1)
+SP500_URL = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
+
+
+class PriceProvider:
+    """Source of daily OHLCV history; subclasses implement fetch()."""
+
+    def fetch(self, symbol, start, end=None):
+        """Daily history of symbol in [start, end] (end=None: up to today).
+
+        Returns a dataframe with COLUMNS, indexed by tz-naive dates, sorted;
+        empty if there are no trading days in the range.
+        """
+        raise NotImplementedError
+
+
+class YahooProvider(PriceProvider):
+    """Yahoo Finance via yfinance (https://pypi.org/project/yfinance/)."""
+
+    def __init__(self, auto_adjust=True, interval='1d'):
+        self.auto_adjust = auto_adjust
+        self.interval = interval  # e.g., '1d', or intraday: '1h', '5m'
+
+    def fetch(self, symbol, start, end=None):
+        # A call of yfinance, not a page: recorded/replayed as CSV by common/fetch.py
+        name = '/'.join(['yahoo', symbol, str(pd.Timestamp(start).date()), str(end and pd.Timestamp(end).date()),
+                         self.interval, str(self.auto_adjust)])
+        body = fetch.recorded(name, lambda: self._download(symbol, start, end).to_csv().encode())
+        df = pd.read_csv(io.BytesIO(body), index_col='Date', parse_dates=['Date'])
+        df.index = pd.DatetimeIndex(df.index, name='Date')
+        return df
+
+    def _download(self, symbol, start, end=None):
+        import yfinance as yf  # only needed when we really go to the network
+        end = None if end is None else pd.Timestamp(end) + ONE_DAY  # yfinance: end is exclusive
+        df = yf.Ticker(symbol).history(start=pd.Timestamp(start), end=end,
+                                       interval=self.interval, auto_adjust=self.auto_adjust)
+        df = df.reindex(columns=COLUMNS)
+        df.index = pd.DatetimeIndex(df.index).tz_localize(None)
+        if self.interval[-1] not in 'mh':  # daily or longer: dates only
+            df.index = df.index.normalize()
+        df.index.name = 'Date'
+        return df.sort_index()
+
+
+class FixtureProvider(PriceProvider):
+    """Offline provider: in-memory frames or one CSV per symbol.
+
+    CSV files are named <SYMBOL>.csv and have a Date column plus COLUMNS.
+    fetch_count counts the fetches, e.g., to check that the cache works.
+    """
+
+    def __init__(self, frames=None, folder=None):
+        self.frames = dict(frames or {})
+        self.folder = folder
+        self.fetch_count = 0
+
+    def _frame(self, symbol):
+        if symbol not in self.frames and self.folder is not None:
+            path = os.path.join(self.folder, symbol + '.csv')
+            if os.path.exists(path):
+                self.frames[symbol] = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+        return self.frames.get(symbol)
+
+    def fetch(self, symbol, start, end=None):
+        self.fetch_count += 1
+        df = self._frame(symbol)
+        if df is None:
+            return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+        end = pd.Timestamp.today().normalize() if end is None else pd.Timestamp(end)
+        return df.loc[pd.Timestamp(start):end, COLUMNS]
+
+
+class PriceCache:
+    """Per-ticker history cache with TTL and incremental refreshes; thread-safe.
+
+    One instance can be shared by all sessions (e.g., with st.cache).
+    """
+
+    def __init__(self, provider, ttl=3600, clock=time.time):
+        self.provider = provider
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}  # symbol -> [history, first requested start, fetched_at]
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _symbol_lock(self, symbol):
+        with self._lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def history(self, symbol, start, end=None):
+        """History of symbol from start (to end, or the latest cached/fetched day)."""
+        start = pd.Timestamp(start).normalize()
+        # One fetch per symbol at a time; other symbols are not blocked
+        with self._symbol_lock(symbol):
+            entry = self._entries.get(symbol)
+            now = self.clock()
+            if entry is None:
+                entry = [self.provider.fetch(symbol, start), start, now]
+                self._entries[symbol] = entry
+            else:
+                df, cached_start, fetched_at = entry
+                if start < cached_start:
+                    # Older days than we have: fetch only the gap
+                    older = self.provider.fetch(symbol, start, cached_start - ONE_DAY)
+                    df = pd.concat([older, df])
+                    cached_start = start
+                if now - fetched_at >= self.ttl:
+                    # Expired: fetch again from the last cached day, which may have
+                    # been cached during trading hours, and replace it with the new rows
+                    last = cached_start if df.empty else df.index[-1]
+                    newer = self.provider.fetch(symbol, last)
+                    newer = newer[newer.index >= last]
+                    if not newer.empty:
+                        df = pd.concat([df[df.index < newer.index[0]], newer])
+                    fetched_at = now
+                entry[:] = [df, cached_start, fetched_at]
+            df = entry[0]
+        if end is not None:
+            return df.loc[start:pd.Timestamp(end)]
+        return df.loc[start:]
+
+    def clear(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+
+def year_start(today=None):
+    """First day of the current year, i.e., the start of a YTD history."""
+    today = today or datetime.date.today()
+    return pd.Timestamp(today.year, 1, 1)
+
+
+def sp500_constituents():
+    """Current S&P 500 constituents from Wikipedia (as in the S&P 500 app)."""
+    html = pd.read_html(io.StringIO(fetch.text(SP500_URL)), header=0)
+    return html[0]
+
+
+def sp500_symbols():
+    return list(sp500_constituents().Symbol)
+
+
+def synthetic_history(symbols, start, end=None, seed=0):
+    """Random-walk OHLCV fixtures on business days: symbol -> dataframe.
+
+    Useful with FixtureProvider or to fill a local store offline.
+    """
+    end = pd.Timestamp.today().normalize() if end is None else pd.Timestamp(end)
+    dates = pd.bdate_range(start, end, name='Date')
+    rng = np.random.default_rng(seed)
+    shape = (len(dates), len(symbols))
+    # Log-returns with a small drift and a per-symbol volatility
+    vol = rng.uniform(0.01, 0.03, len(symbols))
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, vol, shape), axis=0))
+    open_ = close * np.exp(rng.normal(0, vol / 2, shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, vol, shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, vol, shape))
+    volume = rng.integers(100_000, 10_000_000, shape).astype(float)
+    return {symbol: pd.DataFrame({'Open': open_[:, i], 'High': high[:, i], 'Low': low[:, i],
+                                  'Close': close[:, i], 'Volume': volume[:, i]}, index=dates)
+            for i, symbol in enumerate(symbols)}
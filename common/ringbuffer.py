@@ -0,0 +1,97 @@
+"""Fixed-size, array-backed history of values per key (e.g., coin prices).
+
+The crypto app's live mode appends a snapshot of all coins every few
+seconds; keeping every snapshot would grow without bounds. A RingBuffer
+preallocates a (capacity x keys) matrix and overwrites the oldest row
+once it is full, so memory stays constant:
+
+    times   (capacity,)         float64 epoch seconds
+    values  (capacity x keys)   float64; NaN if a key is missing in a snapshot
+
+New keys add columns (the matrix is reallocated, which is rare).
+Appends and reads are thread-safe; reads return copies in time order.
+
+Usage:
+
+    buffer = RingBuffer(capacity=720)
+    buffer.append(time.time(), ['BTC', 'ETH'], [60000.0, 3000.0])
+    times, values = buffer.window(['BTC'])
+"""
+import threading
+
+import numpy as np
+
+
+class RingBuffer:
+    """Last capacity rows of values per key, with their timestamps."""
+
+    def __init__(self, capacity, keys=()):
+        self.capacity = capacity
+        self.keys = {}
+        self.times = np.full(capacity, np.nan)
+        self.values = np.full((capacity, 0), np.nan)
+        self.count = 0  # appended rows, ever; the next row goes to count % capacity
+        self._lock = threading.Lock()
+        self._add_keys(keys)
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _add_keys(self, keys):
+        new = [key for key in dict.fromkeys(keys) if key not in self.keys]
+        if not new:
+            return
+        for key in new:
+            self.keys[key] = len(self.keys)
+        values = np.full((self.capacity, len(self.keys)), np.nan)
+        values[:, :self.values.shape[1]] = self.values
+        self.values = values
+
+    def append(self, timestamp, keys, values):
+        """Add one row: values[i] of keys[i] at timestamp; other keys get NaN."""
+        with self._lock:
+            self._add_keys(keys)
+            row = self.count % self.capacity
+            self.times[row] = timestamp
+            self.values[row] = np.nan
+            self.values[row, [self.keys[key] for key in keys]] = values
+            self.count += 1
+
+    def _order(self):
+        """Row positions from the oldest to the newest."""
+        n = len(self)
+        return (np.arange(n) + (self.count - n)) % self.capacity
+
+    def window(self, keys=None, since=None):
+        """(times, values) in time order, for keys (default: all), optionally from time since."""
+        with self._lock:
+            rows = self._order()
+            times = self.times[rows]
+            if since is not None:
+                rows = rows[times >= since]
+                times = self.times[rows]
+            cols = list(self.keys.values()) if keys is None else [self.keys.get(key, -1) for key in keys]
+            values = self.values[np.ix_(rows, [col for col in cols if col >= 0])]
+        if keys is not None and any(col < 0 for col in cols):
+            # Unknown keys: NaN columns, so that the result matches keys
+            full = np.full((len(rows), len(cols)), np.nan)
+            full[:, [i for i, col in enumerate(cols) if col >= 0]] = values
+            values = full
+        return times, values
+
+    def change(self, keys, seconds, now=None):
+        """Percent change of each key over the last seconds (from the first value in the window)."""
+        with self._lock:
+            last = self.times[(self.count - 1) % self.capacity] if self.count else np.nan
+        now = last if now is None else now
+        _, values = self.window(keys, since=now - seconds)
+        if not len(values):
+            return np.full(len(keys), np.nan)
+        # First/last valid value of each key in the window
+        valid = ~np.isnan(values)
+        has = valid.any(axis=0)
+        first = np.where(has, values[valid.argmax(axis=0), np.arange(values.shape[1])], np.nan)
+        last_rows = len(values) - 1 - valid[::-1].argmax(axis=0)
+        last = np.where(has, values[last_rows, np.arange(values.shape[1])], np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (last / first - 1) * 100
@@ -0,0 +1,155 @@
+"""Multi-season player stats for the NBA/NFL apps.
+
+The EDA apps scrape one season at a time. This module ingests many seasons
+into a local store next to the app, so that features that span all seasons
+(e.g., the player search or career stats) don't need to scrape
+or aggregate anything at runtime.
+
+Each league has its own folder:
+
+    app_3_eda_basketball/data/
+        players.pkl          # all seasons, one row per player/team/season
+        player_index.npz     # see common/player_search.py
+        career.pkl           # see common/career.py
+        career_teams.pkl
+
+To ingest seasons (from the repository root; missing seasons only):
+
+    $ python -m common.seasons nba --start 1950 --end 2019
+    $ python -m common.seasons nfl --start 1990 --end 2019
+"""
+import argparse
+import io
+import os
+import time
+
+import pandas as pd
+
+from common import career, fetch, player_search
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)), '..')
+
+# Same sources and parsing as load_data() in the apps
+LEAGUES = {
+    'nba': {
+        'url': 'https://www.basketball-reference.com/leagues/NBA_{year}_per_game.html',
+        'header': 0,
+        'data_dir': os.path.join(ROOT, 'app_3_eda_basketball', 'data'),
+    },
+    'nfl': {
+        'url': 'https://www.pro-football-reference.com/years/{year}/rushing.htm',
+        'header': 1,
+        'data_dir': os.path.join(ROOT, 'app_4_eda_football', 'data'),
+    },
+}
+# Columns that are not numeric stats
+TEXT_COLUMNS = ['Player', 'Pos', 'Tm']
+PLAYERS_FILE = 'players.pkl'
+
+
+def fetch_season(league, year):
+    """Scrape and clean one season; adds a 'Season' column."""
+    config = LEAGUES[league]
+    html = pd.read_html(io.StringIO(fetch.text(config['url'].format(year=year))), header=config['header'])
+    df = html[0]
+    raw = df.drop(df[df.Age == 'Age'].index)  # Deletes repeating headers in content
+    raw = raw.fillna(0)
+    playerstats = raw.drop(['Rk'], axis=1)
+    return clean_season(playerstats, year)
+
+
+def clean_season(playerstats, year):
+    """Typed columns (the scraped values are strings) + 'Season'."""
+    playerstats = playerstats.copy()
+    for col in playerstats.columns:
+        if col not in TEXT_COLUMNS:
+            playerstats[col] = pd.to_numeric(playerstats[col], errors='coerce')
+    # basketball-reference marks Hall of Famers with a trailing '*'
+    playerstats['Player'] = playerstats['Player'].astype(str).str.rstrip('*')
+    playerstats.insert(0, 'Season', year)
+    return playerstats.reset_index(drop=True)
+
+
+def data_dir(league):
+    return LEAGUES[league]['data_dir']
+
+
+def load_players(league):
+    """All ingested seasons, or None if nothing has been ingested yet."""
+    path = os.path.join(data_dir(league), PLAYERS_FILE)
+    if not os.path.exists(path):
+        return None
+    return pd.read_pickle(path)
+
+
+def load_player_search(league):
+    """(players, PlayerIndex), or (None, None) if nothing has been ingested yet."""
+    players = load_players(league)
+    if players is None:
+        return None, None
+    index = player_search.PlayerIndex.load(os.path.join(data_dir(league), player_search.INDEX_FILE))
+    return players, index
+
+
+def save_players(league, players):
+    os.makedirs(data_dir(league), exist_ok=True)
+    players.to_pickle(os.path.join(data_dir(league), PLAYERS_FILE))
+
+
+def add_seasons(league, new_seasons):
+    """Append season frames to the store and refresh everything derived from it.
+
+    Seasons already in the store are replaced.
+    """
+    players = load_players(league)
+    years = {int(s['Season'].iloc[0]) for s in new_seasons}
+    frames = new_seasons
+    removed = None
+    if players is not None:
+        replaced = players['Season'].isin(years)
+        removed = players[replaced] if replaced.any() else None
+        frames = [players[~replaced]] + frames
+    built = career.load(league)[0] is not None
+    players = pd.concat(frames, ignore_index=True)
+    players = players.sort_values('Season', kind='stable').reset_index(drop=True)
+    save_players(league, players)
+    index = player_search.PlayerIndex.build(players['Player'])
+    index.save(os.path.join(data_dir(league), player_search.INDEX_FILE))
+    # Career aggregates: only the new/replaced seasons are aggregated
+    if built:
+        career.update(league, added=pd.concat(new_seasons, ignore_index=True), removed=removed, players=players)
+    else:
+        career.build(league, players)
+    return players
+
+
+def ingest(league, years, delay=3.0):
+    """Fetch the given seasons which are not yet in the store."""
+    players = load_players(league)
+    have = set() if players is None else set(players['Season'].unique())
+    missing = [year for year in years if year not in have]
+    new_seasons = []
+    for i, year in enumerate(missing):
+        if i > 0:
+            time.sleep(delay)  # Be polite: the reference sites rate-limit scrapers
+        print(f'Fetching {league} {year}...')
+        new_seasons.append(fetch_season(league, year))
+    if new_seasons:
+        players = add_seasons(league, new_seasons)
+    return players
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ingest NBA/NFL seasons into the local store.')
+    parser.add_argument('league', choices=list(LEAGUES))
+    parser.add_argument('--start', type=int, required=True)
+    parser.add_argument('--end', type=int, required=True)
+    parser.add_argument('--delay', type=float, default=3.0, help='seconds between requests')
+    args = parser.parse_args()
+    players = ingest(args.league, range(args.start, args.end + 1), delay=args.delay)
+    if players is not None:
+        print(f'{len(players)} rows, seasons {players.Season.min()}-{players.Season.max()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Sector-level performance over a (dates x tickers) price matrix.
+
+Everything is computed with NumPy matrix operations over all tickers at
+once (no per-ticker loops):
+
+- R: daily simple returns, (dates-1 x tickers); NaN where a price is missing
+- M: one-hot membership matrix, (tickers x sectors)
+- sector daily returns = (R with NaN as 0) @ M / (valid R) @ M,
+  i.e., the equal-weighted mean of the available members each day
+- cumulative return: cumprod(1 + r) - 1
+- volatility: annualized std of the daily returns
+- correlation: corrcoef of the sector daily returns
+
+Usage:
+
+    close = store.matrix('Close', start, end)  # zero-copy view
+    result = sector_performance(close, sector_labels, store.dates[lo:hi])
+"""
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+def daily_returns(close):
+    """Simple returns along the date axis; NaN if either price is missing."""
+    close = np.asarray(close, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return close[1:] / close[:-1] - 1.0
+
+
+def membership(labels):
+    """(sectors, one-hot matrix tickers x sectors) for the label of each ticker."""
+    sectors, codes = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+    m = np.zeros((len(codes), len(sectors)))
+    m[np.arange(len(codes)), codes.ravel()] = 1.0
+    return sectors, m
+
+
+def sector_returns(returns, m):
+    """Equal-weighted daily sector returns from ticker returns; (dates x sectors)."""
+    valid = ~np.isnan(returns)
+    counts = valid.astype(np.float64) @ m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (np.where(valid, returns, 0.0) @ m) / counts
+
+
+def sector_performance(close, labels, dates):
+    """Sector dashboard numbers for a (dates x tickers) close matrix.
+
+    labels: sector of each ticker (column); dates: date of each row.
+    Returns a dict of dataframes:
+        'summary':     per sector: Tickers, Return, Volatility, Best, Worst
+        'cumulative':  cumulative return per date and sector
+        'correlation': correlation of the sector daily returns
+    """
+    sectors, m = membership(labels)
+    returns = daily_returns(close)
+    by_sector = sector_returns(returns, m)
+
+    cumulative = np.cumprod(1.0 + np.nan_to_num(by_sector), axis=0) - 1.0
+    volatility = np.nanstd(by_sector, axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+    clean = np.nan_to_num(by_sector)
+    correlation = np.corrcoef(clean, rowvar=False) if len(clean) > 1 else np.full((len(sectors),) * 2, np.nan)
+
+    # Per-ticker total returns, to report the best/worst member of each sector
+    ticker_total = np.nanprod(1.0 + returns, axis=0) - 1.0
+    masked = np.where(m.T > 0, ticker_total, np.nan)  # (sectors x tickers)
+    has_members = ~np.isnan(masked).all(axis=1)
+    best = np.full(len(sectors), np.nan)
+    worst = np.full(len(sectors), np.nan)
+    best[has_members] = np.nanmax(masked[has_members], axis=1)
+    worst[has_members] = np.nanmin(masked[has_members], axis=1)
+
+    summary = pd.DataFrame({
+        'Tickers': m.sum(axis=0).astype(int),
+        'Return': cumulative[-1] if len(cumulative) else np.nan,
+        'Volatility': volatility,
+        'Best': best,
+        'Worst': worst,
+    }, index=pd.Index(sectors, name='GICS Sector'))
+    return {
+        'summary': summary,
+        'cumulative': pd.DataFrame(cumulative, index=pd.DatetimeIndex(dates[1:], name='Date'), columns=sectors),
+        'correlation': pd.DataFrame(correlation, index=sectors, columns=sectors),
+    }
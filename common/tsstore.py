@@ -0,0 +1,262 @@
+"""Local, memory-mapped store of daily OHLCV prices for many tickers.
+
+Layout of a store folder (e.g., app_5_eda_sp500_stock/data/prices/):
+
+    meta.json       # symbols (column order), fields, number of dates, version
+    dates.npy       # shared date index, datetime64[D], sorted
+    Open.f64        # one raw float64 array per field,
+    High.f64        # shape (n_dates, n_symbols), row-major
+    ...
+
+Rows are dates and columns are symbols, so:
+
+- Appending new days appends rows at the end of each file.
+- A date range is a contiguous block of rows: slicing it returns a view
+  of the memory-mapped file (zero-copy); so does a symbol column.
+- Only the pages we touch are read from disk; all processes that open
+  the store share them through the OS page cache.
+
+Missing values (e.g., a ticker that wasn't listed yet) are NaN.
+
+Every write (append, overwrite in place, rewrite) increments the version
+in meta.json, e.g., to key cached results on the content of the store.
+
+To ingest prices (from the repository root):
+
+    $ python -m common.tsstore app_5_eda_sp500_stock/data/prices csv <folder with SYMBOL.csv files>
+    $ python -m common.tsstore app_5_eda_sp500_stock/data/prices yahoo --start 2014-01-01
+    $ python -m common.tsstore app_5_eda_sp500_stock/data/prices synthetic --start 2014-01-01
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.prices import COLUMNS
+
+FIELDS = COLUMNS
+DTYPE = np.float64
+META_FILE = 'meta.json'
+DATES_FILE = 'dates.npy'
+
+
+def to_days(dates):
+    """Any date-like (array) to datetime64[D]."""
+    return np.asarray(pd.DatetimeIndex(np.atleast_1d(dates)).values.astype('datetime64[D]'))
+
+
+class PriceStore:
+    """Append-only, memory-mapped (dates x symbols) array per field."""
+
+    def __init__(self, folder):
+        self.folder = folder
+        with open(os.path.join(folder, META_FILE)) as f:
+            meta = json.load(f)
+        self.symbols = meta['symbols']
+        self.fields = meta['fields']
+        self.version = meta.get('version', 0)
+        self.dates = np.load(os.path.join(folder, DATES_FILE))
+        self._columns = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._maps = {}
+        for field in self.fields:
+            if len(self.dates) and len(self.symbols):
+                self._maps[field] = np.memmap(self._path(field), dtype=DTYPE, mode='r',
+                                              shape=(len(self.dates), len(self.symbols)))
+            else:
+                self._maps[field] = np.empty((len(self.dates), len(self.symbols)), dtype=DTYPE)
+
+    @staticmethod
+    def exists(folder):
+        return os.path.exists(os.path.join(folder, META_FILE))
+
+    @staticmethod
+    def read_version(folder):
+        """Version of the store in folder as on disk: also sees the writes of other processes."""
+        with open(os.path.join(folder, META_FILE)) as f:
+            return json.load(f).get('version', 0)
+
+    @classmethod
+    def create(cls, folder, symbols=(), fields=FIELDS):
+        """Empty store; overwrites an existing one."""
+        os.makedirs(folder, exist_ok=True)
+        for field in fields:
+            open(os.path.join(folder, field + '.f64'), 'wb').close()
+        np.save(os.path.join(folder, DATES_FILE), np.array([], dtype='datetime64[D]'))
+        version = cls.read_version(folder) + 1 if cls.exists(folder) else 0
+        cls._write_meta(folder, list(symbols), list(fields), 0, version)
+        return cls(folder)
+
+    @staticmethod
+    def _write_meta(folder, symbols, fields, n_dates, version):
+        # Atomically: readers (e.g., read_version()) never see a partial file
+        path = os.path.join(folder, META_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump({'symbols': symbols, 'fields': fields, 'n_dates': n_dates, 'version': version}, f)
+        os.replace(path + '.tmp', path)
+
+    def _path(self, field):
+        return os.path.join(self.folder, field + '.f64')
+
+    def __contains__(self, symbol):
+        return symbol in self._columns
+
+    def __len__(self):
+        return len(self.dates)
+
+    # Reading
+
+    def window(self, start=None, end=None):
+        """Row range [lo, hi) of the dates in [start, end]."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, to_days(start)[0], side='left'))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, to_days(end)[0], side='right'))
+        return lo, hi
+
+    def matrix(self, field='Close', start=None, end=None):
+        """(dates x symbols) view of a field in [start, end]; zero-copy."""
+        lo, hi = self.window(start, end)
+        return self._maps[field][lo:hi]
+
+    def series(self, symbol, field='Close', start=None, end=None):
+        """1D view of a field of one symbol in [start, end]; zero-copy."""
+        return self.matrix(field, start, end)[:, self._columns[symbol]]
+
+    def frame(self, symbol, start=None, end=None):
+        """All fields of one symbol as a dataframe (copies; e.g., for plotting)."""
+        lo, hi = self.window(start, end)
+        column = self._columns[symbol]
+        df = pd.DataFrame({field: self._maps[field][lo:hi, column] for field in self.fields},
+                          index=pd.DatetimeIndex(self.dates[lo:hi], name='Date'))
+        return df.dropna(how='all')
+
+    # Writing
+
+    def append(self, dates, values):
+        """Append rows for new dates (all after the last stored date).
+
+        values: field -> array of shape (len(dates), n_symbols).
+        """
+        dates = to_days(dates)
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError('append() only accepts dates after ' + str(self.dates[-1]))
+        for field in self.fields:
+            block = np.ascontiguousarray(values[field], dtype=DTYPE)
+            if block.shape != (len(dates), len(self.symbols)):
+                raise ValueError(f'{field}: expected shape {(len(dates), len(self.symbols))}, got {block.shape}')
+            with open(self._path(field), 'ab') as f:
+                block.tofile(f)
+        all_dates = np.concatenate([self.dates, dates])
+        np.save(os.path.join(self.folder, DATES_FILE), all_dates)
+        self._write_meta(self.folder, self.symbols, self.fields, len(all_dates), self.version + 1)
+        self.__init__(self.folder)
+
+    def ingest_frames(self, frames):
+        """Bulk ingest: symbol -> dataframe with a date index and the fields.
+
+        New dates after the last stored one are appended and values of
+        existing dates are overwritten in place. New symbols or dates
+        inside the stored range need new columns/rows: the store is rewritten.
+        """
+        frames = {symbol: df for symbol, df in frames.items() if len(df)}
+        if not frames:
+            return self
+        new_dates = np.unique(np.concatenate([to_days(df.index) for df in frames.values()]))
+        new_symbols = [s for s in frames if s not in self._columns]
+        last = self.dates[-1] if len(self.dates) else None
+        inside = new_dates[:0] if last is None else new_dates[new_dates <= last]
+        if new_symbols or not np.isin(inside, self.dates).all():
+            return self._rewrite(frames, new_symbols, new_dates)
+
+        # Overwrite existing dates in place
+        if len(inside):
+            for field in self.fields:
+                mm = np.memmap(self._path(field), dtype=DTYPE, mode='r+', shape=(len(self.dates), len(self.symbols)))
+                for symbol, df in frames.items():
+                    days = to_days(df.index)
+                    keep = days <= last
+                    mm[np.searchsorted(self.dates, days[keep]), self._columns[symbol]] = df[field].to_numpy()[keep]
+                mm.flush()
+                del mm
+            self._write_meta(self.folder, self.symbols, self.fields, len(self.dates), self.version + 1)
+            self.version += 1
+        # Append the rest
+        after = new_dates[len(inside):]
+        if len(after):
+            values = {field: np.full((len(after), len(self.symbols)), np.nan, dtype=DTYPE) for field in self.fields}
+            for symbol, df in frames.items():
+                days = to_days(df.index)
+                keep = np.ones(len(days), dtype=bool) if last is None else days > last
+                rows = np.searchsorted(after, days[keep])
+                for field in self.fields:
+                    values[field][rows, self._columns[symbol]] = df[field].to_numpy()[keep]
+            self.append(after, values)
+        return self
+
+    def _rewrite(self, frames, new_symbols, new_dates):
+        symbols = self.symbols + new_symbols
+        dates = np.union1d(self.dates, new_dates)
+        columns = {symbol: i for i, symbol in enumerate(symbols)}
+        rows_old = np.searchsorted(dates, self.dates)
+        for field in self.fields:
+            values = np.full((len(dates), len(symbols)), np.nan, dtype=DTYPE)
+            values[rows_old, :len(self.symbols)] = self._maps[field]
+            for symbol, df in frames.items():
+                values[np.searchsorted(dates, to_days(df.index)), columns[symbol]] = df[field].to_numpy()
+            tmp = self._path(field) + '.tmp'
+            values.tofile(tmp)
+            self._maps[field] = None  # release the map before replacing the file
+            os.replace(tmp, self._path(field))
+        np.save(os.path.join(self.folder, DATES_FILE), dates)
+        self._write_meta(self.folder, symbols, self.fields, len(dates), self.version + 1)
+        self.__init__(self.folder)
+        return self
+
+    def ingest_csv(self, folder):
+        """Bulk ingest all <SYMBOL>.csv files (Date + fields) of a folder."""
+        frames = {}
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.csv'):
+                frames[name[:-4]] = pd.read_csv(os.path.join(folder, name), index_col='Date', parse_dates=['Date'])
+        return self.ingest_frames(frames)
+
+    def ingest_provider(self, provider, symbols, start, end=None):
+        """Bulk ingest from a common.prices.PriceProvider, one symbol at a time."""
+        frames = {}
+        for symbol in symbols:
+            df = provider.fetch(symbol, start, end)
+            if len(df):
+                frames[symbol] = df
+        return self.ingest_frames(frames)
+
+
+def open_store(folder):
+    """Open the store in folder, creating an empty one if needed."""
+    return PriceStore(folder) if PriceStore.exists(folder) else PriceStore.create(folder)
+
+
+def main():
+    from common import prices
+    parser = argparse.ArgumentParser(description='Ingest daily prices into a memory-mapped store.')
+    parser.add_argument('folder', help='store folder')
+    parser.add_argument('source', choices=['csv', 'yahoo', 'synthetic'])
+    parser.add_argument('csv_folder', nargs='?', help='folder with SYMBOL.csv files (source csv)')
+    parser.add_argument('--start', default='2014-01-01')
+    parser.add_argument('--symbols', nargs='*', help='default: current S&P 500 constituents')
+    args = parser.parse_args()
+
+    store = open_store(args.folder)
+    if args.source == 'csv':
+        store.ingest_csv(args.csv_folder)
+    else:
+        symbols = args.symbols or prices.sp500_symbols()
+        if args.source == 'yahoo':
+            store.ingest_provider(prices.YahooProvider(), symbols, args.start)
+        else:
+            store.ingest_frames(prices.synthetic_history(symbols, args.start))
+    print(f'{len(store.symbols)} symbols, {len(store)} dates '
+          f'({store.dates[0] if len(store) else "-"} - {store.dates[-1] if len(store) else "-"})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Warm-up stage at server start: fill the caches before the first user comes.
+
+After a deploy or a dyno restart (Procfile), the first users wait for the
+cold work: model loads and fits, dataset parses, scrapes, heavy imports.
+This launcher does that work in the server process and only then starts
+Streamlit, so the server reports ready (binds its port, /_stcore/health)
+with warm caches:
+
+    $ python -m common.warmup app_8_classification_penguins/penguins-app.py [-- <streamlit run options>]
+
+The warm-up tasks of each app are listed in TASKS; they are independent
+and run in parallel (threads; the heavy parts release the GIL):
+
+- script: the app script runs once, without a browser session (widgets
+  return their defaults), as Streamlit runs it (magic included); this fills
+  the common/caching.py caches of its models and datasets, the HTTP cache
+  of common/fetch.py, and imports what the script imports
+- import: a library imported lazily by the app (common/lazy.py), e.g.,
+  seaborn for a heatmap drawn only when a button is pressed
+- fetch: a page for the HTTP cache, e.g., the previous seasons
+
+Every app gets its script task; the multipage host gets those of all
+its pages. After --timeout seconds the server starts anyway, and the
+remaining tasks go on in the background. Compare the time-to-ready
+and the first-request latency with and without warm-up:
+benchmarks/warmup_bench.py.
+"""
+import argparse
+import importlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+NBA_SEASON = 'https://www.basketball-reference.com/leagues/NBA_{}_per_game.html'
+NFL_SEASON = 'https://www.pro-football-reference.com/years/{}/rushing.htm'
+# Script (relative to the repository root) -> tasks besides running it once
+TASKS = {
+    'app_3_eda_basketball/basketball_app.py':
+        [('import', 'matplotlib.pyplot'), ('import', 'seaborn')] +
+        [('fetch', NBA_SEASON.format(year)) for year in range(2016, 2019)],
+    'app_4_eda_football/football_app.py':
+        [('import', 'matplotlib.pyplot'), ('import', 'seaborn')] +
+        [('fetch', NFL_SEASON.format(year)) for year in range(2016, 2019)],
+    'app_5_eda_sp500_stock/sp500-app.py': [('import', 'matplotlib.pyplot'), ('import', 'seaborn')],
+}
+PAGES = os.path.join(ROOT, 'multipage', 'pages')
+MULTIPAGE_HOME = os.path.join(ROOT, 'multipage', 'Home.py')
+
+
+def _relative(script):
+    return os.path.relpath(os.path.realpath(script), ROOT).replace(os.sep, '/')
+
+
+def _compile(path):
+    """Code of the script as Streamlit runs it (with its magic), so that the
+    cached functions have the same code, hence the same caches."""
+    with open(path, encoding='utf-8') as f:
+        source = f.read()
+    try:
+        from streamlit.runtime.scriptrunner.magic import add_magic
+    except ImportError:
+        return compile(source, path, 'exec')
+    return compile(add_magic(source, path), path, 'exec')
+
+
+def run_script(path):
+    exec(_compile(path), {'__name__': '__main__', '__file__': path})
+
+
+def tasks_for(script):
+    """[(description, function)] of the warm-up of a script (see TASKS)."""
+    scripts = [os.path.realpath(script)]
+    if scripts[0] == os.path.realpath(MULTIPAGE_HOME):
+        scripts += [os.path.realpath(os.path.join(PAGES, name)) for name in sorted(os.listdir(PAGES))
+                    if name.endswith('.py')]
+    tasks = []
+    for path in scripts:
+        tasks.append(('script ' + _relative(path), lambda path=path: run_script(path)))
+        for kind, target in TASKS.get(_relative(path), []):
+            if kind == 'import':
+                tasks.append((f'import {target}', lambda target=target: importlib.import_module(target)))
+            elif kind == 'fetch':
+                tasks.append((f'fetch {target}', lambda target=target: _fetch(target)))
+            else:
+                raise ValueError(f'Unknown warm-up task: {kind}')
+    # The same library for several pages: imported once
+    unique = {}
+    for name, func in tasks:
+        unique.setdefault(name, func)
+    return list(unique.items())
+
+
+def _fetch(url):
+    from common import fetch
+    fetch.content(url)
+
+
+def _quiet_streamlit(level):
+    """Streamlit warns on every st.* call made without a browser session."""
+    try:
+        from streamlit import config, logger
+    except ImportError:
+        return
+    # Parsing the config (on the first st.* call otherwise) resets the level
+    config.get_config_options()
+    logger.set_log_level(level)
+
+
+def run(tasks, max_workers=8, timeout=None):
+    """Run the tasks in parallel for up to timeout seconds.
+
+    Returns a report: [(description, seconds or None if not finished, error or None)].
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def timed(name, func):
+        start = time.perf_counter()
+        error = None
+        try:
+            func()
+        except BaseException as e:  # e.g., st.stop() raises StopException
+            error = f'{type(e).__name__}: {e}'
+        with lock:
+            results[name] = (time.perf_counter() - start, error)
+
+    _quiet_streamlit('error')
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='warmup')
+    try:
+        wait([pool.submit(timed, name, func) for name, func in tasks], timeout=timeout)
+    finally:
+        # Unfinished tasks go on, but the server doesn't wait for them
+        pool.shutdown(wait=False)
+        _quiet_streamlit('info')
+    with lock:
+        return [(name,) + results.get(name, (None, None)) for name, _ in tasks]
+
+
+def print_report(report, elapsed):
+    for name, seconds, error in report:
+        status = 'not finished' if seconds is None else f'{seconds:6.2f} s'
+        print(f'warm-up: {status:>12}  {name}' + (f'  ({error})' if error else ''), flush=True)
+    print(f'warm-up: {elapsed:.2f} s in total, starting the server', flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('script', help='app script, as for streamlit run; options of streamlit run go after --')
+    parser.add_argument('--workers', type=int, default=8, help='tasks run at once')
+    parser.add_argument('--timeout', type=float, default=45,
+                        help='seconds after which the server starts anyway (Heroku: port bound within 60 s)')
+    parser.add_argument('--no-warmup', action='store_true', help='start the server right away')
+    argv = sys.argv[1:] if argv is None else list(argv)
+    streamlit_args = []
+    if '--' in argv:
+        argv, streamlit_args = argv[:argv.index('--')], argv[argv.index('--') + 1:]
+    args = parser.parse_args(argv)
+
+    if not args.no_warmup:
+        start = time.perf_counter()
+        # As under streamlit run: the script's folder is importable
+        sys.path.insert(0, os.path.dirname(os.path.realpath(args.script)))
+        report = run(tasks_for(args.script), args.workers, args.timeout)
+        print_report(report, time.perf_counter() - start)
+
+    # Same process: the server finds the caches filled by the warm-up
+    from streamlit.web import cli
+    sys.argv = ['streamlit', 'run', args.script] + streamlit_args
+    sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""All the apps of the repository as pages of a single Streamlit server.
+
+Each page in pages/ is a symbolic link to an app script, so the apps are
+run exactly as they are; Streamlit lists them in the sidebar. In one
+process, the libraries (pandas, scikit-learn, matplotlib...) are loaded
+once, and the datasets and models are shared by all pages and sessions
+through the process-wide caches of common/caching.py (resource_cache for
+models, data_cache for datasets). Compare the memory with one process
+per app: benchmarks/multipage_bench.py.
+
+The apps read their files next to their scripts (not from the working
+directory), so the server can be started from anywhere:
+
+    $ streamlit run multipage/Home.py
+"""
+import os
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import streamlit as st
+
+# Shared helpers: ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+from common import caching, fetch, memory
+
+st.set_page_config(page_title='Streamlit Apps', layout='wide')
+
+st.title('Streamlit Apps')
+st.markdown("""
+All the apps of this repository in one server process; select one in the sidebar:
+
+1. **Stock Price**: closing price and volume of several tickers
+2. **DNA Nucleotide Count**: nucleotide composition of a DNA sequence
+3. **NBA Player Stats**: player stats by season, team and position
+4. **NFL Player Stats**: rushing stats by season, team and position
+5. **S&P 500 Stocks**: companies by sector, sector performance and price charts
+6. **Crypto Prices**: CoinMarketCap prices and % changes, with live mode
+7. **Iris Classification**: random forest classifier
+8. **Penguin Classification**: pre-trained random forest classifier
+9. **Boston Housing**: random forest regressor explained with SHAP values
+10. **Molecular Solubility**: LogS regression from molecular descriptors
+""")
+
+# Shared by all pages and sessions of this process
+st.header('Process')
+if resource is not None:
+    # ru_maxrss is in KB on Linux
+    st.write('Peak resident memory: %.0f MB' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+st.subheader('Shared caches')
+st.dataframe(caching.stats())
+st.subheader('Memory held per session')
+held = memory.sessions()
+st.dataframe(held.groupby(['app', 'session']).bytes.sum().reset_index() if len(held) else held)
+st.subheader('Data sources (HTTP)')
+st.dataframe(fetch.stats())
@@ -0,0 +1 @@
+../../app_10_regression_bioinformatics_solubility/solubility-app.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../app_1_simple_stock_price/myapp2.py
\ No newline at end of file
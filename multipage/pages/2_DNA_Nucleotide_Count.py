@@ -0,0 +1 @@
+../../app_2_simple_bioinformatics_dna/dna-app.py
\ No newline at end of file
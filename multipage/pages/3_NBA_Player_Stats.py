@@ -0,0 +1 @@
+../../app_3_eda_basketball/basketball_app.py
\ No newline at end of file
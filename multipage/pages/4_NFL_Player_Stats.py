@@ -0,0 +1 @@
+../../app_4_eda_football/football_app.py
\ No newline at end of file
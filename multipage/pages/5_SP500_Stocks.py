@@ -0,0 +1 @@
+../../app_5_eda_sp500_stock/sp500-app.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../app_6_eda_cryptocurrency/crypto-price-app.py
\ No newline at end of file
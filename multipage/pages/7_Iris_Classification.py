@@ -0,0 +1 @@
+../../app_7_classification_iris/iris-ml-app.py
\ No newline at end of file
@@ -0,0 +1 @@
+../../app_8_classification_penguins/penguins-app.py
\ No newline at end of file
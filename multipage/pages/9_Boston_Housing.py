@@ -0,0 +1 @@
+../../app_9_regression_boston_housing/boston-house-ml-app.py
\ No newline at end of file
@@ -34,8 +34,8 @@ List of concepts covered in this script:
 - Line charts
 - Plots: altair, matplotlib, seaborn
 - Fetching datasets, conditional on variables
-- Refreshing fetched datasets: cache
-- Downloading generated files/dataframes/CSVs
+- Refreshing fetched datasets: cache (st.cache, common/caching.py)
+- Downloading generated files/dataframes/CSVs (lazily, compressed)
 - Catching variables with widgets:
     - Dropdown: selectbox
     - Multiple categories: multiselect
@@ -80,11 +80,14 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 from PIL import Image
-import matplotlib.pyplot as plt
-import seaborn as sns
-import altair as alt
-import base64
 import pickle
+# Heavy libraries can be imported at the point of use (see common/lazy.py):
+# the names work as usual, but the module is imported on first access,
+# so pages/paths that don't use them don't pay for the import
+from common.lazy import lazy_import
+plt = lazy_import('matplotlib.pyplot')
+sns = lazy_import('seaborn')
+alt = lazy_import('altair')
 
 # Basic webpage setup
 st.set_page_config(
@@ -217,8 +220,15 @@ selected_year = st.sidebar.selectbox('Year', list(reversed(range(1950,2020))))
 
 ## Web-scrapping: Fetch data frm HTML/web conditional on variable and refresh!
 # Caching: https://docs.streamlit.io/library/api-reference/performance/st.cache
+# st.cache hashes the arguments (and the returned value) on every call,
+# has no TTL or size bound and doesn't survive restarts.
+# The apps in this repository use common/caching.py instead:
+# - data_cache: data (dataframes, etc.); TTL, max. entries/bytes, optional disk tier
+#   (persist=<folder>; the apps use a data/cache folder next to their script)
+# - resource_cache: shared objects (models, connections, pools); one per arguments
 # Example: app_3_eda_basketball
-@st.cache # Run every time we change function name / code / parameter values (year) and store results in local cache
+from common.caching import data_cache, resource_cache
+@data_cache(ttl=24 * 3600, max_entries=100) # Expire after a day, keep 100 years; re-run when the parameter values (year) change
 def load_data(year):
     url = "https://www.basketball-reference.com/leagues/NBA_" + str(year) + "_per_game.html"
     html = pd.read_html(url, header = 0)
@@ -271,17 +281,26 @@ if st.button('Correlation Heatmap'):
     
 ## File download, e.g., generated/filtered CSV
 # https://discuss.streamlit.io/t/how-to-download-file-in-streamlit/1806
-# df passed, encoded to bytes as b64
-# then downloaded as dataset.csv
-# We can modify the name of the downloaded file changing "dataset.csv"
-# Download functionality is shown as a Markdown link
+# The original approach was a Markdown link with the df encoded as base64:
+#   csv = df.to_csv(index=False)
+#   b64 = base64.b64encode(csv.encode()).decode()
+#   st.markdown(f'<a href="data:file/csv;base64,{b64}" download="dataset.csv">Download CSV File</a>', unsafe_allow_html=True)
+# But that serializes the whole df on every rerun and sends it with the page,
+# even if nobody downloads anything.
+# Better: generate the file only on request and serve it with st.download_button.
+# The file is written in chunks and compressed (gzip CSV or Parquet).
 # Example: app_3_eda_basketball
-def filedownload(df):
-    csv = df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()  # strings <-> bytes conversions
-    href = f'<a href="data:file/csv;base64,{b64}" download="dataset.csv">Download CSV File</a>'
-    return href
-st.markdown(filedownload(df_filtered), unsafe_allow_html=True)
+from common.download import download_buttons
+download_buttons(df_filtered, 'dataset') # format selector + 'Prepare download' button
+# Under the hood, something like:
+#   if st.button('Prepare download'):
+#       buffer = io.BytesIO()
+#       with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+#           for start in range(0, len(df_filtered), 50_000): # chunk by chunk, not one big string
+#               chunk = df_filtered.iloc[start:start + 50_000]
+#               f.write(chunk.to_csv(index=False, header=start == 0).encode())
+#       st.download_button('Download CSV File', data=buffer.getvalue(), file_name='dataset.csv.gz',
+#                          mime='application/gzip')
 
 ## Page layout: Columns
 # We can divide the page in columns
@@ -390,9 +409,11 @@ st.write(prediction_proba)
 #   pip install streamlit-aggrid
 
 # Imports
-from st_aggrid import AgGrid
-from st_aggrid.grid_options_builder import GridOptionsBuilder
-from st_aggrid import GridUpdateMode, DataReturnMode
+# from st_aggrid import AgGrid, GridUpdateMode, DataReturnMode
+# from st_aggrid.grid_options_builder import GridOptionsBuilder
+# or lazily, imported when the grid is built (see common/lazy.py):
+st_aggrid = lazy_import('st_aggrid')
+grid_options_builder = lazy_import('st_aggrid.grid_options_builder')
 
 # A common way of way of using it is defining a function
 # in which the table is defined from a dataset.
@@ -401,7 +422,7 @@ from st_aggrid import GridUpdateMode, DataReturnMode
 # See example:
 # https://github.com/mxagar/course_recommender_streamlit
 
-@st.cache
+@data_cache(ttl=3600) # see common/caching.py
 def load_dataset():
     return pd.read_csv("dataset.csv")
 
@@ -415,7 +436,7 @@ def init_app():
     st.subheader("Please, select rows: ")
 
     # GridOptionsBuilder: Define options of interactive table
-    gb = GridOptionsBuilder.from_dataframe(df)
+    gb = grid_options_builder.GridOptionsBuilder.from_dataframe(df)
     gb.configure_default_column(enablePivot=True, enableValue=True, enableRowGroup=True)
     gb.configure_selection(selection_mode="multiple", use_checkbox=True)
     gb.configure_side_bar()
@@ -423,12 +444,12 @@ def init_app():
 
     # Create an AgGrid: an interactive table from which we get a response
     # with the rows selected by the user
-    response = AgGrid(
+    response = st_aggrid.AgGrid(
         df,
         gridOptions=grid_options,
         enable_enterprise_modules=True,
-        update_mode=GridUpdateMode.MODEL_CHANGED,
-        data_return_mode=DataReturnMode.FILTERED_AND_SORTED,
+        update_mode=st_aggrid.GridUpdateMode.MODEL_CHANGED,
+        data_return_mode=st_aggrid.DataReturnMode.FILTERED_AND_SORTED,
         fit_columns_on_grid_load=False,
     )
     # response is a dictionary with these key:
@@ -447,6 +468,66 @@ def init_app():
     
     return results
 
+# Large tables: server-side paging
+# AgGrid(df) serializes every row to the browser, and the whole table comes back
+# in response["data"] on every interaction; with hundreds of thousands of rows
+# the page stalls. Instead, we filter, sort and group in the server (pandas/NumPy)
+# and send only the visible page to the grid (see common/paging.py).
+# The selection is a set of row ids (position in the full table) in st.session_state,
+# so selected rows stay selected when we filter, sort or change the page.
+from common import paging
+
+def init_app_paged(page_size=100):
+    df = load_dataset()
+
+    # Filters, sorting and grouping: widgets, applied in the server
+    # The filters use the format of AgGrid's filter model
+    col1, col2, col3 = st.columns(3)
+    search = col1.text_input('Title contains')
+    sort_by = col2.selectbox('Sort by', ['-'] + list(df.columns))
+    descending = col2.checkbox('Descending')
+    group_by = col3.multiselect('Group by', list(df.columns))
+    filters = {'TITLE': {'filterType': 'text', 'type': 'contains', 'filter': search}} if search else {}
+    sort_model = [{'colId': sort_by, 'sort': 'desc' if descending else 'asc'}] if sort_by != '-' else []
+    positions = paging.sort_rows(df, paging.filter_rows(df, filters), sort_model)
+
+    if group_by:
+        # Groups instead of rows: one row per group, with its count
+        st.dataframe(paging.group_rows(df, positions, group_by))
+        return df.take(sorted(st.session_state.get('selected_ids', set())))
+
+    # Only the rows of this page go to the browser
+    page_size = st.selectbox('Rows per page', paging.PAGE_SIZES, index=paging.PAGE_SIZES.index(page_size))
+    n_pages = max(1, -(-len(positions) // page_size))
+    number = st.number_input(f'Page (of {n_pages}, {len(positions)} rows)', 1, n_pages, 1) - 1
+    rows, n_pages = paging.page(df, positions, number, page_size)
+
+    selected = st.session_state.setdefault('selected_ids', set())
+    gb = grid_options_builder.GridOptionsBuilder.from_dataframe(rows)
+    gb.configure_column(paging.ROW_ID, hide=True)
+    gb.configure_selection(selection_mode="multiple", use_checkbox=True,
+                           pre_selected_rows=paging.preselected(rows, selected))
+    response = st_aggrid.AgGrid(
+        rows,
+        gridOptions=gb.build(),
+        update_mode=st_aggrid.GridUpdateMode.SELECTION_CHANGED,
+        data_return_mode=st_aggrid.DataReturnMode.AS_INPUT, # the page we sent, not the whole table
+        fit_columns_on_grid_load=False,
+    )
+    # Rows of other pages keep their state; a response still showing the previous page is ignored
+    selected = paging.update_selection(selected, rows[paging.ROW_ID], response["selected_rows"], response["data"])
+    st.session_state['selected_ids'] = selected
+
+    results = df.take(sorted(selected))
+    st.subheader(f"Your selected rows ({len(results)}): ")
+    st.dataframe(results)
+
+    return results
+
 # Initialize the app
 st.title("My App")
-selected_df = init_app()
+# Large tables: only the rows of one page go to the browser (see common/paging.py)
+if st.radio('Table', ['All rows', 'Paged (large tables)']) == 'All rows':
+    selected_df = init_app()
+else:
+    selected_df = init_app_paged()
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# Shared helpers: ../common, as in the apps
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), '..'))
+
+from common import fetch  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def fetcher(monkeypatch):
+    """A live Fetcher without disk cache: nothing is written to the repository."""
+    fetcher = fetch.Fetcher('live', cache_dir=None)
+    monkeypatch.setattr(fetch, '_default', fetcher)
+    return fetcher
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from common import cmc
+
+
+@pytest.fixture
+def server():
+    server = cmc.fixture_server(n_coins=50)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server):
+    return f'http://127.0.0.1:{server.server_port}'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_currency_switch_uses_one_snapshot(server):
+    cache = cmc.SnapshotCache(url(server), ttl=300)
+    frames = {c: cmc.in_currency(cache.snapshot(), c) for c in ['USD', 'BTC', 'ETH', 'USD', 'BTC']}
+    assert cache.fetch_count == 1
+    assert list(frames['BTC'].columns) == cmc.COLUMNS
+    assert frames['USD'].coin_symbol.tolist() == frames['ETH'].coin_symbol.tolist()
+
+
+def test_snapshot_fetched_again_after_ttl(server):
+    clock = Clock()
+    cache = cmc.SnapshotCache(url(server), ttl=300, clock=clock)
+    first_id, _ = cache.current()
+    clock.now += 299
+    assert cache.current()[0] == first_id
+    assert cache.fetch_count == 1
+    clock.now += 1
+    assert cache.current()[0] != first_id
+    assert cache.fetch_count == 2
+
+
+def test_cross_rates_derived_from_usd():
+    server = cmc.fixture_server(n_coins=50, currencies=['USD'])
+    try:
+        snapshot = cmc.SnapshotCache(url(server), ttl=300).snapshot()
+    finally:
+        server.shutdown()
+        server.server_close()
+    expected = cmc.snapshot_frame(cmc.fixture_page(n_coins=50))  # the page with all the quotes
+    usd = snapshot.set_index('coin_symbol')['price.USD']
+    for currency in ['BTC', 'ETH']:
+        np.testing.assert_allclose(snapshot['price.' + currency], usd.to_numpy() / usd[currency])
+        np.testing.assert_allclose(snapshot['price.' + currency], expected['price.' + currency])
+        np.testing.assert_allclose(snapshot['market_cap.' + currency],
+                                   snapshot['market_cap.USD'] / usd[currency])
+        # Changes relative to the coin: (1 + a) / (1 + b) - 1
+        change = snapshot['percent_change_24h.USD'].to_numpy()
+        rate = change[snapshot.coin_symbol.tolist().index(currency)]
+        np.testing.assert_allclose(snapshot['percent_change_24h.' + currency],
+                                   ((1 + change / 100) / (1 + rate / 100) - 1) * 100)
+    btc = cmc.in_currency(snapshot, 'BTC').set_index('coin_symbol')
+    assert btc.loc['BTC', 'price'] == pytest.approx(1.0)
+    assert btc.loc['ETH', 'price'] == pytest.approx(usd['ETH'] / usd['BTC'])
@@ -0,0 +1,53 @@
+import pandas as pd
+
+from common import prices
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_history_cached_within_ttl():
+    provider = prices.FixtureProvider(prices.synthetic_history(['AAA'], '2024-01-01', '2024-01-31'))
+    cache = prices.PriceCache(provider, ttl=3600, clock=Clock())
+    first = cache.history('AAA', '2024-01-02')
+    assert cache.history('AAA', '2024-01-02').equals(first)
+    assert provider.fetch_count == 1
+
+
+def test_refresh_replaces_last_cached_day():
+    frames = prices.synthetic_history(['AAA'], '2024-01-01', '2024-01-31')
+    full = frames['AAA']
+    # Cached while 2024-01-09 was still trading
+    provider = prices.FixtureProvider({'AAA': full.loc[:'2024-01-09'].copy()})
+    clock = Clock()
+    cache = prices.PriceCache(provider, ttl=3600, clock=clock)
+    assert cache.history('AAA', '2024-01-02').index[-1] == pd.Timestamp('2024-01-09')
+
+    # The day closes, the next one trades, the TTL expires
+    updated = full.loc[:'2024-01-10'].copy()
+    updated.loc['2024-01-09', 'Close'] = 999.0
+    provider.frames['AAA'] = updated
+    clock.now += 3600
+    df = cache.history('AAA', '2024-01-02')
+
+    assert provider.fetch_count == 2
+    assert df.loc['2024-01-09', 'Close'] == 999.0
+    assert df.index[-1] == pd.Timestamp('2024-01-10')
+    assert df.index.is_unique and df.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(df, updated.loc['2024-01-02':, prices.COLUMNS])
+
+
+def test_refresh_without_new_rows_keeps_history():
+    frames = prices.synthetic_history(['AAA'], '2024-01-01', '2024-01-31')
+    provider = prices.FixtureProvider(frames)
+    clock = Clock()
+    cache = prices.PriceCache(provider, ttl=3600, clock=clock)
+    first = cache.history('AAA', '2024-01-02')
+    provider.frames['AAA'] = frames['AAA'].iloc[:0]
+    clock.now += 3600
+    assert cache.history('AAA', '2024-01-02').equals(first)